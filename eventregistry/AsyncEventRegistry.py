@@ -0,0 +1,493 @@
+"""
+asyncio based version of the EventRegistry class. All the methods that make requests to Event Registry are coroutines,
+which makes it possible to have many requests in flight at the same time on a single event loop.
+
+The class requires the aiohttp package (pip install aiohttp).
+"""
+import time, asyncio, urllib.parse
+
+from typing import Union, List, Tuple
+from eventregistry.Base import *
+from eventregistry.ReturnInfo import *
+from eventregistry.RateLimiter import RateLimiter
+from eventregistry.Concurrency import ConcurrencyController
+from eventregistry.Retry import RetryPolicy, CircuitBreaker
+from eventregistry.Cache import ResponseCache, UriCache
+from eventregistry.JsonCodec import JsonCodec
+from eventregistry.LazyResponse import LazyResponse
+from eventregistry.Coalescing import RequestCoalescer
+from eventregistry.EventRegistry import EventRegistry, ResolvedUris
+from eventregistry.Logger import logger
+
+
+class AsyncEventRegistry(EventRegistry):
+    """
+    the asyncio version of the EventRegistry class. Usage example:
+
+        async with AsyncEventRegistry(apiKey = YOUR_API_KEY) as er:
+            q = QueryArticles(keywords = "Tesla")
+            res = await er.execQuery(q)
+
+    All the query classes (QueryArticles, QueryEvents, GetCounts, ...) can be used with the execQuery() method.
+    The methods of the helper classes that return the response of jsonRequest() or jsonRequestAnalytics() unchanged
+    (Analytics, TopicPage.getArticles(), TopicPage.getEvents(), ...) return awaitables.
+    The classes and methods that process the results of the requests synchronously require an instance of EventRegistry
+    and raise TypeError when used with AsyncEventRegistry: the iterators (QueryArticlesIter, QueryEventsIter, ..., including
+    their count() method, DateShardedIter and BulkQueryIter), GetRecentEvents, GetRecentArticles, GetEventForText,
+    ArticleMapper, TopicPage.loadTopicPageFromER() and TopicPages.getMyTopicPages().
+    To count the results, execute the query with RequestArticlesInfo / RequestEventsInfo and read "totalResults".
+    """
+    def __init__(self,
+                 apiKey: Union[str, None] = None,
+                 host: Union[str, None] = None,
+                 hostAnalytics: Union[str, None] = None,
+                 minDelayBetweenRequests: float = 0,
+                 repeatFailedRequestCount: int = -1,
+                 allowUseOfArchive: bool = True,
+                 verboseOutput: bool = False,
+                 settingsFName: Union[str, None] = None,
+                 maxConcurrentRequests: int = 100,
+                 requestTimeout: float = 60,
+                 rateLimiter: Union[RateLimiter, None] = None,
+                 concurrencyController: Union[ConcurrencyController, None] = None,
+                 retryPolicy: Union[RetryPolicy, None] = None,
+                 circuitBreaker: Union[CircuitBreaker, None] = None,
+                 responseCache: Union[ResponseCache, None] = None,
+                 jsonCodec: Union[JsonCodec, None] = None,
+                 requestCoalescer: Union[RequestCoalescer, None] = None,
+                 uriCache: Union[UriCache, None] = None):
+        """
+        @param minDelayBetweenRequests: the minimum number of seconds between individual api calls. Unlike with EventRegistry, the
+            default is 0, so the requests are limited only by maxConcurrentRequests. A delay of d seconds allows at most 1/d
+            requests per second, regardless of maxConcurrentRequests. Use rateLimiter to allow bursts of requests
+        @param maxConcurrentRequests: the maximum number of requests (and open connections) that can be in flight at the same time
+        @param requestTimeout: number of seconds after which a request is considered to have failed
+        See the EventRegistry class for the description of the other parameters.
+        """
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AsyncEventRegistry requires the aiohttp package. Install it by calling: pip install aiohttp")
+        EventRegistry.__init__(self, apiKey = apiKey, host = host, hostAnalytics = hostAnalytics,
+                               minDelayBetweenRequests = minDelayBetweenRequests,
+                               repeatFailedRequestCount = repeatFailedRequestCount,
+                               allowUseOfArchive = allowUseOfArchive,
+                               verboseOutput = verboseOutput,
+                               settingsFName = settingsFName,
+                               maxConcurrentRequests = maxConcurrentRequests,
+                               rateLimiter = rateLimiter,
+                               concurrencyController = concurrencyController,
+                               retryPolicy = retryPolicy,
+                               circuitBreaker = circuitBreaker,
+                               responseCache = responseCache,
+                               jsonCodec = jsonCodec,
+                               requestCoalescer = requestCoalescer,
+                               uriCache = uriCache)
+        self._requestTimeout = requestTimeout
+        # the aiohttp session has to be created inside a running event loop, so we create it when making the first request
+        self._asyncSession = None
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+    async def close(self):
+        """close the underlying http session. Call it when you don't need the instance anymore"""
+        if self._asyncSession is not None:
+            await self._asyncSession.close()
+            self._asyncSession = None
+
+
+    async def checkVersion(self):
+        """
+        check what is the latest version of the python sdk and report in case there is a newer version
+        """
+        try:
+            session = self._getAsyncSession()
+            async with session.get(self._host + "/static/pythonSDKVersion.txt") as respInfo:
+                text = await respInfo.text()
+                if respInfo.status != 200 or len(text) > 20:
+                    return
+            latestVersion = text.strip()
+            import eventregistry._version as _version
+            currentVersion = _version.__version__
+            for (latest, current) in zip(latestVersion.split("."), currentVersion.split(".")):
+                if int(latest) > int(current):
+                    logger.info("==============\nYour version of the module is outdated, please update to the latest version")
+                    logger.info("Your version is %s while the latest is %s", currentVersion, latestVersion)
+                    logger.info("Update by calling: pip install --upgrade eventregistry\n==============")
+                    return
+                # in case the server mistakenly has a lower version that the user has, don't report an error
+                elif int(latest) < int(current):
+                    return
+        except:
+            pass
+
+
+    async def execQuery(self, query: QueryParamsBase, allowUseOfArchive: Union[bool, None] = None):
+        """
+        main method for executing the search queries.
+        @param query: instance of Query class
+        @param allowUseOfArchive: potentially override the value set when constructing AsyncEventRegistry class.
+            If not None set it to boolean to determine if the request can be executed on the archive data or not
+            If left to None then the value set in the AsyncEventRegistry constructor will be used
+        """
+        assert isinstance(query, QueryParamsBase), "query parameter should be an instance of a class that has Query as a base class, such as QueryArticles or QueryEvents"
+        # don't modify original query params
+        allParams = query._getQueryParams()
+        cacheKey = self._getCacheKey(query._getPath(), allParams, allowUseOfArchive)
+        # the cache reads and writes the SQLite file (and decompresses/compresses the responses), so it is used in
+        # an executor thread in order not to block the event loop
+        loop = asyncio.get_running_loop()
+        if cacheKey is not None:
+            respInfo = await loop.run_in_executor(None, self._responseCache.get, cacheKey)
+            if respInfo is not None:
+                self._resetRequestState()
+                return respInfo
+        # make the request
+        respInfo = await self.jsonRequest(query._getPath(), allParams, allowUseOfArchive = allowUseOfArchive)
+        if cacheKey is not None:
+            await loop.run_in_executor(None, self._storeCachedResponse, cacheKey, query._getPath(), allParams, respInfo)
+        return respInfo
+
+
+    async def execQueryLazy(self, query: QueryParamsBase, allowUseOfArchive: Union[bool, None] = None) -> LazyResponse:
+        """
+        execute the search query in the same way as execQuery(), but return a LazyResponse that decodes each section of the
+        response only when it is accessed (only when the registry uses JsonCodec, see LazyResponse)
+        @param query: instance of Query class
+        @param allowUseOfArchive: see execQuery()
+        """
+        assert isinstance(query, QueryParamsBase), "query parameter should be an instance of a class that has Query as a base class, such as QueryArticles or QueryEvents"
+        allParams = query._getQueryParams()
+        cacheKey = self._getCacheKey(query._getPath(), allParams, allowUseOfArchive)
+        loop = asyncio.get_running_loop()
+        if cacheKey is not None:
+            data = await loop.run_in_executor(None, self._responseCache.getRaw, cacheKey)
+            if data is not None:
+                self._resetRequestState()
+                return LazyResponse(data, self._jsonCodec)
+        respInfo = LazyResponse(await self.jsonRequestRaw(query._getPath(), allParams, allowUseOfArchive = allowUseOfArchive), self._jsonCodec)
+        if cacheKey is not None:
+            await loop.run_in_executor(None, self._storeCachedResponse, cacheKey, query._getPath(), allParams, respInfo)
+        return respInfo
+
+
+    async def jsonRequest(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None] = None, allowUseOfArchive: Union[bool, None] = None):
+        """
+        make a request for json data. failed requests are repeated according to the retry policy
+        @param methodUrl: url on er (e.g. "/api/v1/article")
+        @param paramDict: optional object containing the parameters to include in the request (e.g. { "articleUri": "123412342" }).
+        @param customLogFName: potentially a file name where the request information can be logged into
+        @param allowUseOfArchive: potentially override the value set when constructing AsyncEventRegistry class.
+            If not None set it to boolean to determine if the request can be executed on the archive data or not
+            If left to None then the value set in the AsyncEventRegistry constructor will be used
+        """
+        return await self._makeRequest(methodUrl, paramDict, customLogFName, allowUseOfArchive, decode = True)
+
+
+    async def jsonRequestRaw(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None] = None, allowUseOfArchive: Union[bool, None] = None) -> bytes:
+        """
+        make a request in the same way as jsonRequest(), but return the body of the response (utf-8 encoded json) without parsing it
+        """
+        return await self._makeRequest(methodUrl, paramDict, customLogFName, allowUseOfArchive, decode = False)
+
+
+    async def jsonRequestAnalytics(self, methodUrl: str, paramDict: dict):
+        """
+        call the analytics service to execute a method like annotation, categorization, etc.
+        @param methodUrl: api endpoint url to call
+        @param paramDict: a dictionary with values to send to the api endpoint
+        """
+        if self._apiKey:
+            paramDict["apiKey"] = self._apiKey
+        state = self._resetRequestState()
+        return await self._postWithRetries(self._hostAnalytics + methodUrl, paramDict, state, processHeaders = False)
+
+
+    #
+    # get info methods - return type is a single item that is the best match to the given input
+
+    async def getConceptUri(self, conceptLabel: str, lang: str = "eng", sources: Union[str, List[str]] = ["concepts"]):
+        """
+        return a concept uri that is the best match for the given concept label
+        if there are multiple matches for the given conceptLabel, they are sorted based on their frequency of occurence in news (most to least frequent)
+        @param conceptLabel: partial or full name of the concept for which to return the concept uri
+        @param sources: what types of concepts should be returned. valid values are person, loc, org, wiki, entities (== person + loc + org), concepts (== entities + wiki)
+        """
+        return await self._getCachedUri("getConceptUri", [conceptLabel, lang, sources],
+            lambda: self.suggestConcepts(conceptLabel, lang = lang, sources = sources))
+
+
+    async def getLocationUri(self, locationLabel: str, lang: str = "eng", sources: Union[str, List[str]] = ["place", "country"], countryUri: Union[str, None] = None, sortByDistanceTo: Union[List, Tuple, None] = None):
+        """
+        return a location uri that is the best match for the given location label
+        @param locationLabel: partial or full location name for which to return the location uri
+        @param sources: what types of locations are we interested in. Possible options are "place" and "country"
+        @param countryUri: if set, then filter the possible locatiosn to the locations from that country
+        @param sortByDistanceTo: sort candidates by distance to the given (lat, long) pair
+        """
+        return await self._getCachedUri("getLocationUri", [locationLabel, lang, sources, countryUri, sortByDistanceTo],
+            lambda: self.suggestLocations(locationLabel, sources = sources, lang = lang, countryUri = countryUri, sortByDistanceTo = sortByDistanceTo),
+            propName = "wikiUri")
+
+
+    async def getCategoryUri(self, categoryLabel: str):
+        """
+        return a category uri that is the best match for the given label
+        @param categoryLabel: partial or full name of the category for which to return category uri
+        """
+        return await self._getCachedUri("getCategoryUri", [categoryLabel], lambda: self.suggestCategories(categoryLabel))
+
+
+    async def getNewsSourceUri(self, sourceName: str, dataType: Union[str, List[str]] = ["news", "pr", "blog"]):
+        """
+        return the news source that best matches the source name
+        @param sourceName: partial or full name of the source or source uri for which to return source uri
+        @param dataType: return the source uri that provides content of these data types ("news", "pr", "blog" or a list of any of those)
+        """
+        return await self._getCachedUri("getNewsSourceUri", [sourceName, dataType], lambda: self.suggestNewsSources(sourceName, dataType = dataType))
+
+
+    async def getSourceUri(self, sourceName: str, dataType: Union[str, List[str]] = ["news", "pr", "blog"]):
+        """
+        alternative (shorter) name for the method getNewsSourceUri()
+        """
+        return await self.getNewsSourceUri(sourceName, dataType)
+
+
+    async def getSourceGroupUri(self, sourceGroupName: str):
+        """
+        return the URI of the source group that best matches the name
+        @param sourceGroupName: partial or full name of the source group
+        """
+        return await self._getCachedUri("getSourceGroupUri", [sourceGroupName], lambda: self.suggestSourceGroups(sourceGroupName))
+
+
+    async def getConceptClassUri(self, classLabel: str, lang: str = "eng"):
+        """
+        return a uri of the concept class that is the best match for the given label
+        @param classLabel: partial or full name of the concept class for which to return class uri
+        """
+        return await self._getCachedUri("getConceptClassUri", [classLabel, lang], lambda: self.suggestConceptClasses(classLabel, lang = lang))
+
+
+    async def getAuthorUri(self, authorName: str):
+        """
+        return author uri that is the best match for the given author name (and potentially source url)
+        @param authorName: partial or full name of the author, potentially also containing the source url (e.g. "george brown nytimes")
+        """
+        return await self._getCachedUri("getAuthorUri", [authorName], lambda: self.suggestAuthors(authorName))
+
+
+    async def getEventTypeUri(self, eventTypeLabel: str):
+        """
+        return event type uri that is the best match for the given label
+        @param eventTypeLabel: partial or full name of the event type for which we want to retrieve uri
+        """
+        return await self._getCachedUri("getEventTypeUri", [eventTypeLabel], lambda: self.suggestEventTypes(eventTypeLabel))
+
+
+    async def warmUpUriCache(self, labels: List[str], method: str = "getConceptUri", maxParallel: Union[int, None] = None, **kwargs):
+        """
+        resolve the labels using one of the get*Uri() methods, at most maxParallel of them at the same time, and store the
+        uris in the uri cache. See EventRegistry.warmUpUriCache()
+        """
+        assert method in self._URI_METHODS, "method should be one of %s" % self._URI_METHODS
+        return await self._resolveUris(method, labels, maxParallel, kwargs)
+
+
+    async def resolveConceptUris(self, conceptLabels: List[str], lang: str = "eng", sources: Union[str, List[str]] = ["concepts"], maxParallel: Union[int, None] = None):
+        """
+        return the concept uris that best match the given labels, resolving up to maxParallel labels at the same time.
+        See EventRegistry.resolveConceptUris()
+        """
+        return await self._resolveUris("getConceptUri", conceptLabels, maxParallel, {"lang": lang, "sources": sources})
+
+
+    async def resolveLocationUris(self, locationLabels: List[str], lang: str = "eng", sources: Union[str, List[str]] = ["place", "country"], countryUri: Union[str, None] = None, maxParallel: Union[int, None] = None):
+        """
+        return the location uris that best match the given labels. See EventRegistry.resolveLocationUris()
+        """
+        return await self._resolveUris("getLocationUri", locationLabels, maxParallel, {"lang": lang, "sources": sources, "countryUri": countryUri})
+
+
+    async def resolveSourceUris(self, sourceNames: List[str], dataType: Union[str, List[str]] = ["news", "pr", "blog"], maxParallel: Union[int, None] = None):
+        """
+        return the news source uris that best match the given source names. See EventRegistry.resolveSourceUris()
+        """
+        return await self._resolveUris("getNewsSourceUri", sourceNames, maxParallel, {"dataType": dataType})
+
+
+    async def resolveAuthorUris(self, authorNames: List[str], maxParallel: Union[int, None] = None):
+        """
+        return the author uris that best match the given author names. See EventRegistry.resolveAuthorUris()
+        """
+        return await self._resolveUris("getAuthorUri", authorNames, maxParallel, {})
+
+
+    #
+    # internal methods
+
+    def _requireSync(self, caller: str):
+        raise TypeError("%s reads the results of the requests synchronously and can not be used with AsyncEventRegistry. Use an instance of EventRegistry instead" % caller)
+
+
+    async def _resolveUris(self, method: str, labels: List[str], maxParallel: Union[int, None], kwargs: dict) -> ResolvedUris:
+        """
+        resolve each of the unique labels by calling the get*Uri() coroutine. maxParallel worker tasks take the labels one
+        after another, so the number of tasks doesn't depend on the number of labels
+        """
+        assert isinstance(labels, (list, tuple)), "labels should be a list of strings"
+        uniqueLabels = list(dict.fromkeys(labels))
+        getUri = getattr(self, method)
+        uris = {}
+        errors = {}
+        remaining = iter(uniqueLabels)
+
+        async def worker():
+            for label in remaining:
+                try:
+                    uris[label] = await getUri(label, **kwargs)
+                except Exception as ex:
+                    uris[label] = None
+                    errors[label] = ex
+
+        maxParallel = min(maxParallel or self._maxConcurrentRequests, len(uniqueLabels))
+        await asyncio.gather(*[worker() for _ in range(maxParallel)])
+        if len(errors) > 0:
+            logger.warning("Failed to resolve %d of the %d labels using %s(). The first error: %s", len(errors), len(uniqueLabels), method, next(iter(errors.values())))
+        return ResolvedUris(((label, uris[label]) for label in uniqueLabels), errors)
+
+
+    async def _getCachedUri(self, method: str, args: List, suggest, propName: str = "uri"):
+        """
+        return the uri for the label from the uri cache or resolve it using the suggest coroutine. The uris stored in a
+        file are read and written in an executor thread, so that the event loop is not blocked
+        """
+        if self._uriCache is None:
+            return self._getFirstMatchProperty(await suggest(), propName)
+        key = UriCache.getKey(method, args)
+        loop = asyncio.get_running_loop()
+        found, uri = self._uriCache.getFromMemory(key)
+        if not found and self._uriCache.hasFile():
+            found, uri = await loop.run_in_executor(None, self._uriCache.get, key)
+        if found:
+            return uri
+        matches = await suggest()
+        uri = self._getFirstMatchProperty(matches, propName)
+        if isinstance(matches, list):
+            if self._uriCache.hasFile():
+                await loop.run_in_executor(None, self._uriCache.set, key, uri)
+            else:
+                self._uriCache.set(key, uri)
+        return uri
+
+
+    def _getAsyncSession(self):
+        """return the aiohttp session. create it if it doesn't exist yet"""
+        if self._asyncSession is None:
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit = self._maxConcurrentRequests)
+            self._asyncSession = aiohttp.ClientSession(connector = connector, timeout = aiohttp.ClientTimeout(total = self._requestTimeout))
+        return self._asyncSession
+
+
+    async def _makeRequest(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None], allowUseOfArchive: Union[bool, None], decode: bool):
+        """
+        make the request for jsonRequest() and jsonRequestRaw(). If a request coalescer is used, the tasks that make an identical
+        read-only request at the same time wait for the first one and get its result (and its headers)
+        """
+        if self._requestCoalescer is None or methodUrl not in self._COALESCED_PATHS:
+            return await self._sendRequest(methodUrl, paramDict, customLogFName, allowUseOfArchive, decode)
+        decoded = []
+
+        async def sendRequest():
+            data = await self._sendRequest(methodUrl, paramDict, customLogFName, allowUseOfArchive, decode = False)
+            return self._getCoalescedResult(data, decode, decoded)
+
+        data, state, _ = await self._requestCoalescer.doAsync(self._getCoalescingKey(methodUrl, paramDict, allowUseOfArchive),
+            sendRequest, canMemoize = lambda result: result[2])
+        self._setRequestState(state)
+        return self._decodeCoalescedResult(data, decode, decoded)
+
+
+    async def _sendRequest(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None], allowUseOfArchive: Union[bool, None], decode: bool):
+        """send the request (respecting the rate limiter) and return the response"""
+        state = self._resetRequestState()
+        await self._sleepIfNecessaryAsync()
+        self._logRequest(methodUrl, paramDict, customLogFName)
+        paramDict = self._prepareRequestParams(paramDict, allowUseOfArchive)
+        return await self._postWithRetries(self._host + methodUrl, paramDict, state, processHeaders = True, decode = decode)
+
+
+    async def _postWithRetries(self, url: str, paramDict: dict, state, processHeaders: bool, decode: bool = True):
+        """
+        post the paramDict to the url and return the parsed json response. repeat the request in case of failures
+        @param url: full url to which to make the request
+        @param paramDict: the parameters to send
+        @param state: object in which to store the headers and the exception of the request
+        @param processHeaders: should the response headers be checked for warnings and token usage
+        @param decode: if False, the body of the response is returned without parsing it
+        """
+        session = self._getAsyncSession()
+        host = urllib.parse.urlsplit(url).netloc
+        body = self._jsonCodec.encode(paramDict)
+        tryCount = 0
+        while True:
+            tryCount += 1
+            # fail fast if the host is known to be down
+            isProbe = self._circuitBreaker is not None and self._circuitBreaker.beforeRequest(host)
+            state.statusCode = None
+            try:
+                respData = await self._post(session, host, url, body, state, isProbe)
+                # if we got some error codes print the error and repeat the request after a short time period
+                if state.statusCode != 200:
+                    raise Exception(respData.decode("utf-8", errors = "replace"))
+                if processHeaders:
+                    self._processResponseHeaders(state.headers, state)
+                return self._jsonCodec.decode(respData) if decode else respData
+            except Exception as ex:
+                delay = self._getRetryDelay(url, paramDict, state, ex, tryCount)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        raise state.exception or Exception("No valid return data provided")
+
+
+    async def _post(self, session, host: str, url: str, body: bytes, state, isProbe: bool = False):
+        """
+        make a single post request with the json encoded body while occupying a slot of the concurrency controller.
+        Store the status code and headers in the state and return the body of the response
+        @param isProbe: is the request a probe of a half-open circuit. The probe is released when the request finishes,
+            also when the task is cancelled while waiting for a free slot
+        """
+        try:
+            await self._concurrencyController.acquireAsync()
+            startTime = time.time()
+            statusCode = None
+            headers = None
+            try:
+                async with session.post(url, data = body, headers = {"Content-Type": "application/json"}) as respInfo:
+                    statusCode = respInfo.status
+                    headers = respInfo.headers
+                    state.statusCode = statusCode
+                    state.headers = headers
+                    return await respInfo.read()
+            finally:
+                self._concurrencyController.release()
+                self._recordRequestOutcome(host, time.time() - startTime, statusCode, headers)
+        finally:
+            if isProbe:
+                self._circuitBreaker.releaseProbe(host)
+
+
+    async def _sleepIfNecessaryAsync(self):
+        """ensure that queries are not made too fast without blocking the event loop. Remember how long the caller had to wait"""
+        if self._rateLimiter is not None:
+            self._getRequestState().rateLimiterWaitTime = await self._rateLimiter.acquireAsync()
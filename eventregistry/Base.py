@@ -2,9 +2,9 @@
 utility classes for Event Registry
 """
 
-import six, warnings, os, sys, re, datetime, time
+import six, warnings, os, sys, re, datetime, time, json
 from eventregistry.Logger import logger
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Tuple
 
 mainLangs = ["eng", "deu", "zho", "slv", "spa"]
 allLangs = [ "eng", "deu", "spa", "cat", "por", "ita", "fra", "rus", "ara", "tur", "zho", "slv", "hrv", "srp" ]
@@ -41,33 +41,179 @@ def tryParseInt(s, base=10, val=None):
         return val
 
 
+def getQueryDateRange(params: dict) -> Tuple[Union[str, None], Union[str, None]]:
+    """
+    return the range of publishing dates that the query (encoded query parameters) is limited to. The dateStart and dateEnd
+    parameters are considered, including the ones in the complex query provided in the "query" parameter (see initWithComplexQuery())
+    @param params: the query parameters, as returned by query._getQueryParams()
+    @returns: tuple (dateStart, dateEnd) with dates in YYYY-MM-DD format. None is returned for an unbounded side of the range
+    """
+    starts, ends = [], []
+    dateStart, dateEnd = _getQueryObjDateRange(params)
+    if dateStart is not None:
+        starts.append(dateStart)
+    if dateEnd is not None:
+        ends.append(dateEnd)
+    complexQuery = params.get("query")
+    if isinstance(complexQuery, six.string_types):
+        try:
+            complexQuery = json.loads(complexQuery)
+        except ValueError:
+            complexQuery = None
+    if isinstance(complexQuery, dict):
+        dateStart, dateEnd = _getQueryObjDateRange(complexQuery)
+        if dateStart is not None:
+            starts.append(dateStart)
+        if dateEnd is not None:
+            ends.append(dateEnd)
+    return (max(starts) if starts else None, min(ends) if ends else None)
+
+
+def _getQueryObjDateRange(obj) -> Tuple[Union[str, None], Union[str, None]]:
+    """
+    return the (dateStart, dateEnd) range of a query object. The conditions in "$and" all have to hold, so the range is the
+    intersection of the ranges of the items, while the range of "$or" items is their union (unbounded if any of the items is unbounded)
+    """
+    if not isinstance(obj, dict):
+        return (None, None)
+    starts, ends = [], []
+    if obj.get("dateStart"):
+        starts.append(str(obj["dateStart"])[:10])
+    if obj.get("dateEnd"):
+        ends.append(str(obj["dateEnd"])[:10])
+    if isinstance(obj.get("$query"), dict):
+        dateStart, dateEnd = _getQueryObjDateRange(obj["$query"])
+        if dateStart is not None:
+            starts.append(dateStart)
+        if dateEnd is not None:
+            ends.append(dateEnd)
+    if isinstance(obj.get("$and"), list):
+        ranges = [_getQueryObjDateRange(item) for item in obj["$and"]]
+        starts.extend([dateStart for dateStart, _ in ranges if dateStart is not None])
+        ends.extend([dateEnd for _, dateEnd in ranges if dateEnd is not None])
+    if isinstance(obj.get("$or"), list) and len(obj["$or"]) > 0:
+        ranges = [_getQueryObjDateRange(item) for item in obj["$or"]]
+        if all(dateStart is not None for dateStart, _ in ranges):
+            starts.append(min(dateStart for dateStart, _ in ranges))
+        if all(dateEnd is not None for _, dateEnd in ranges):
+            ends.append(max(dateEnd for _, dateEnd in ranges))
+    return (max(starts) if starts else None, min(ends) if ends else None)
+
+
+def limitQueryDateRange(params: dict, dateStart: Union[str, None] = None, dateEnd: Union[str, None] = None) -> dict:
+    """
+    return a copy of the query parameters that is additionally limited to the given range of publishing dates.
+    In a complex query (see initWithComplexQuery()) the date condition is added to the "$query" part, while the "$filter" part is left unchanged
+    @param params: the query parameters, as returned by query._getQueryParams()
+    @param dateStart: date in YYYY-MM-DD format or None if the start of the range should not be limited
+    @param dateEnd: date in YYYY-MM-DD format or None if the end of the range should not be limited
+    """
+    params = dict(params)
+    complexQuery = params.get("query")
+    if complexQuery is None:
+        if dateStart is not None:
+            params["dateStart"] = max(str(params.get("dateStart") or dateStart), dateStart)
+        if dateEnd is not None:
+            params["dateEnd"] = min(str(params.get("dateEnd") or dateEnd), dateEnd)
+        return params
+    if isinstance(complexQuery, six.string_types):
+        complexQuery = json.loads(complexQuery)
+    condition = {}
+    if dateStart is not None:
+        condition["dateStart"] = dateStart
+    if dateEnd is not None:
+        condition["dateEnd"] = dateEnd
+    complexQuery = dict(complexQuery)
+    complexQuery["$query"] = { "$and": [complexQuery.get("$query", {}), condition] }
+    params["query"] = json.dumps(complexQuery)
+    return params
+
+
 class Struct(object):
     """
-    helper class for converting dict to a native python object
+    helper class for accessing a dict (e.g. a response) as a native python object:
     instead of a["b"]["c"] we can write a.b.c
+
+    The view is lazy: the dict is not copied and the nested dicts and lists are wrapped only when they are accessed
+    for the first time, so wrapping a large response doesn't create an object for each of its parts. The nested
+    lists are returned as regular lists (of Struct objects for the dicts in them)
     """
+    __slots__ = ("_data", "_wrapped")
+
     def __init__(self, data: dict):
-        for name, value in data.items():
-            setattr(self, name, self._wrap(value))
+        object.__setattr__(self, "_data", data)
+        # key -> the wrapped nested dict or list, so that the same object is returned on every access
+        object.__setattr__(self, "_wrapped", {})
 
 
-    def _wrap(self, value):
-        if isinstance(value, (tuple, list, set, frozenset)):
-            return type(value)([self._wrap(v) for v in value])
-        else:
-            return Struct(value) if isinstance(value, dict) else value
+    def __getattr__(self, name):
+        # only called for the names that are not attributes of the class
+        if name in Struct.__slots__:
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+    def __setattr__(self, name, value):
+        self._wrapped.pop(name, None)
+        self._data[name] = value
+
+
+    def __delattr__(self, name):
+        self._wrapped.pop(name, None)
+        try:
+            del self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+    def __getitem__(self, key):
+        """access the values also by key (e.g. for the keys that are not valid python names)"""
+        if key in self._wrapped:
+            return self._wrapped[key]
+        value = self._data[key]
+        if isinstance(value, (dict, list, tuple, set, frozenset)):
+            value = _wrapStructValue(value)
+            self._wrapped[key] = value
+        return value
+
+
+    def __repr__(self):
+        return "Struct(%r)" % self._data
+
+
+    def __reduce__(self):
+        # the attributes are stored in the dict, so copying and pickling use the dict as well
+        return (Struct, (self._data,))
 
 
     # does the object have the key
     def has(self, key):
-        return hasattr(self, key)
+        return key in self._data
+
+
+    def toDict(self) -> dict:
+        """return the underlying dict. The changes made to the lists returned by the Struct are not included in it"""
+        return self._data
+
+
+
+def _wrapStructValue(value):
+    """return the Struct view for dicts, a list (tuple, set) with the wrapped items for lists and other values unchanged"""
+    if isinstance(value, dict):
+        return Struct(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return type(value)([_wrapStructValue(v) for v in value])
+    return value
 
 
 
 def createStructFromDict(data):
-    """method to convert a list or dict to a native python object"""
+    """method to convert a list or dict to a native python object. The dicts are not copied (see Struct)"""
     if isinstance(data, list):
-        return type(data)([createStructFromDict(v) for v in data])
+        return type(data)([_wrapStructValue(v) for v in data])
     else:
         return Struct(data)
 
@@ -0,0 +1,360 @@
+"""
+DataLoader-style batching of the info requests (GetConceptInfo, GetSourceInfo, GetCategoryInfo, GetSourceStats).
+
+The info requests accept a list of uris, but the application code often asks for one entity at a time (e.g. for each
+article that is being enriched). A loader collects the individual requests made within a short time window (batchDelay)
+or until maxBatchSize uris are collected, makes a single request for all of them and resolves the future of each caller.
+The returned entities are kept in a (bounded) cache, so an entity is requested only once. Usage:
+
+    loader = InfoLoader(er, GetSourceInfo)
+    futures = [loader.load(art["source"]["uri"]) for art in articles]     # a request per 100 unique sources
+    sources = [future.result() for future in futures]
+
+    # or simply
+    sources = loader.getMany([art["source"]["uri"] for art in articles])
+
+With AsyncEventRegistry use AsyncInfoLoader, whose load() returns an asyncio future that can be awaited by each task.
+"""
+import threading, asyncio, collections, concurrent.futures
+from typing import Union, List
+from eventregistry.ReturnInfo import ReturnInfo
+from eventregistry.Info import GetConceptInfo, GetSourceInfo, GetCategoryInfo, GetSourceStats
+
+
+class InfoLoaderBase(object):
+    """
+    the batching and caching logic shared by InfoLoader and AsyncInfoLoader. Subclasses create the futures and
+    schedule and execute the batches
+    """
+    # the query classes that can be used with a loader
+    QUERY_CLASSES = [GetConceptInfo, GetSourceInfo, GetCategoryInfo, GetSourceStats]
+
+    def __init__(self, er,
+                 queryClass = GetConceptInfo,
+                 returnInfo: Union[ReturnInfo, None] = None,
+                 maxBatchSize: int = 100,
+                 batchDelay: float = 0.01,
+                 cacheSize: int = 10000):
+        """
+        @param er: instance of EventRegistry (for InfoLoader) or AsyncEventRegistry (for AsyncInfoLoader)
+        @param queryClass: the class of the info requests: GetConceptInfo, GetSourceInfo, GetCategoryInfo or GetSourceStats
+        @param returnInfo: what details about the entities should be returned. If None, the defaults are used. Not used by GetSourceStats
+        @param maxBatchSize: the max number of uris in a single request. When reached, the request is made immediately
+        @param batchDelay: the number of seconds to wait for more uris after the first uri of a batch was requested
+        @param cacheSize: the max number of returned entities to keep. When exceeded, the least recently used ones are removed.
+            Use 0 to not cache the entities
+        """
+        assert queryClass in self.QUERY_CLASSES, "queryClass should be one of GetConceptInfo, GetSourceInfo, GetCategoryInfo or GetSourceStats"
+        assert returnInfo is None or queryClass is not GetSourceStats, "GetSourceStats doesn't accept returnInfo"
+        assert maxBatchSize > 0, "maxBatchSize should be a positive number"
+        assert batchDelay >= 0, "batchDelay should not be negative"
+        assert cacheSize >= 0, "cacheSize should not be negative"
+        self._er = er
+        self._queryClass = queryClass
+        self._returnInfo = returnInfo
+        self._maxBatchSize = maxBatchSize
+        self._batchDelay = batchDelay
+        self._cacheSize = cacheSize
+        self._lock = threading.Lock()
+        self._cache = collections.OrderedDict()
+        # uri -> future for the uris waiting to be requested and for the uris in the requests that are in progress
+        self._pending = {}
+        self._inFlight = {}
+        # the timer (or asyncio handle) that dispatches the waiting uris after batchDelay
+        self._dispatchHandle = None
+        self._closed = False
+        self._loadCount = 0
+        self._cacheHitCount = 0
+        self._batchCount = 0
+
+
+    def getStats(self) -> dict:
+        """return the number of loaded uris, how many of them were served from the cache and the number of made requests"""
+        with self._lock:
+            return {
+                "loadCount": self._loadCount,
+                "cacheHitCount": self._cacheHitCount,
+                "batchCount": self._batchCount,
+                "cachedCount": len(self._cache)
+            }
+
+
+    def clearCache(self):
+        """remove the entities from the cache"""
+        with self._lock:
+            self._cache.clear()
+
+
+    def _load(self, uri: str):
+        """return the future for the uri. Start a batch when the uri is the first one waiting or when the batch is full"""
+        assert isinstance(uri, str), "uri should be a string"
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The loader is closed")
+            self._loadCount += 1
+            if uri in self._cache:
+                self._cache.move_to_end(uri)
+                self._cacheHitCount += 1
+                return self._createDoneFuture(self._cache[uri])
+            future = self._pending.get(uri) or self._inFlight.get(uri)
+            if future is not None:
+                return future
+            future = self._createFuture()
+            self._pending[uri] = future
+            if len(self._pending) >= self._maxBatchSize:
+                self._submitPending()
+            elif self._dispatchHandle is None:
+                self._dispatchHandle = self._scheduleDispatch()
+        return future
+
+
+    def _dispatchPending(self):
+        """called after batchDelay - request the uris that are waiting"""
+        with self._lock:
+            self._submitPending()
+
+
+    def _closePending(self):
+        """reject the new uris, cancel the scheduled dispatch and request the uris that are waiting"""
+        with self._lock:
+            self._closed = True
+            self._submitPending()
+
+
+    def _submitPending(self):
+        """
+        move the waiting uris to the requests in progress and submit the request. Has to be called while holding self._lock,
+        so that no batch is submitted after the loader is closed
+        """
+        if self._dispatchHandle is not None:
+            self._dispatchHandle.cancel()
+            self._dispatchHandle = None
+        if len(self._pending) == 0:
+            return
+        batch = self._pending
+        self._pending = {}
+        self._inFlight.update(batch)
+        self._batchCount += 1
+        self._submitBatch(batch)
+
+
+    def _createQuery(self, uris: List[str]):
+        if self._returnInfo is not None:
+            return self._queryClass(uris, returnInfo = self._returnInfo)
+        return self._queryClass(uris)
+
+
+    def _getResults(self, batch: dict, res):
+        """
+        return for each uri in the batch the entity from the response (None if it was not returned) and cache the entities.
+        Raise an exception if the response reports an error
+        """
+        if isinstance(res, dict) and "error" in res:
+            raise Exception(res["error"])
+        entities = {}
+        items = res.items() if isinstance(res, dict) else enumerate(res or [])
+        for key, item in items:
+            if isinstance(item, dict):
+                entities[item.get("uri", key)] = item
+        results = dict((uri, entities.get(uri)) for uri in batch)
+        with self._lock:
+            for uri in batch:
+                self._inFlight.pop(uri, None)
+                if results[uri] is not None and self._cacheSize > 0:
+                    self._cache[uri] = results[uri]
+                    self._cache.move_to_end(uri)
+            while len(self._cache) > self._cacheSize:
+                self._cache.popitem(last = False)
+        return results
+
+
+    def _failBatch(self, batch: dict):
+        with self._lock:
+            for uri in batch:
+                self._inFlight.pop(uri, None)
+
+
+    def _createFuture(self):
+        raise NotImplementedError
+
+
+    def _createDoneFuture(self, result):
+        future = self._createFuture()
+        future.set_result(result)
+        return future
+
+
+    def _scheduleDispatch(self):
+        """call _dispatchPending() after batchDelay seconds and return the object whose cancel() method cancels the call"""
+        raise NotImplementedError
+
+
+    def _submitBatch(self, batch: dict):
+        """start the request for the batch without waiting for it. Called while holding self._lock"""
+        raise NotImplementedError
+
+
+
+class InfoLoader(InfoLoaderBase):
+    """
+    batching loader for EventRegistry. The requests are made by a pool of maxParallel threads, so load() can be called
+    from any number of threads
+    """
+    def __init__(self, er,
+                 queryClass = GetConceptInfo,
+                 returnInfo: Union[ReturnInfo, None] = None,
+                 maxBatchSize: int = 100,
+                 batchDelay: float = 0.01,
+                 cacheSize: int = 10000,
+                 maxParallel: Union[int, None] = None):
+        """
+        @param maxParallel: the number of requests that can be made at the same time. If None, maxConcurrentRequests of er is used
+        See InfoLoaderBase for the other parameters
+        """
+        er._requireSync("InfoLoader")
+        InfoLoaderBase.__init__(self, er, queryClass = queryClass, returnInfo = returnInfo, maxBatchSize = maxBatchSize, batchDelay = batchDelay, cacheSize = cacheSize)
+        self._executor = concurrent.futures.ThreadPoolExecutor(maxParallel or er._maxConcurrentRequests, thread_name_prefix = "eventregistry-loader")
+
+
+    def load(self, uri: str) -> concurrent.futures.Future:
+        """
+        return a future that will contain the entity with the given uri (or None if it doesn't exist)
+        """
+        return self._load(uri)
+
+
+    def get(self, uri: str):
+        """return the entity with the given uri (or None if it doesn't exist). Waits for the batch with the uri"""
+        return self._load(uri).result()
+
+
+    def getMany(self, uris: List[str]) -> List:
+        """return the entities with the given uris (None for the ones that don't exist) using as few requests as possible"""
+        futures = [self._load(uri) for uri in uris]
+        # don't wait for the time window - the list is complete
+        self._dispatchPending()
+        return [future.result() for future in futures]
+
+
+    def close(self):
+        """request the waiting uris and stop the threads when the requests complete. The loader can't be used after it is closed"""
+        self._closePending()
+        self._executor.shutdown(wait = True)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+    def _createFuture(self):
+        return concurrent.futures.Future()
+
+
+    def _scheduleDispatch(self):
+        timer = threading.Timer(self._batchDelay, self._dispatchPending)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+
+    def _submitBatch(self, batch: dict):
+        self._executor.submit(self._execBatch, batch)
+
+
+    def _execBatch(self, batch: dict):
+        try:
+            results = self._getResults(batch, self._er.execQuery(self._createQuery(list(batch))))
+        except Exception as ex:
+            self._failBatch(batch)
+            for future in batch.values():
+                future.set_exception(ex)
+            return
+        for uri, future in batch.items():
+            future.set_result(results[uri])
+
+
+
+class AsyncInfoLoader(InfoLoaderBase):
+    """
+    batching loader for AsyncEventRegistry. It has to be used from a single event loop
+    """
+    def __init__(self, er,
+                 queryClass = GetConceptInfo,
+                 returnInfo: Union[ReturnInfo, None] = None,
+                 maxBatchSize: int = 100,
+                 batchDelay: float = 0.01,
+                 cacheSize: int = 10000):
+        """
+        See InfoLoaderBase for the parameters
+        """
+        assert asyncio.iscoroutinefunction(er.execQuery), "AsyncInfoLoader requires an AsyncEventRegistry instance. Use InfoLoader with EventRegistry"
+        InfoLoaderBase.__init__(self, er, queryClass = queryClass, returnInfo = returnInfo, maxBatchSize = maxBatchSize, batchDelay = batchDelay, cacheSize = cacheSize)
+        # references to the running requests, so that the tasks are not garbage collected
+        self._tasks = set()
+
+
+    def load(self, uri: str) -> asyncio.Future:
+        """
+        return an asyncio future that will contain the entity with the given uri (or None if it doesn't exist).
+        The future is shared by all the callers that load the same uri, so wrap it in asyncio.shield() if the waiting task can be cancelled
+        """
+        return self._load(uri)
+
+
+    async def get(self, uri: str):
+        """return the entity with the given uri (or None if it doesn't exist)"""
+        return await asyncio.shield(self._load(uri))
+
+
+    async def getMany(self, uris: List[str]) -> List:
+        """return the entities with the given uris (None for the ones that don't exist) using as few requests as possible"""
+        futures = [self._load(uri) for uri in uris]
+        self._dispatchPending()
+        return list(await asyncio.gather(*[asyncio.shield(future) for future in futures]))
+
+
+    async def close(self):
+        """request the waiting uris and wait for the requests to complete. The loader can't be used after it is closed"""
+        self._closePending()
+        await asyncio.gather(*list(self._tasks))
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+    def _createFuture(self):
+        return asyncio.get_running_loop().create_future()
+
+
+    def _scheduleDispatch(self):
+        return asyncio.get_running_loop().call_later(self._batchDelay, self._dispatchPending)
+
+
+    def _submitBatch(self, batch: dict):
+        task = asyncio.get_running_loop().create_task(self._execBatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+    async def _execBatch(self, batch: dict):
+        try:
+            results = self._getResults(batch, await self._er.execQuery(self._createQuery(list(batch))))
+        except Exception as ex:
+            self._failBatch(batch)
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(ex)
+            return
+        for uri, future in batch.items():
+            # the future of a caller that was cancelled is already done
+            if not future.done():
+                future.set_result(results[uri])
@@ -0,0 +1,461 @@
+"""
+caching of the responses returned by Event Registry.
+
+ResponseCache stores the responses in a SQLite database on disk. The responses are compressed, the entries can expire
+after a given number of seconds (TTL) and the least recently used entries are removed when the size of the cache
+exceeds the given limit. A cache can be provided to the EventRegistry constructor using the responseCache parameter
+in which case the results of execQuery() are served from the cache when possible.
+
+A CachePolicy determines for how long each response is cached. DateAwareCachePolicy uses the date filters of the query:
+the results of queries about the past don't change and can be kept forever, while the queries that include today are
+not cached (or cached only briefly).
+
+UriCache keeps the uris returned by the get*Uri() methods (getConceptUri(), getLocationUri(), ...) in memory and
+optionally in a SQLite file, so that the same labels don't have to be resolved with a request every time.
+"""
+import json, time, zlib, sqlite3, hashlib, threading, datetime, collections
+from typing import Union, List, Tuple
+from eventregistry.Base import getQueryDateRange
+from eventregistry.JsonCodec import JsonCodec, getDefaultJsonCodec
+
+
+class CachePolicy(object):
+    """
+    determines for how long the response for a request should be cached. This policy uses the same ttl for all the requests
+    """
+    # ttl value that means that the response should not be cached
+    NO_CACHE = 0
+    # ttl value that means that the cached response never expires
+    NEVER_EXPIRE = None
+
+    def __init__(self, ttl: Union[float, None] = 24 * 3600):
+        """
+        @param ttl: number of seconds after which the cached responses expire. Use None for responses that never expire and 0 to disable caching
+        """
+        assert ttl is None or ttl >= 0, "ttl should be None or a non-negative number"
+        self._ttl = ttl
+
+
+    def getTtl(self, path: str, params: dict) -> Union[float, None]:
+        """
+        return for how many seconds the response for the request should be cached
+        @param path: the path of the request (e.g. "/api/v1/article")
+        @param params: the parameters of the request
+        @returns: number of seconds, CachePolicy.NEVER_EXPIRE (None) or CachePolicy.NO_CACHE (0)
+        """
+        return self._ttl
+
+
+
+class DateAwareCachePolicy(CachePolicy):
+    """
+    cache policy that uses the date range of the query (the dateStart/dateEnd parameters, including the ones in the
+    complex query) to decide for how long to cache the response:
+
+    - queries with dateEnd at least historicalAfterDays days in the past return results that don't change anymore -
+      their responses never expire
+    - queries with dateEnd in the last historicalAfterDays days (but before today) can still receive articles that
+      were published with a delay - their responses are cached for recentTtl seconds
+    - queries that include today (or have no dateEnd) change every minute - their responses are cached for liveTtl
+      seconds (by default they are not cached). The same applies to the queries for the recent activity
+    """
+    def __init__(self,
+                 historicalAfterDays: int = 2,
+                 recentTtl: Union[float, None] = 3600,
+                 liveTtl: Union[float, None] = 0):
+        """
+        @param historicalAfterDays: number of days after which the results for a date are considered final
+        @param recentTtl: number of seconds to cache the responses of queries that end in the last historicalAfterDays days
+        @param liveTtl: number of seconds to cache the responses of queries that include today. 0 means that they are not cached
+        """
+        assert historicalAfterDays >= 1, "historicalAfterDays should be at least 1"
+        CachePolicy.__init__(self, liveTtl)
+        self._historicalAfterDays = historicalAfterDays
+        self._recentTtl = recentTtl
+        self._liveTtl = liveTtl
+
+
+    def getTtl(self, path: str, params: dict) -> Union[float, None]:
+        # the recent activity depends on the time of the request
+        if any(key.startswith("recentActivity") for key in params):
+            return self.NO_CACHE
+        dateStart, dateEnd = getQueryDateRange(params)
+        if dateEnd is None:
+            return self._liveTtl
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        try:
+            daysAgo = (today - datetime.date.fromisoformat(dateEnd)).days
+        except ValueError:
+            return self._liveTtl
+        if daysAgo >= self._historicalAfterDays:
+            return self.NEVER_EXPIRE
+        if daysAgo >= 1:
+            return self._recentTtl
+        return self._liveTtl
+
+
+
+class ResponseCache(object):
+    """
+    persistent, size-bounded (LRU) cache of json responses stored in a SQLite database.
+    The same file can be used by several threads and processes.
+    """
+    def __init__(self,
+                 fileName: str,
+                 maxSize: int = 512 * 1024 * 1024,
+                 ttl: Union[float, None] = 24 * 3600,
+                 compressionLevel: int = 6,
+                 policy: Union[CachePolicy, None] = None,
+                 jsonCodec: Union[JsonCodec, None] = None):
+        """
+        @param fileName: path to the SQLite file where the responses are stored. The file is created if it doesn't exist.
+            Use ":memory:" for a cache that is not persisted
+        @param maxSize: the max number of bytes (of compressed responses) to keep in the cache. When exceeded, the least recently used entries are removed
+        @param ttl: the default number of seconds after which a cached response expires. Use None for responses that never expire
+        @param compressionLevel: zlib compression level (1 - fastest, 9 - smallest)
+        @param policy: instance of CachePolicy (such as DateAwareCachePolicy) that determines for how long the response for each
+            request is cached. If None, all the responses are cached for ttl seconds
+        @param jsonCodec: instance of JsonCodec used to encode and decode the cached responses. If None, getDefaultJsonCodec() is used
+        """
+        assert maxSize > 0, "maxSize should be a positive number"
+        assert ttl is None or ttl > 0, "ttl should be None or a positive number"
+        assert 1 <= compressionLevel <= 9, "compressionLevel should be between 1 and 9"
+        self._fileName = fileName
+        self._maxSize = maxSize
+        self._ttl = ttl
+        self._compressionLevel = compressionLevel
+        self._policy = policy or CachePolicy(ttl)
+        self._jsonCodec = jsonCodec or getDefaultJsonCodec()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(fileName, timeout = 60, check_same_thread = False, isolation_level = None)
+        if fileName != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, " +
+                           "createdAt REAL NOT NULL, expiresAt REAL, lastAccess REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responsesLastAccess ON responses (lastAccess)")
+        # the total size of the responses is kept up to date by triggers, so that it doesn't have to be computed on every write.
+        # Since the triggers are stored in the database, the size is correct also when the file is shared by several processes
+        self._conn.execute("CREATE TABLE IF NOT EXISTS totalSize (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO totalSize (id, size) SELECT 0, COALESCE(SUM(size), 0) FROM responses")
+        self._conn.execute("CREATE TRIGGER IF NOT EXISTS responsesInsert AFTER INSERT ON responses BEGIN " +
+                           "UPDATE totalSize SET size = size + NEW.size WHERE id = 0; END")
+        self._conn.execute("CREATE TRIGGER IF NOT EXISTS responsesDelete AFTER DELETE ON responses BEGIN " +
+                           "UPDATE totalSize SET size = size - OLD.size WHERE id = 0; END")
+        self._conn.execute("CREATE TRIGGER IF NOT EXISTS responsesUpdate AFTER UPDATE OF size ON responses BEGIN " +
+                           "UPDATE totalSize SET size = size - OLD.size + NEW.size WHERE id = 0; END")
+        self._hitCount = 0
+        self._missCount = 0
+        self._expiredCount = 0
+        self._writeCount = 0
+        self._evictionCount = 0
+        self._bytesRead = 0
+        self._bytesWritten = 0
+        self._uncompressedBytesRead = 0
+
+
+    @staticmethod
+    def getKey(path: str, params: dict, host: Union[str, None] = None) -> str:
+        """
+        compute the cache key for a request. The key is a hash of the host, the path and the canonical json representation
+        of the parameters (with sorted keys). The apiKey parameter is ignored so that the users can share the cache
+        @param path: the path of the request (e.g. "/api/v1/article")
+        @param params: the parameters of the request
+        @param host: the host to which the request is sent (e.g. "https://eventregistry.org"), so that the responses of
+            different servers (such as a test and the production server) are not mixed. If None, only the path and the parameters are used
+        """
+        params = dict((key, val) for key, val in (params or {}).items() if key != "apiKey")
+        canonical = json.dumps([path, params] if host is None else [host.rstrip("/"), path, params], sort_keys = True, separators = (",", ":"), ensure_ascii = False, default = str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+    def getTtl(self, path: str, params: dict) -> Union[float, None]:
+        """
+        return for how many seconds the response for the request should be cached, as determined by the cache policy.
+        0 (CachePolicy.NO_CACHE) means that the response should not be cached, None that it never expires
+        """
+        return self._policy.getTtl(path, params)
+
+
+    def get(self, key: str):
+        """
+        return the cached response for the key or None if the response is not in the cache or has expired
+        """
+        data = self.getRaw(key)
+        return self._jsonCodec.decode(data) if data is not None else None
+
+
+    def getRaw(self, key: str) -> Union[bytes, None]:
+        """
+        return the cached response for the key as utf-8 encoded json (without parsing it) or None if the response is not
+        in the cache or has expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expiresAt FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._missCount += 1
+                return None
+            value, expiresAt = row
+            if expiresAt is not None and expiresAt <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._missCount += 1
+                self._expiredCount += 1
+                return None
+            self._conn.execute("UPDATE responses SET lastAccess = ? WHERE key = ?", (now, key))
+            data = zlib.decompress(value)
+            self._hitCount += 1
+            self._bytesRead += len(value)
+            self._uncompressedBytesRead += len(data)
+        return data
+
+
+    def set(self, key: str, value, ttl: Union[float, None, bool] = True):
+        """
+        store the response in the cache
+        @param key: the key of the response, as returned by getKey()
+        @param value: the json serializable response
+        @param ttl: number of seconds after which the response expires. None if it should never expire.
+            If True, the ttl provided in the constructor is used
+        """
+        self.setRaw(key, self._jsonCodec.encode(value), ttl = ttl)
+
+
+    def setRaw(self, key: str, data: bytes, ttl: Union[float, None, bool] = True):
+        """
+        store the response that is already encoded as utf-8 json (e.g. the body returned by jsonRequestRaw()) in the cache
+        @param key: the key of the response, as returned by getKey()
+        @param data: the utf-8 encoded json response
+        @param ttl: see set()
+        """
+        if ttl is True:
+            ttl = self._ttl
+        data = zlib.compress(data, self._compressionLevel)
+        now = time.time()
+        expiresAt = now + ttl if ttl is not None else None
+        with self._lock:
+            # an upsert instead of INSERT OR REPLACE, since the rows deleted by REPLACE don't fire the delete trigger
+            self._conn.execute("INSERT INTO responses (key, value, size, createdAt, expiresAt, lastAccess) VALUES (?, ?, ?, ?, ?, ?) " +
+                               "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, createdAt = excluded.createdAt, " +
+                               "expiresAt = excluded.expiresAt, lastAccess = excluded.lastAccess",
+                               (key, sqlite3.Binary(data), len(data), now, expiresAt, now))
+            self._writeCount += 1
+            self._bytesWritten += len(data)
+            self._evictIfNecessary()
+
+
+    def delete(self, key: str):
+        """remove the response with the given key from the cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+
+    def clear(self):
+        """remove all the responses from the cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+
+    def removeExpired(self) -> int:
+        """
+        remove the expired responses from the cache
+        @returns: the number of removed responses
+        """
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM responses WHERE expiresAt IS NOT NULL AND expiresAt <= ?", (time.time(),))
+            self._expiredCount += cur.rowcount
+            return cur.rowcount
+
+
+    def getStats(self) -> dict:
+        """
+        return the number of hits and misses, the number of written and evicted responses, the number of bytes
+        read from and written to the cache (compressed) and the current number and size of the cached responses
+        """
+        with self._lock:
+            entryCount = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            size = self._getTotalSize()
+            requestCount = self._hitCount + self._missCount
+            return {
+                "hitCount": self._hitCount,
+                "missCount": self._missCount,
+                "hitRate": self._hitCount / requestCount if requestCount > 0 else 0.0,
+                "expiredCount": self._expiredCount,
+                "writeCount": self._writeCount,
+                "evictionCount": self._evictionCount,
+                "bytesRead": self._bytesRead,
+                "uncompressedBytesRead": self._uncompressedBytesRead,
+                "bytesWritten": self._bytesWritten,
+                "entryCount": entryCount,
+                "size": size
+            }
+
+
+    def close(self):
+        """close the connection to the database"""
+        with self._lock:
+            self._conn.close()
+
+
+    def _evictIfNecessary(self):
+        """remove the expired and then the least recently used responses until the cache fits into maxSize. Has to be called while holding self._lock"""
+        if self._getTotalSize() <= self._maxSize:
+            return
+        cur = self._conn.execute("DELETE FROM responses WHERE expiresAt IS NOT NULL AND expiresAt <= ?", (time.time(),))
+        self._expiredCount += cur.rowcount
+        size = self._getTotalSize()
+        if size <= self._maxSize:
+            return
+        toRemove = []
+        for key, entrySize in self._conn.execute("SELECT key, size FROM responses ORDER BY lastAccess ASC"):
+            if size <= self._maxSize:
+                break
+            toRemove.append((key,))
+            size -= entrySize
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", toRemove)
+        self._evictionCount += len(toRemove)
+
+
+    def _getTotalSize(self) -> int:
+        """return the total size of the cached responses, as maintained by the triggers. Has to be called while holding self._lock"""
+        return self._conn.execute("SELECT size FROM totalSize WHERE id = 0").fetchone()[0]
+
+
+
+class UriCache(object):
+    """
+    cache of the uris returned by the get*Uri() methods (getConceptUri(), getLocationUri(), getCategoryUri(), ...).
+    The recently used uris are kept in memory (with LRU eviction) and, if a file name is provided, all of them are also
+    stored in a SQLite file, so that they are available after a restart. The labels for which no uri was found are cached as well.
+    The same instance can be shared by several threads and EventRegistry instances
+    """
+    def __init__(self,
+                 maxSize: int = 10000,
+                 fileName: Union[str, None] = None,
+                 ttl: Union[float, None] = 30 * 24 * 3600,
+                 cacheMisses: bool = True):
+        """
+        @param maxSize: the max number of uris to keep in memory. When exceeded, the least recently used ones are removed from memory
+        @param fileName: path to the SQLite file where the uris are stored. The file is created if it doesn't exist.
+            If None, the uris are only kept in memory
+        @param ttl: the number of seconds after which a cached uri expires. Use None for uris that never expire
+        @param cacheMisses: should it be remembered that no uri was found for a label
+        """
+        assert maxSize > 0, "maxSize should be a positive number"
+        assert ttl is None or ttl > 0, "ttl should be None or a positive number"
+        self._maxSize = maxSize
+        self._ttl = ttl
+        self._cacheMisses = cacheMisses
+        self._lock = threading.Lock()
+        # key -> (uri, expiration time), from the least to the most recently used
+        self._memory = collections.OrderedDict()
+        self._conn = None
+        if fileName is not None:
+            self._conn = sqlite3.connect(fileName, timeout = 60, check_same_thread = False, isolation_level = None)
+            if fileName != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS uris (key TEXT PRIMARY KEY, uri TEXT, expiresAt REAL)")
+        self._memoryHitCount = 0
+        self._fileHitCount = 0
+        self._missCount = 0
+        self._evictionCount = 0
+
+
+    @staticmethod
+    def getKey(method: str, args: List) -> str:
+        """
+        compute the cache key for a lookup
+        @param method: the name of the method that resolves the label (e.g. "getConceptUri")
+        @param args: the label and the other arguments of the method that determine the result (language, sources, ...)
+        """
+        return json.dumps([method] + list(args), separators = (",", ":"), ensure_ascii = False, default = str)
+
+
+    def hasFile(self) -> bool:
+        """are the uris also stored in a file"""
+        return self._conn is not None
+
+
+    def get(self, key: str) -> Tuple[bool, Union[str, None]]:
+        """
+        return (True, uri) if the key is in the cache (the uri is None if no uri was found for the label) or (False, None) if it is not
+        """
+        found, uri = self.getFromMemory(key)
+        if found or self._conn is None:
+            return found, uri
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT uri, expiresAt FROM uris WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self._missCount += 1
+                return False, None
+            self._fileHitCount += 1
+            self._setInMemory(key, row[0], row[1])
+            return True, row[0]
+
+
+    def getFromMemory(self, key: str) -> Tuple[bool, Union[str, None]]:
+        """
+        same as get() but only checks the uris kept in memory. Does not count a miss if the uris are also stored in a file
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                self._memory.move_to_end(key)
+                self._memoryHitCount += 1
+                return True, entry[0]
+            if entry is not None:
+                del self._memory[key]
+            if self._conn is None:
+                self._missCount += 1
+            return False, None
+
+
+    def set(self, key: str, uri: Union[str, None]):
+        """
+        store the uri (None if no uri was found for the label) for the key
+        """
+        if uri is None and not self._cacheMisses:
+            return
+        expiresAt = time.time() + self._ttl if self._ttl is not None else None
+        with self._lock:
+            self._setInMemory(key, uri, expiresAt)
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO uris (key, uri, expiresAt) VALUES (?, ?, ?)", (key, uri, expiresAt))
+
+
+    def clear(self):
+        """remove all the uris from the cache (also from the file)"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM uris")
+
+
+    def getStats(self) -> dict:
+        """return the number of lookups served from memory and from the file, the number of misses and the number of uris in memory and in the file"""
+        with self._lock:
+            return {
+                "memoryHitCount": self._memoryHitCount,
+                "fileHitCount": self._fileHitCount,
+                "missCount": self._missCount,
+                "evictionCount": self._evictionCount,
+                "memoryCount": len(self._memory),
+                "fileCount": self._conn.execute("SELECT COUNT(*) FROM uris").fetchone()[0] if self._conn is not None else 0
+            }
+
+
+    def close(self):
+        """close the connection to the file"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+    def _setInMemory(self, key: str, uri: Union[str, None], expiresAt: Union[float, None]):
+        """store the uri in memory and remove the least recently used uris if needed. Has to be called while holding self._lock"""
+        self._memory[key] = (uri, expiresAt)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._maxSize:
+            self._memory.popitem(last = False)
+            self._evictionCount += 1
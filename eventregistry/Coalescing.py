@@ -0,0 +1,195 @@
+"""
+coalescing of identical requests (single-flight).
+
+When many threads (or asyncio tasks) make the same request at the same time, for example when a dashboard refreshes
+and each widget calls GetCounts or suggestConcepts with the same parameters, only the first caller makes the http
+request and the others wait for it and receive the same result. Optionally the result is also remembered for a short
+time (memoTime) after the request completes, so the callers that arrive just after it don't repeat it either.
+
+A coalescer can be passed to the EventRegistry and AsyncEventRegistry constructors using the requestCoalescer parameter:
+    er = EventRegistry(apiKey = "...", requestCoalescer = RequestCoalescer(memoTime = 5))
+"""
+import time, threading, asyncio, collections
+from typing import Union, Callable
+
+
+class _Flight(object):
+    """a request that is in progress and the callers waiting for it"""
+    def __init__(self, future: Union[asyncio.Future, None] = None):
+        self.event = threading.Event()
+        self.future = future
+        self.result = None
+        self.exception = None
+
+
+
+class _FlightAbandoned(Exception):
+    """the caller making the request was cancelled (or interrupted), so the waiting callers have to make the request themselves"""
+
+
+
+class RequestCoalescer(object):
+    """
+    single-flight layer that makes sure that identical requests that are made at the same time result in a single
+    request. Used from threads with do() and from asyncio tasks with doAsync(). All the callers receive the same
+    result object, so the results should not be modified
+    """
+    def __init__(self, memoTime: float = 0, maxMemoItems: int = 1000):
+        """
+        @param memoTime: the number of seconds for which the result of a completed request is remembered and returned to
+            the callers that make the same request. If 0, only the requests that are in progress at the same time are coalesced
+        @param maxMemoItems: the maximum number of remembered results. When exceeded, the oldest results are forgotten
+        """
+        assert memoTime >= 0, "memoTime should not be negative"
+        assert maxMemoItems > 0, "maxMemoItems should be a positive number"
+        self._memoTime = memoTime
+        self._maxMemoItems = maxMemoItems
+        self._lock = threading.Lock()
+        self._flights = {}
+        # key -> (expiration time, result), in the order in which the results expire
+        self._memo = collections.OrderedDict()
+        self._requestCount = 0
+        self._coalescedCount = 0
+        self._memoHitCount = 0
+
+
+    def do(self, key, fn: Callable, canMemoize: Union[Callable, None] = None):
+        """
+        return the result of fn(). If a request with the same key is already in progress, wait for it and return its
+        result (or raise its exception) instead of calling fn()
+        @param key: hashable key that identifies the request (e.g. the path and the canonical parameters)
+        @param fn: function that makes the request
+        @param canMemoize: function that receives the result and returns False if the result should not be remembered
+            for memoTime seconds (e.g. because it is an error). If None, all the results are remembered
+        """
+        while True:
+            flight, isLeader, result = self._join(key)
+            if flight is None:
+                return result
+            if isLeader:
+                return self._lead(key, flight, fn, canMemoize)
+            flight.event.wait()
+            if not isinstance(flight.exception, _FlightAbandoned):
+                return self._getFlightResult(flight)
+
+
+    async def doAsync(self, key, fn: Callable, canMemoize: Union[Callable, None] = None):
+        """
+        asyncio version of do(). fn() should return the coroutine that makes the request
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            flight, isLeader, result = self._join(key, loop)
+            if flight is None:
+                return result
+            if isLeader:
+                return await self._leadAsync(key, flight, fn, canMemoize)
+            if flight.future is None or flight.future.get_loop() is not loop:
+                # the request is made by a thread or by a task on another event loop
+                await loop.run_in_executor(None, flight.event.wait)
+                if not isinstance(flight.exception, _FlightAbandoned):
+                    return self._getFlightResult(flight)
+                continue
+            try:
+                # the waiting caller can be cancelled without cancelling the shared request
+                return await asyncio.shield(flight.future)
+            except _FlightAbandoned:
+                pass
+
+
+    def getStats(self) -> dict:
+        """return the number of requests, how many of them waited for an identical request in progress, how many were served from the remembered results and how many requests are in progress"""
+        with self._lock:
+            return {
+                "requestCount": self._requestCount,
+                "coalescedCount": self._coalescedCount,
+                "memoHitCount": self._memoHitCount,
+                "inFlightCount": len(self._flights)
+            }
+
+
+    def clear(self):
+        """forget the remembered results"""
+        with self._lock:
+            self._memo.clear()
+
+
+    def _join(self, key, loop: Union[asyncio.AbstractEventLoop, None] = None):
+        """
+        return (None, False, result) if a remembered result can be used, otherwise the flight for the key and whether the
+        caller has to make the request (it is the first one)
+        """
+        with self._lock:
+            self._requestCount += 1
+            self._removeExpired()
+            if key in self._memo:
+                self._memoHitCount += 1
+                return None, False, self._memo[key][1]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._coalescedCount += 1
+                return flight, False, None
+            flight = _Flight(loop.create_future() if loop is not None else None)
+            self._flights[key] = flight
+            return flight, True, None
+
+
+    def _lead(self, key, flight: _Flight, fn: Callable, canMemoize: Union[Callable, None]):
+        try:
+            flight.result = fn()
+        except Exception as ex:
+            flight.exception = ex
+        except BaseException:
+            flight.exception = _FlightAbandoned()
+            raise
+        finally:
+            self._finish(key, flight, canMemoize)
+        return self._getFlightResult(flight)
+
+
+    async def _leadAsync(self, key, flight: _Flight, fn: Callable, canMemoize: Union[Callable, None]):
+        try:
+            flight.result = await fn()
+        except Exception as ex:
+            flight.exception = ex
+        except BaseException:
+            flight.exception = _FlightAbandoned()
+            raise
+        finally:
+            self._finish(key, flight, canMemoize)
+            if flight.exception is not None:
+                flight.future.set_exception(flight.exception)
+                # mark the exception as retrieved, so that asyncio doesn't log it when no other caller waited for the request
+                flight.future.exception()
+            else:
+                flight.future.set_result(flight.result)
+        return self._getFlightResult(flight)
+
+
+    def _finish(self, key, flight: _Flight, canMemoize: Union[Callable, None]):
+        """remove the flight, remember the result and wake the waiting threads"""
+        with self._lock:
+            del self._flights[key]
+            if flight.exception is None and self._memoTime > 0 and (canMemoize is None or canMemoize(flight.result)):
+                self._memo.pop(key, None)
+                self._memo[key] = (time.time() + self._memoTime, flight.result)
+                while len(self._memo) > self._maxMemoItems:
+                    self._memo.popitem(last = False)
+        flight.event.set()
+
+
+    def _removeExpired(self):
+        """forget the results whose memo time has passed. Has to be called while holding the lock"""
+        now = time.time()
+        while len(self._memo) > 0:
+            key, (expiresAt, _) = next(iter(self._memo.items()))
+            if expiresAt > now:
+                break
+            del self._memo[key]
+
+
+    @staticmethod
+    def _getFlightResult(flight: _Flight):
+        if flight.exception is not None:
+            raise flight.exception
+        return flight.result
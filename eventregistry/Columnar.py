@@ -0,0 +1,147 @@
+"""
+conversion of the lists of results (articles, events, ...) into columns, so that they can be processed with vectorized
+operations. A batch of results can be converted into a dict of lists, a dict of NumPy arrays or an Arrow RecordBatch.
+NumPy and Arrow are not required by the package - they are only imported when the corresponding conversion is used.
+
+The columns are described by tuples (column name, path, type). The path is a dot separated list of keys (e.g. "source.uri")
+and the type is "str", "int", "float", "bool" or None (no conversion).
+"""
+from typing import Union, List, Tuple, Dict
+
+
+# the common properties of the articles
+ARTICLE_COLUMNS = [
+    ("uri", "uri", "str"),
+    ("date", "date", "str"),
+    ("time", "time", "str"),
+    ("lang", "lang", "str"),
+    ("sourceUri", "source.uri", "str"),
+    ("sentiment", "sentiment", "float"),
+    ("shares", "shares.facebook", "int"),
+    ("eventUri", "eventUri", "str"),
+]
+
+# the common properties of the events
+EVENT_COLUMNS = [
+    ("uri", "uri", "str"),
+    ("date", "eventDate", "str"),
+    ("totalArticleCount", "totalArticleCount", "int"),
+    ("sentiment", "sentiment", "float"),
+    ("socialScore", "socialScore", "float"),
+]
+
+# the supported columnar formats
+COLUMNAR_FORMATS = ["dict", "numpy", "arrow"]
+
+
+def _normalizeColumns(columns: List[Union[str, Tuple]]) -> List[Tuple[str, List[str], Union[str, None]]]:
+    """return the columns as (name, list of keys, type) tuples. A column can also be provided just as a path"""
+    normalized = []
+    for column in columns:
+        if isinstance(column, str):
+            column = (column, column, None)
+        name, path, colType = column
+        assert colType in [None, "str", "int", "float", "bool"], "unsupported column type '%s'" % colType
+        normalized.append((name, path.split("."), colType))
+    return normalized
+
+
+def _getPathValue(item, keys: List[str]):
+    """return the value at the path in the item or None if the path does not exist"""
+    for key in keys:
+        if not isinstance(item, dict):
+            return None
+        item = item.get(key)
+    return item
+
+
+def getColumns(items: List[dict], columns: List[Union[str, Tuple]] = ARTICLE_COLUMNS) -> Dict[str, list]:
+    """
+    return the values of the columns for the list of items as a dict {column name: list of values}.
+    The missing values are None
+    @param items: list of results (e.g. the articles returned by the iterBatches() method of the iterators)
+    @param columns: list of (column name, path, type) tuples or paths
+    """
+    return dict((name, [_getPathValue(item, keys) for item in items]) for name, keys, _ in _normalizeColumns(columns))
+
+
+def getRows(items: List[dict], columns: List[Union[str, Tuple]] = ARTICLE_COLUMNS) -> List[dict]:
+    """
+    return for each item a dict {column name: value} that contains only the values of the columns. The missing values are None
+    @param items: list of results
+    @param columns: list of (column name, path, type) tuples or paths
+    """
+    normalized = _normalizeColumns(columns)
+    return [dict((name, _getPathValue(item, keys)) for name, keys, _ in normalized) for item in items]
+
+
+def toNumpyColumns(items: List[dict], columns: List[Union[str, Tuple]] = ARTICLE_COLUMNS) -> dict:
+    """
+    return the values of the columns as a dict {column name: NumPy array}. The "float" columns (and the "int" columns
+    with missing values) are float arrays with NaN for the missing values, the other columns are object arrays
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Conversion to NumPy arrays requires the numpy package. Install it by calling: pip install numpy")
+    arrays = {}
+    for name, keys, colType in _normalizeColumns(columns):
+        values = [_getPathValue(item, keys) for item in items]
+        hasMissing = any(value is None for value in values)
+        if colType == "float" or (colType == "int" and hasMissing):
+            arrays[name] = numpy.array([numpy.nan if value is None else value for value in values], dtype = numpy.float64)
+        elif colType == "int":
+            arrays[name] = numpy.array(values, dtype = numpy.int64)
+        elif colType == "bool" and not hasMissing:
+            arrays[name] = numpy.array(values, dtype = numpy.bool_)
+        else:
+            arrays[name] = numpy.array(values, dtype = object)
+    return arrays
+
+
+def getArrowSchema(columns: List[Union[str, Tuple]] = ARTICLE_COLUMNS):
+    """return the Arrow schema for the columns. The columns without a type are stored as strings"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Conversion to Arrow requires the pyarrow package. Install it by calling: pip install pyarrow")
+    types = { "str": pyarrow.string(), "int": pyarrow.int64(), "float": pyarrow.float64(), "bool": pyarrow.bool_(), None: pyarrow.string() }
+    return pyarrow.schema([(name, types[colType]) for name, _, colType in _normalizeColumns(columns)])
+
+
+def toArrowBatch(items: List[dict], columns: List[Union[str, Tuple]] = ARTICLE_COLUMNS):
+    """return the values of the columns as an Arrow RecordBatch. The values of the columns without a type are converted to strings"""
+    import pyarrow
+    schema = getArrowSchema(columns)
+    arrays = []
+    for (name, keys, colType), field in zip(_normalizeColumns(columns), schema):
+        values = [_getPathValue(item, keys) for item in items]
+        if colType is None:
+            values = [None if value is None else str(value) for value in values]
+        arrays.append(pyarrow.array(values, type = field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema = schema)
+
+
+def checkColumnar(columnar: Union[str, None], columns: Union[List[Union[str, Tuple]], None]):
+    """check that the items can be converted to the columnar format. Raises ValueError if the columns are missing"""
+    if columnar is None:
+        return
+    assert columnar in COLUMNAR_FORMATS, "columnar should be one of %s" % COLUMNAR_FORMATS
+    if columns is None:
+        raise ValueError("The columns have to be provided in order to convert the results into columns")
+
+
+def toColumnar(items: List[dict], columnar: Union[str, None], columns: Union[List[Union[str, Tuple]], None] = ARTICLE_COLUMNS):
+    """
+    convert the list of items to the given columnar format
+    @param columnar: "dict" (see getColumns()), "numpy" (see toNumpyColumns()), "arrow" (see toArrowBatch()) or None to return the items unchanged
+    @param columns: list of (column name, path, type) tuples or paths
+    """
+    if columnar is None:
+        return items
+    checkColumnar(columnar, columns)
+    if columnar == "dict":
+        return getColumns(items, columns)
+    if columnar == "numpy":
+        return toNumpyColumns(items, columns)
+    return toArrowBatch(items, columns)
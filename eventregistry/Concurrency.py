@@ -0,0 +1,265 @@
+"""
+concurrency controllers determine how many requests can be executed at the same time by an EventRegistry instance.
+
+ConcurrencyController uses a fixed limit. AdaptiveConcurrencyController adjusts the limit using the AIMD approach
+(additive increase, multiplicative decrease): the limit is raised while the requests succeed with a healthy latency
+and is cut when the service responds with 429/5xx or the requests time out. It also reduces the limit when the
+daily request budget (reported in the x-ratelimit-* headers) is running low.
+"""
+import math, threading, asyncio, collections
+from typing import Union
+
+
+class ConcurrencyController(object):
+    """
+    allows at most `limit` requests to be in flight at the same time. Can be used from threads and from asyncio tasks.
+    """
+    def __init__(self, limit: int = 1):
+        """
+        @param limit: the maximum number of requests that can be executed at the same time
+        """
+        assert limit > 0, "limit should be a positive number"
+        self._limit = limit
+        self._inFlight = 0
+        self._cond = threading.Condition()
+        # futures of the asyncio tasks that are waiting for a free slot, together with their event loops
+        self._asyncWaiters = collections.deque()
+        self._requestCount = 0
+        self._failedRequestCount = 0
+        self._totalLatency = 0.0
+
+
+    def getLimit(self) -> int:
+        """return the number of requests that can currently be executed at the same time"""
+        return self._limit
+
+
+    def getMaxLimit(self) -> int:
+        """return the highest value that the limit can have. Used to size the connection pool"""
+        return self._limit
+
+
+    def getInFlight(self) -> int:
+        """return the number of requests that are currently being executed"""
+        return self._inFlight
+
+
+    def acquire(self):
+        """block the calling thread until a request can be started"""
+        with self._cond:
+            while self._inFlight >= self.getLimit():
+                self._cond.wait()
+            self._inFlight += 1
+
+
+    async def acquireAsync(self):
+        """wait (without blocking the event loop) until a request can be started"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._inFlight < self.getLimit():
+                    self._inFlight += 1
+                    return
+                fut = loop.create_future()
+                self._asyncWaiters.append((loop, fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                # the task could have been woken for a free slot before it was cancelled, so pass the wake-up on
+                with self._cond:
+                    self._wakeWaiters()
+                raise
+
+
+    def release(self):
+        """mark the end of a request started with acquire() or acquireAsync()"""
+        with self._cond:
+            self._inFlight -= 1
+            self._wakeWaiters()
+
+
+    def recordResult(self, latency: float, statusCode: Union[int, None], headers = None):
+        """
+        report the outcome of a request
+        @param latency: number of seconds the request took
+        @param statusCode: http status code of the response or None if no response was received (timeout, connection error, ...)
+        @param headers: headers of the response (if any)
+        """
+        with self._cond:
+            self._requestCount += 1
+            self._totalLatency += latency
+            if self.isCongestionSignal(statusCode):
+                self._failedRequestCount += 1
+
+
+    def getStats(self) -> dict:
+        """return the current limit, the number of requests in flight and statistics about the finished requests"""
+        with self._cond:
+            return {
+                "limit": self.getLimit(),
+                "inFlight": self._inFlight,
+                "requestCount": self._requestCount,
+                "failedRequestCount": self._failedRequestCount,
+                "averageLatency": self._totalLatency / self._requestCount if self._requestCount > 0 else 0.0
+            }
+
+
+    @staticmethod
+    def isCongestionSignal(statusCode: Union[int, None]) -> bool:
+        """is the result of a request a sign that the service is overloaded (too many requests, server errors, timeouts)"""
+        return statusCode is None or statusCode == 429 or statusCode >= 500
+
+
+    def _wakeWaiters(self):
+        """wake up the waiting threads and tasks for which there is a free slot. Has to be called while holding self._cond"""
+        free = self.getLimit() - self._inFlight
+        if free <= 0:
+            return
+        self._cond.notify(free)
+        while free > 0 and len(self._asyncWaiters) > 0:
+            loop, fut = self._asyncWaiters.popleft()
+            # skip the waiters whose tasks were cancelled in the meantime
+            if fut.done():
+                continue
+            try:
+                loop.call_soon_threadsafe(self._setFutureResult, fut)
+            except RuntimeError:
+                # the event loop of the waiter was already closed
+                continue
+            free -= 1
+
+
+    def _setFutureResult(self, fut):
+        """wake the waiting task. If it was cancelled after it was chosen for the free slot, another waiter is woken instead"""
+        if fut.done():
+            with self._cond:
+                self._wakeWaiters()
+        else:
+            fut.set_result(None)
+
+
+
+class AdaptiveConcurrencyController(ConcurrencyController):
+    """
+    concurrency controller that adapts the limit using AIMD (additive increase, multiplicative decrease).
+
+    - after each window of `limit` requests that finished without congestion signals (and with average latency below
+      latencyThreshold, if set) the limit is increased by additiveIncrease
+    - when a request fails with 429, 5xx or without a response, the limit is multiplied by multiplicativeDecrease.
+      The limit is decreased at most once per window so that the requests that were already in flight don't cause repeated cuts
+    - when the share of the remaining daily requests drops below lowBudgetFraction, the limit is capped proportionally,
+      and when at most reservedRequests remain, the limit drops to minLimit
+    """
+    def __init__(self,
+                 minLimit: int = 1,
+                 maxLimit: int = 32,
+                 initialLimit: Union[int, None] = None,
+                 additiveIncrease: int = 1,
+                 multiplicativeDecrease: float = 0.5,
+                 latencyThreshold: Union[float, None] = None,
+                 lowBudgetFraction: float = 0.1,
+                 reservedRequests: int = 0):
+        """
+        @param minLimit: the lowest number of concurrent requests
+        @param maxLimit: the highest number of concurrent requests
+        @param initialLimit: the starting limit. If None, minLimit is used
+        @param additiveIncrease: by how much to increase the limit after a healthy window of requests
+        @param multiplicativeDecrease: factor (between 0 and 1) by which to multiply the limit on congestion
+        @param latencyThreshold: if set, the average latency (in seconds) of a window above this value is treated as congestion
+        @param lowBudgetFraction: when x-ratelimit-remaining / x-ratelimit-limit drops below this value, the limit is capped proportionally
+        @param reservedRequests: number of daily requests that should be left for other uses. When reached, only minLimit requests are allowed at the same time
+        """
+        assert 0 < minLimit <= maxLimit, "minLimit should be a positive number not larger than maxLimit"
+        assert 0 < multiplicativeDecrease < 1, "multiplicativeDecrease should be between 0 and 1"
+        assert additiveIncrease > 0, "additiveIncrease should be a positive number"
+        ConcurrencyController.__init__(self, initialLimit or minLimit)
+        assert minLimit <= self._limit <= maxLimit, "initialLimit should be between minLimit and maxLimit"
+        self._minLimit = minLimit
+        self._maxLimit = maxLimit
+        self._additiveIncrease = additiveIncrease
+        self._multiplicativeDecrease = multiplicativeDecrease
+        self._latencyThreshold = latencyThreshold
+        self._lowBudgetFraction = lowBudgetFraction
+        self._reservedRequests = reservedRequests
+        self._budgetCap = maxLimit
+        # statistics about the current window of requests
+        self._windowCount = 0
+        self._windowLatency = 0.0
+        self._windowCongested = False
+        self._increaseCount = 0
+        self._decreaseCount = 0
+
+
+    def getLimit(self) -> int:
+        return min(self._limit, self._budgetCap)
+
+
+    def getMaxLimit(self) -> int:
+        return self._maxLimit
+
+
+    def recordResult(self, latency: float, statusCode: Union[int, None], headers = None):
+        ConcurrencyController.recordResult(self, latency, statusCode, headers)
+        with self._cond:
+            if headers is not None:
+                self._updateBudgetCap(headers)
+            congested = self.isCongestionSignal(statusCode)
+            # cut the limit immediately, but only once per window
+            if congested and not self._windowCongested:
+                self._setLimit(max(self._minLimit, int(math.floor(self._limit * self._multiplicativeDecrease))))
+                self._decreaseCount += 1
+                self._startWindow(congested = True)
+                return
+            self._windowCount += 1
+            self._windowLatency += latency
+            if self._windowCount >= self._limit:
+                slow = self._latencyThreshold is not None and self._windowLatency / self._windowCount > self._latencyThreshold
+                if slow:
+                    self._setLimit(max(self._minLimit, int(math.floor(self._limit * self._multiplicativeDecrease))))
+                    self._decreaseCount += 1
+                elif not self._windowCongested and self._inFlight + 1 >= self.getLimit():
+                    # increase only if the current limit is actually being used
+                    self._setLimit(min(self._maxLimit, self._limit + self._additiveIncrease))
+                    self._increaseCount += 1
+                self._startWindow(congested = False)
+
+
+    def getStats(self) -> dict:
+        stats = ConcurrencyController.getStats(self)
+        with self._cond:
+            stats.update({
+                "budgetCap": self._budgetCap,
+                "increaseCount": self._increaseCount,
+                "decreaseCount": self._decreaseCount
+            })
+        return stats
+
+
+    def _setLimit(self, limit: int):
+        self._limit = limit
+        self._wakeWaiters()
+
+
+    def _startWindow(self, congested: bool):
+        self._windowCount = 0
+        self._windowLatency = 0.0
+        self._windowCongested = congested
+
+
+    def _updateBudgetCap(self, headers):
+        """cap the limit based on the number of remaining daily requests reported in the response headers"""
+        try:
+            dailyLimit = int(headers.get("x-ratelimit-limit", ""))
+            remaining = int(headers.get("x-ratelimit-remaining", ""))
+        except (ValueError, TypeError):
+            return
+        if dailyLimit <= 0:
+            return
+        if remaining <= self._reservedRequests:
+            self._budgetCap = self._minLimit
+        elif remaining < dailyLimit * self._lowBudgetFraction:
+            fraction = remaining / (dailyLimit * self._lowBudgetFraction)
+            self._budgetCap = max(self._minLimit, int(math.ceil(self._maxLimit * fraction)))
+        else:
+            self._budgetCap = self._maxLimit
+        self._wakeWaiters()
@@ -36,6 +36,7 @@ class GetEventForText(QueryParamsBase):
                  eventRegistry: EventRegistry,             # instance of EventRegistry class
                  nrOfEventsToReturn: int = 5):   # number of events to return for the given text
         QueryParamsBase.__init__(self)
+        eventRegistry._requireSync("GetEventForText")
         self._er = eventRegistry
         self._nrOfEventsToReturn = nrOfEventsToReturn
 
@@ -1,19 +1,88 @@
 ﻿"""
 main class responsible for obtaining results from the Event Registry
 """
-import six, os, sys, traceback, json, re, requests, time, logging, threading
+import six, os, sys, traceback, json, re, requests, time, logging, threading, contextvars, weakref, urllib.parse, concurrent.futures
 
 from typing import Union, List, Tuple
 from eventregistry.Base import *
 from eventregistry.ReturnInfo import *
+from eventregistry.RateLimiter import RateLimiter, TokenBucketRateLimiter
+from eventregistry.Concurrency import ConcurrencyController
+from eventregistry.Retry import RetryPolicy, CircuitBreaker, CircuitBreakerOpenError
+from eventregistry.Cache import ResponseCache, CachePolicy, UriCache
+from eventregistry.JsonCodec import JsonCodec, getDefaultJsonCodec
+from eventregistry.LazyResponse import LazyResponse
+from eventregistry.Coalescing import RequestCoalescer
 from eventregistry.Logger import logger
 
 
+class ResolvedUris(dict):
+    """
+    the result of the resolve*Uris() methods: a dict where the key is the label and the value is its uri (None if the
+    label could not be resolved). It also reports which labels were not resolved and which requests failed
+    """
+    def __init__(self, uris = (), errors: Union[dict, None] = None):
+        dict.__init__(self, uris)
+        self._errors = errors or {}
+
+
+    def getResolved(self) -> dict:
+        """return the dict with only the labels that were resolved"""
+        return dict((label, uri) for label, uri in self.items() if uri is not None)
+
+
+    def getUnresolved(self) -> List[str]:
+        """return the labels for which no uri was found (or the request failed), in the order in which they were given"""
+        return [label for label, uri in self.items() if uri is None]
+
+
+    def getErrors(self) -> dict:
+        """return the exceptions of the failed requests as a dict where the key is the label"""
+        return dict(self._errors)
+
+
+
+# the request state of each EventRegistry instance in the current thread (or asyncio task). A single module level variable
+# is used for all the instances, since a context keeps a reference to every variable that was set in it. The mapping is
+# replaced (not modified) on every change, so that the asyncio tasks that share a copy of the context don't see the changes
+_requestStates = contextvars.ContextVar("eventregistry_request_states", default = None)
+
+
+
+class _RequestState(object):
+    """
+    information about the last request made by the current thread (or asyncio task).
+    Kept per caller so that parallel callers don't overwrite each other's headers
+    """
+    def __init__(self):
+        self.headers = {}
+        self.statusCode = None
+        self.exception = None
+        self.dailyAvailableRequests = -1
+        self.remainingAvailableRequests = -1
+        self.rateLimiterWaitTime = 0.0
+
+
+
 class EventRegistry(object):
     """
     the core object that is used to access any data in Event Registry
     it is used to send all the requests and queries
     """
+    # the methods that return the uri that best matches a label. Their results can be cached using UriCache
+    _URI_METHODS = ["getConceptUri", "getLocationUri", "getCategoryUri", "getNewsSourceUri", "getSourceUri", "getSourceGroupUri",
+                    "getConceptClassUri", "getAuthorUri", "getEventTypeUri"]
+    # the paths of the read-only requests that can be coalesced by the RequestCoalescer. The requests that change
+    # something (e.g. topic training) or return something new on every call (usage, minute streams) are always sent
+    _COALESCED_PATHS = frozenset([
+        "/api/v1/article", "/api/v1/event", "/api/v1/eventType/mention", "/api/v1/story", "/api/v1/counters", "/api/v1/trends",
+        "/api/v1/topicPage", "/api/v1/articleMapper", "/api/v1/concept", "/api/v1/concept/getInfo", "/api/v1/category",
+        "/api/v1/source", "/api/v1/sourceGroup/getSourceGroupInfo", "/api/v1/sourceGroup/getSourceGroups",
+        "/api/v1/eventType/sasb/getItems", "/api/v1/eventType/sdg/getItems", "/api/v1/eventType/suggestEventTypes",
+        "/api/v1/eventType/suggestIndustries", "/api/v1/suggestAuthorsFast", "/api/v1/suggestCategoriesFast",
+        "/api/v1/suggestConceptClasses", "/api/v1/suggestConceptsFast", "/api/v1/suggestLocationsFast",
+        "/api/v1/suggestSourceGroups", "/api/v1/suggestSourcesFast"])
+
     def __init__(self,
                  apiKey: Union[str, None] = None,
                  host: Union[str, None] = None,
@@ -22,38 +91,79 @@ class EventRegistry(object):
                  repeatFailedRequestCount: int = -1,
                  allowUseOfArchive: bool = True,
                  verboseOutput: bool = False,
-                 settingsFName: Union[str, None] = None):
+                 settingsFName: Union[str, None] = None,
+                 maxConcurrentRequests: int = 1,
+                 rateLimiter: Union[RateLimiter, None] = None,
+                 concurrencyController: Union[ConcurrencyController, None] = None,
+                 retryPolicy: Union[RetryPolicy, None] = None,
+                 circuitBreaker: Union[CircuitBreaker, None] = None,
+                 responseCache: Union[ResponseCache, None] = None,
+                 jsonCodec: Union[JsonCodec, None] = None,
+                 requestCoalescer: Union[RequestCoalescer, None] = None,
+                 uriCache: Union[UriCache, None] = None):
         """
         @param apiKey: API key that should be used to make the requests to the Event Registry. API key is assigned to each user account and can be obtained on
             this page: https://newsapi.ai/dashboard
         @param host: host to use to access the Event Registry backend. Use None to use the default host.
         @param hostAnalytics: the host address to use to perform the analytics api calls
-        @param minDelayBetweenRequests: the minimum number of seconds between individual api calls
+        @param minDelayBetweenRequests: the minimum number of seconds between individual api calls. Ignored if rateLimiter is provided
         @param repeatFailedRequestCount: if a request fails (for example, because ER is down), what is the max number of times the request
-            should be repeated (-1 for indefinitely)
+            should be repeated (-1 for indefinitely). Ignored if retryPolicy is provided
         @param allowUseOfArchive: default is True. Determines if the queries made should potentially be executed on the archive data.
             If False, all queries (regardless how the date conditions are set) will be executed on data from the last 31 days.
             Queries executed on the archive are more expensive so set it to False if you are just interested in recent data
         @param verboseOutput: if True, additional info about errors etc will be printed to console
         @param settingsFName: If provided it should be a full path to 'settings.json' file where apiKey an/or host can be loaded from.
             If None, we will look for the settings file in the eventregistry module folder
+        @param maxConcurrentRequests: the maximum number of requests that can be executed at the same time when the instance
+            is shared by multiple threads. The connection pool is sized accordingly. Default is 1 (requests are made one at a time)
+        @param rateLimiter: instance of RateLimiter that determines how frequently the requests can be made. Use for example
+            TokenBucketRateLimiter(requestsPerSecond = 5, burst = 10) to allow bursts, or FileTokenBucketRateLimiter to share the budget among processes.
+            If None, the requests will be spaced by minDelayBetweenRequests seconds
+        @param concurrencyController: instance of ConcurrencyController that determines how many requests can be executed at the same time.
+            Use AdaptiveConcurrencyController to adapt the parallelism to the latency, errors and remaining daily requests.
+            If None, a fixed limit of maxConcurrentRequests is used
+        @param retryPolicy: instance of RetryPolicy that determines how many times and after what delay the failed requests are repeated.
+            If None, failed requests are repeated up to repeatFailedRequestCount times using exponential backoff with jitter
+        @param circuitBreaker: instance of CircuitBreaker. If provided, the requests to a host that keeps failing will fail immediately
+            with CircuitBreakerOpenError until the host recovers. If None, no circuit breaker is used
+        @param responseCache: instance of ResponseCache. If provided, the results of execQuery() are stored in the cache and repeated
+            queries are served from it without making a request. If None, the responses are not cached
+        @param jsonCodec: instance of JsonCodec used to encode the requests and decode the responses. If None, the requests are
+            encoded with the json module and the responses are decoded with orjson if it is installed (see getDefaultJsonCodec())
+        @param requestCoalescer: instance of RequestCoalescer. If provided, identical read-only requests (same host, api key, path and
+            parameters) that are made at the same time by several threads result in a single request. Each caller receives its own
+            copy of the response. If None, every call makes a request
+        @param uriCache: instance of UriCache. If provided, the uris returned by the get*Uri() methods (getConceptUri(), getLocationUri(), ...)
+            are cached in memory (and optionally in a file), so that the same labels are resolved without a request. If None, every call makes a request
         """
         self._host = host or "http://eventregistry.org"
         self._hostAnalytics = hostAnalytics or "http://analytics.eventregistry.org"
-        self._lastException = None
         self._logRequests = False
-        self._minDelayBetweenRequests = minDelayBetweenRequests
-        self._repeatFailedRequestCount = repeatFailedRequestCount
+        self._retryPolicy = retryPolicy or RetryPolicy(maxRetries = repeatFailedRequestCount)
+        self._circuitBreaker = circuitBreaker
+        self._responseCache = responseCache
+        self._jsonCodec = jsonCodec or getDefaultJsonCodec()
+        self._requestCoalescer = requestCoalescer
+        self._uriCache = uriCache
         self._allowUseOfArchive = allowUseOfArchive
         self._verboseOutput = verboseOutput
-        self._lastQueryTime = time.time()
-        self._headers = {}
+        # the rate limiter can be shared among threads and EventRegistry instances
+        if rateLimiter is None and minDelayBetweenRequests > 0:
+            rateLimiter = TokenBucketRateLimiter(requestsPerSecond = 1.0 / minDelayBetweenRequests, burst = 1)
+        self._rateLimiter = rateLimiter
+        # token usage reported by the last response received by any of the callers
         self._dailyAvailableRequests = -1
         self._remainingAvailableRequests = -1
+        # headers, exception, etc. of the last request are stored separately for each thread or asyncio task in _requestStates
 
-        # lock for making sure we make one request at a time - requests module otherwise sometimes returns incomplete json objects
-        self._lock = threading.Lock()
+        # limit the number of requests that are made at the same time. the connection pool has to be large enough to keep a connection for each of them
+        self._concurrencyController = concurrencyController or ConcurrencyController(maxConcurrentRequests)
+        self._maxConcurrentRequests = max(maxConcurrentRequests, self._concurrencyController.getMaxLimit())
         self._reqSession = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections = 2, pool_maxsize = self._maxConcurrentRequests)
+        self._reqSession.mount("http://", adapter)
+        self._reqSession.mount("https://", adapter)
         self._apiKey = apiKey
         self._extraParams = None
 
@@ -129,12 +239,12 @@ class EventRegistry(object):
 
 
     def getLastException(self):
-        """return the last exception"""
-        return self._lastException
+        """return the last exception raised by a request made in the current thread"""
+        return self._getRequestState().exception
 
 
     def printLastException(self):
-        logger.error(str(self._lastException))
+        logger.error(str(self.getLastException()))
 
 
     def format(self, obj):
@@ -144,12 +254,14 @@ class EventRegistry(object):
 
     def getRemainingAvailableRequests(self):
         """get the number of requests that are still available for the user today. Information is only accessible after you make some query."""
-        return self._remainingAvailableRequests
+        state = self._getRequestState()
+        return state.remainingAvailableRequests if state.remainingAvailableRequests != -1 else self._remainingAvailableRequests
 
 
     def getDailyAvailableRequests(self):
         """get the total number of requests that the user can make in a day. Information is only accessible after you make some query."""
-        return self._dailyAvailableRequests
+        state = self._getRequestState()
+        return state.dailyAvailableRequests if state.dailyAvailableRequests != -1 else self._dailyAvailableRequests
 
 
     def getUsageInfo(self):
@@ -178,16 +290,16 @@ class EventRegistry(object):
 
     def getLastHeaders(self):
         """
-        return the headers returned in the response object of the last executed request
+        return the headers returned in the response object of the last request executed in the current thread
         """
-        return self._headers
+        return self._getRequestState().headers
 
 
     def getLastHeader(self, headerName: str, default = None):
         """
-        get a value of the header headerName that was set in the headers in the last response object
+        get a value of the header headerName that was set in the headers in the last response object received in the current thread
         """
-        return self._headers.get(headerName, default)
+        return self._getRequestState().headers.get(headerName, default)
 
 
     def printLastReqStats(self):
@@ -199,6 +311,63 @@ class EventRegistry(object):
         print("Was archive used for the query: " + (self.getLastHeader("req-archive") == "1" and "Yes" or "No"))
 
 
+    def getLastRateLimiterWaitTime(self):
+        """
+        return the number of seconds that the last request made in the current thread had to wait because of the rate limiter
+        """
+        return self._getRequestState().rateLimiterWaitTime
+
+
+    def getConcurrencyController(self):
+        """
+        return the concurrency controller that determines how many requests can be executed at the same time
+        """
+        return self._concurrencyController
+
+
+    def getRetryPolicy(self):
+        """
+        return the retry policy that determines how the failed requests are repeated
+        """
+        return self._retryPolicy
+
+
+    def getCircuitBreaker(self):
+        """
+        return the circuit breaker used by this instance (None if not used)
+        """
+        return self._circuitBreaker
+
+
+    def getRateLimiter(self):
+        """
+        return the rate limiter used by this instance (None if requests are not rate limited)
+        """
+        return self._rateLimiter
+
+
+    def getJsonCodec(self):
+        """return the codec used to encode the requests and decode the responses"""
+        return self._jsonCodec
+
+
+    def getRequestCoalescer(self):
+        """return the request coalescer (or None if the requests are not coalesced)"""
+        return self._requestCoalescer
+
+
+    def getUriCache(self):
+        """return the cache of the uris returned by the get*Uri() methods (or None if they are not cached)"""
+        return self._uriCache
+
+
+    def getResponseCache(self):
+        """
+        return the response cache used by this instance (None if the responses are not cached)
+        """
+        return self._responseCache
+
+
     def getLastReqArchiveUse(self):
         """
         return True or False depending on whether the last request used the archive or not
@@ -217,14 +386,43 @@ class EventRegistry(object):
         assert isinstance(query, QueryParamsBase), "query parameter should be an instance of a class that has Query as a base class, such as QueryArticles or QueryEvents"
         # don't modify original query params
         allParams = query._getQueryParams()
+        cacheKey = self._getCacheKey(query._getPath(), allParams, allowUseOfArchive)
+        if cacheKey is not None:
+            respInfo = self._responseCache.get(cacheKey)
+            if respInfo is not None:
+                self._resetRequestState()
+                return respInfo
         # make the request
         respInfo = self.jsonRequest(query._getPath(), allParams, allowUseOfArchive = allowUseOfArchive)
+        self._storeCachedResponse(cacheKey, query._getPath(), allParams, respInfo)
+        return respInfo
+
+
+    def execQueryLazy(self, query: QueryParamsBase, allowUseOfArchive: Union[bool, None] = None) -> LazyResponse:
+        """
+        execute the search query in the same way as execQuery(), but return a LazyResponse that decodes each section of the
+        response (e.g. "articles", "conceptAggr", "timeAggr") only when it is accessed. Useful when a query requests several
+        result types and only some of them are used or when they are used one at a time. The sections are only decoded lazily
+        when the registry uses JsonCodec (pass jsonCodec = JsonCodec() to the constructor), see LazyResponse
+        @param query: instance of Query class
+        @param allowUseOfArchive: see execQuery()
+        """
+        assert isinstance(query, QueryParamsBase), "query parameter should be an instance of a class that has Query as a base class, such as QueryArticles or QueryEvents"
+        allParams = query._getQueryParams()
+        cacheKey = self._getCacheKey(query._getPath(), allParams, allowUseOfArchive)
+        if cacheKey is not None:
+            data = self._responseCache.getRaw(cacheKey)
+            if data is not None:
+                self._resetRequestState()
+                return LazyResponse(data, self._jsonCodec)
+        respInfo = LazyResponse(self.jsonRequestRaw(query._getPath(), allParams, allowUseOfArchive = allowUseOfArchive), self._jsonCodec)
+        self._storeCachedResponse(cacheKey, query._getPath(), allParams, respInfo)
         return respInfo
 
 
     def jsonRequest(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None] = None, allowUseOfArchive: Union[bool, None] = None):
         """
-        make a request for json data. repeat it _repeatFailedRequestCount times, if they fail (indefinitely if _repeatFailedRequestCount = -1)
+        make a request for json data. failed requests are repeated according to the retry policy
         @param methodUrl: url on er (e.g. "/api/v1/article")
         @param paramDict: optional object containing the parameters to include in the request (e.g. { "articleUri": "123412342" }).
         @param customLogFName: potentially a file name where the request information can be logged into
@@ -232,75 +430,15 @@ class EventRegistry(object):
             If not None set it to boolean to determine if the request can be executed on the archive data or not
             If left to None then the value set in the EventRegistry constructor will be used
         """
-        self._sleepIfNecessary()
-        self._lastException = None
+        return self._makeRequest(methodUrl, paramDict, customLogFName, allowUseOfArchive, decode = True)
 
-        self._lock.acquire()
-        if self._logRequests:
-            try:
-                with open(customLogFName or self._requestLogFName, "a", encoding="utf-8") as log:
-                    if isinstance(paramDict, dict):
-                        log.write("# " + json.dumps(paramDict) + "\n")
-                    log.write(methodUrl + "\n\n")
-            except Exception as ex:
-                self._lastException = ex
 
-        if paramDict is None:
-            paramDict = {}
-        # if we have api key then add it to the paramDict
-        if self._apiKey:
-            paramDict["apiKey"] = self._apiKey
-        # if we want to ignore the archive, set the flag
-        if isinstance(allowUseOfArchive, bool):
-            if not allowUseOfArchive:
-                paramDict["forceMaxDataTimeWindow"] = 31
-        # if we didn't override the parameter then check what we've set when constructing the EventRegistry class
-        elif self._allowUseOfArchive is False:
-            paramDict["forceMaxDataTimeWindow"] = 31
-        # if we also have some extra parameters, then set those too
-        if self._extraParams:
-            paramDict.update(self._extraParams)
-
-        tryCount = 0
-        self._headers = {}  # reset any past data
-        returnData = None
-        respInfo = None
-        url = self._host + methodUrl
-        while self._repeatFailedRequestCount < 0 or tryCount <= self._repeatFailedRequestCount:
-            tryCount += 1
-            try:
-                # make the request
-                respInfo = self._reqSession.post(url, json = paramDict, timeout=60)
-                # remember the returned headers
-                self._headers = respInfo.headers
-                # if we got some error codes print the error and repeat the request after a short time period
-                if respInfo.status_code != 200:
-                    raise Exception(respInfo.text)
-                # did we get a warning. if yes, print it
-                if self.getLastHeader("warning"):
-                    logger.warning("=========== WARNING ===========\n%s\n===============================", self.getLastHeader("warning"))
-                # remember the available requests
-                self._dailyAvailableRequests = tryParseInt(self.getLastHeader("x-ratelimit-limit", ""), val = -1)
-                self._remainingAvailableRequests = tryParseInt(self.getLastHeader("x-ratelimit-remaining", ""), val = -1)
-
-                returnData = respInfo.json()
-                break
-            except Exception as ex:
-                self._lastException = ex
-                if self._verboseOutput:
-                    logger.error("Event Registry exception while executing the request:")
-                    logger.error("endpoint: %s\nParams: %s", url, json.dumps(paramDict, indent=4))
-                    self.printLastException()
-                # in case of invalid input parameters, don't try to repeat the search but we simply raise the same exception again
-                if respInfo is not None and respInfo.status_code in self._stopStatusCodes:
-                    break
-                # in case of the other exceptions (maybe the service is temporarily unavailable) we try to repeat the query
-                logger.info("The request will be automatically repeated in 3 seconds...")
-                time.sleep(5)   # sleep for X seconds on error
-        self._lock.release()
-        if returnData is None:
-            raise self._lastException or Exception("No valid return data provided")
-        return returnData
+    def jsonRequestRaw(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None] = None, allowUseOfArchive: Union[bool, None] = None) -> bytes:
+        """
+        make a request in the same way as jsonRequest(), but return the body of the response (utf-8 encoded json) without
+        parsing it. Useful for the callers that store the responses or parse them lazily
+        """
+        return self._makeRequest(methodUrl, paramDict, customLogFName, allowUseOfArchive, decode = False)
 
 
     def jsonRequestAnalytics(self, methodUrl: str, paramDict: dict):
@@ -311,40 +449,8 @@ class EventRegistry(object):
         """
         if self._apiKey:
             paramDict["apiKey"] = self._apiKey
-        self._lock.acquire()
-        returnData = None
-        respInfo = None
-        self._lastException = None
-        self._headers = {}  # reset any past data
-        tryCount = 0
-        while self._repeatFailedRequestCount < 0 or tryCount <= self._repeatFailedRequestCount:
-            tryCount += 1
-            try:
-                url = self._hostAnalytics + methodUrl
-                # make the request
-                respInfo = self._reqSession.post(url, json = paramDict, timeout=60)
-                # remember the returned headers
-                self._headers = respInfo.headers
-                # if we got some error codes print the error and repeat the request after a short time period
-                if respInfo.status_code != 200:
-                    raise Exception(respInfo.text)
-                returnData = respInfo.json()
-                break
-            except Exception as ex:
-                self._lastException = ex
-                if self._verboseOutput:
-                    logger.error("Event Registry Analytics exception while executing the request:")
-                    logger.error("endpoint: %s\nParams: %s", url, json.dumps(paramDict, indent=4))
-                    self.printLastException()
-                # in case of invalid input parameters, don't try to repeat the search but we simply raise the same exception again
-                if respInfo is not None and respInfo.status_code in self._stopStatusCodes:
-                    break
-                logger.info("The request will be automatically repeated in 3 seconds...")
-                time.sleep(5)   # sleep for X seconds on error
-        self._lock.release()
-        if returnData is None:
-            raise self._lastException or Exception("No valid return data provided")
-        return returnData
+        state = self._resetRequestState()
+        return self._postWithRetries(self._hostAnalytics + methodUrl, paramDict, state, processHeaders = False)
 
     #
     # suggestion methods - return type is a list of matching items
@@ -560,10 +666,8 @@ class EventRegistry(object):
         @param conceptLabel: partial or full name of the concept for which to return the concept uri
         @param sources: what types of concepts should be returned. valid values are person, loc, org, wiki, entities (== person + loc + org), concepts (== entities + wiki)
         """
-        matches = self.suggestConcepts(conceptLabel, lang = lang, sources = sources)
-        if matches != None and isinstance(matches, list) and len(matches) > 0 and "uri" in matches[0]:
-            return matches[0]["uri"]
-        return None
+        return self._getCachedUri("getConceptUri", [conceptLabel, lang, sources],
+            lambda: self.suggestConcepts(conceptLabel, lang = lang, sources = sources))
 
 
     def getLocationUri(self, locationLabel: str, lang: str = "eng", sources: Union[str, List[str]] = ["place", "country"], countryUri: Union[str, None] = None, sortByDistanceTo: Union[List, Tuple, None] = None):
@@ -574,10 +678,9 @@ class EventRegistry(object):
         @param countryUri: if set, then filter the possible locatiosn to the locations from that country
         @param sortByDistanceTo: sort candidates by distance to the given (lat, long) pair
         """
-        matches = self.suggestLocations(locationLabel, sources = sources, lang = lang, countryUri = countryUri, sortByDistanceTo = sortByDistanceTo)
-        if matches != None and isinstance(matches, list) and len(matches) > 0 and "wikiUri" in matches[0]:
-            return matches[0]["wikiUri"]
-        return None
+        return self._getCachedUri("getLocationUri", [locationLabel, lang, sources, countryUri, sortByDistanceTo],
+            lambda: self.suggestLocations(locationLabel, sources = sources, lang = lang, countryUri = countryUri, sortByDistanceTo = sortByDistanceTo),
+            propName = "wikiUri")
 
 
     def getCategoryUri(self, categoryLabel: str):
@@ -585,10 +688,7 @@ class EventRegistry(object):
         return a category uri that is the best match for the given label
         @param categoryLabel: partial or full name of the category for which to return category uri
         """
-        matches = self.suggestCategories(categoryLabel)
-        if matches != None and isinstance(matches, list) and len(matches) > 0 and "uri" in matches[0]:
-            return matches[0]["uri"]
-        return None
+        return self._getCachedUri("getCategoryUri", [categoryLabel], lambda: self.suggestCategories(categoryLabel))
 
 
     def getNewsSourceUri(self, sourceName: str, dataType: Union[str, List[str]] = ["news", "pr", "blog"]):
@@ -597,10 +697,7 @@ class EventRegistry(object):
         @param sourceName: partial or full name of the source or source uri for which to return source uri
         @param dataType: return the source uri that provides content of these data types ("news", "pr", "blog" or a list of any of those)
         """
-        matches = self.suggestNewsSources(sourceName, dataType = dataType)
-        if matches != None and isinstance(matches, list) and len(matches) > 0 and "uri" in matches[0]:
-            return matches[0]["uri"]
-        return None
+        return self._getCachedUri("getNewsSourceUri", [sourceName, dataType], lambda: self.suggestNewsSources(sourceName, dataType = dataType))
 
 
     def getSourceUri(self, sourceName: str, dataType: Union[str, List[str]] = ["news", "pr", "blog"]):
@@ -615,10 +712,7 @@ class EventRegistry(object):
         return the URI of the source group that best matches the name
         @param sourceGroupName: partial or full name of the source group
         """
-        matches = self.suggestSourceGroups(sourceGroupName)
-        if matches is not None and isinstance(matches, list) and len(matches) > 0 and "uri" in matches[0]:
-            return matches[0]["uri"]
-        return None
+        return self._getCachedUri("getSourceGroupUri", [sourceGroupName], lambda: self.suggestSourceGroups(sourceGroupName))
 
 
     def getConceptClassUri(self, classLabel: str, lang: str = "eng"):
@@ -626,10 +720,7 @@ class EventRegistry(object):
         return a uri of the concept class that is the best match for the given label
         @param classLabel: partial or full name of the concept class for which to return class uri
         """
-        matches = self.suggestConceptClasses(classLabel, lang = lang)
-        if matches is not None and isinstance(matches, list) and len(matches) > 0 and "uri" in matches[0]:
-            return matches[0]["uri"]
-        return None
+        return self._getCachedUri("getConceptClassUri", [classLabel, lang], lambda: self.suggestConceptClasses(classLabel, lang = lang))
 
 
     def getConceptInfo(self, conceptUri: str,
@@ -650,10 +741,7 @@ class EventRegistry(object):
         if there are multiple matches for the given author name, they are sorted based on the number of articles they have written (from most to least frequent)
         @param authorName: partial or full name of the author, potentially also containing the source url (e.g. "george brown nytimes")
         """
-        matches = self.suggestAuthors(authorName)
-        if matches is not None and isinstance(matches, list) and len(matches) > 0 and "uri" in matches[0]:
-            return matches[0]["uri"]
-        return None
+        return self._getCachedUri("getAuthorUri", [authorName], lambda: self.suggestAuthors(authorName))
 
 
     def getEventTypeUri(self, eventTypeLabel: str):
@@ -661,10 +749,68 @@ class EventRegistry(object):
         return event type uri that is the best match for the given label
         @param eventTypeLabel: partial or full name of the event type for which we want to retrieve uri
         """
-        matches = self.suggestEventTypes(eventTypeLabel)
-        if matches is not None and isinstance(matches, list) and len(matches) > 0 and "uri" in matches[0]:
-            return matches[0]["uri"]
-        return None
+        return self._getCachedUri("getEventTypeUri", [eventTypeLabel], lambda: self.suggestEventTypes(eventTypeLabel))
+
+
+    def warmUpUriCache(self, labels: List[str], method: str = "getConceptUri", maxParallel: Union[int, None] = None, **kwargs):
+        """
+        resolve the labels using one of the get*Uri() methods and store the uris in the uri cache, so that the queries built
+        later don't have to wait for the requests. The labels that are already cached are not requested again and the other ones
+        are resolved by at most maxParallel threads at the same time
+        @param labels: list of labels (concept labels, location labels, source names, ...)
+        @param method: the name of the method used to resolve the labels: "getConceptUri", "getLocationUri", "getCategoryUri",
+            "getNewsSourceUri", "getSourceUri", "getSourceGroupUri", "getConceptClassUri", "getAuthorUri" or "getEventTypeUri"
+        @param maxParallel: the number of labels to resolve at the same time. If None, maxConcurrentRequests is used
+        @param kwargs: the other arguments of the method (e.g. lang = "deu", sources = ["person"])
+        @returns: ResolvedUris - dict where the key is the label and the value is its uri or None if no uri was found
+        """
+        assert method in self._URI_METHODS, "method should be one of %s" % self._URI_METHODS
+        return self._resolveUris(method, labels, maxParallel, kwargs)
+
+
+    def resolveConceptUris(self, conceptLabels: List[str], lang: str = "eng", sources: Union[str, List[str]] = ["concepts"], maxParallel: Union[int, None] = None):
+        """
+        return the concept uris that best match the given labels. Same as calling getConceptUri() for each label, but the duplicate
+        labels are resolved once and up to maxParallel labels are resolved at the same time. The requests still respect the rate
+        limiter and the concurrency controller, so use a sufficient maxConcurrentRequests (and rate limit) to benefit from it
+        @param conceptLabels: list of partial or full names of the concepts
+        @param lang: language of the labels
+        @param sources: what types of concepts should be returned. See getConceptUri()
+        @param maxParallel: the number of labels to resolve at the same time. If None, maxConcurrentRequests is used
+        @returns: ResolvedUris - dict where the key is the label and the value is its uri. Use getUnresolved() to get the labels without a match
+        """
+        return self._resolveUris("getConceptUri", conceptLabels, maxParallel, {"lang": lang, "sources": sources})
+
+
+    def resolveLocationUris(self, locationLabels: List[str], lang: str = "eng", sources: Union[str, List[str]] = ["place", "country"], countryUri: Union[str, None] = None, maxParallel: Union[int, None] = None):
+        """
+        return the location uris that best match the given labels. See resolveConceptUris() and getLocationUri()
+        @param locationLabels: list of partial or full location names
+        @param lang: language of the labels
+        @param sources: what types of locations are we interested in. Possible options are "place" and "country"
+        @param countryUri: if set, then only the locations from that country are considered
+        @param maxParallel: the number of labels to resolve at the same time. If None, maxConcurrentRequests is used
+        """
+        return self._resolveUris("getLocationUri", locationLabels, maxParallel, {"lang": lang, "sources": sources, "countryUri": countryUri})
+
+
+    def resolveSourceUris(self, sourceNames: List[str], dataType: Union[str, List[str]] = ["news", "pr", "blog"], maxParallel: Union[int, None] = None):
+        """
+        return the news source uris that best match the given source names. See resolveConceptUris() and getNewsSourceUri()
+        @param sourceNames: list of partial or full names of the sources
+        @param dataType: return the sources that provide content of these data types ("news", "pr", "blog" or a list of any of those)
+        @param maxParallel: the number of names to resolve at the same time. If None, maxConcurrentRequests is used
+        """
+        return self._resolveUris("getNewsSourceUri", sourceNames, maxParallel, {"dataType": dataType})
+
+
+    def resolveAuthorUris(self, authorNames: List[str], maxParallel: Union[int, None] = None):
+        """
+        return the author uris that best match the given author names. See resolveConceptUris() and getAuthorUri()
+        @param authorNames: list of partial or full names of the authors, potentially also containing the source url (e.g. "george brown nytimes")
+        @param maxParallel: the number of names to resolve at the same time. If None, maxConcurrentRequests is used
+        """
+        return self._resolveUris("getAuthorUri", authorNames, maxParallel, {})
 
 
     @staticmethod
@@ -705,25 +851,345 @@ class EventRegistry(object):
     #
     # internal methods
 
+    def _requireSync(self, caller: str):
+        """
+        check that the caller can read the results of the requests synchronously. Overridden by AsyncEventRegistry,
+        whose requests return coroutines
+        @param caller: name of the class or method that needs the results (used in the error message)
+        """
+        pass
+
+
+    def _resolveUris(self, method: str, labels: List[str], maxParallel: Union[int, None], kwargs: dict) -> ResolvedUris:
+        """
+        resolve each of the unique labels by calling the get*Uri() method, using a pool of at most maxParallel threads.
+        A failed request doesn't stop the others - its label is reported as unresolved together with the exception
+        """
+        assert isinstance(labels, (list, tuple)), "labels should be a list of strings"
+        uniqueLabels = list(dict.fromkeys(labels))
+        getUri = getattr(self, method)
+
+        def resolve(label):
+            try:
+                return getUri(label, **kwargs), None
+            except Exception as ex:
+                return None, ex
+
+        maxParallel = min(maxParallel or self._maxConcurrentRequests, len(uniqueLabels))
+        if maxParallel <= 1:
+            results = [resolve(label) for label in uniqueLabels]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(maxParallel, thread_name_prefix = "eventregistry-uri") as executor:
+                results = list(executor.map(resolve, uniqueLabels))
+        errors = dict((label, ex) for label, (_, ex) in zip(uniqueLabels, results) if ex is not None)
+        if len(errors) > 0:
+            logger.warning("Failed to resolve %d of the %d labels using %s(). The first error: %s", len(errors), len(uniqueLabels), method, next(iter(errors.values())))
+        return ResolvedUris(((label, uri) for label, (uri, _) in zip(uniqueLabels, results)), errors)
+
+
+    def _getCachedUri(self, method: str, args: List, suggest, propName: str = "uri"):
+        """
+        return the uri for the label from the uri cache or resolve it using the suggest function. Only successful responses
+        are cached - the label is not remembered as unknown if the request returned an error
+        @param method: the name of the get*Uri() method
+        @param args: the arguments of the method that determine the result
+        @param suggest: function that makes the suggest request and returns the matches
+        @param propName: the property of the best match that contains the uri
+        """
+        if self._uriCache is None:
+            return self._getFirstMatchProperty(suggest(), propName)
+        key = UriCache.getKey(method, args)
+        found, uri = self._uriCache.get(key)
+        if found:
+            return uri
+        matches = suggest()
+        uri = self._getFirstMatchProperty(matches, propName)
+        if isinstance(matches, list):
+            self._uriCache.set(key, uri)
+        return uri
+
+
+    @staticmethod
+    def _getFirstMatchProperty(matches, propName: str):
+        """return the value of propName in the first of the suggested matches or None if there are no matches"""
+        if matches is not None and isinstance(matches, list) and len(matches) > 0 and propName in matches[0]:
+            return matches[0][propName]
+        return None
+
+
+    def _makeRequest(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None], allowUseOfArchive: Union[bool, None], decode: bool):
+        """
+        make the request for jsonRequest() and jsonRequestRaw(). If a request coalescer is used, the callers that make an identical
+        read-only request at the same time wait for the first one and get its result (and its headers)
+        """
+        if self._requestCoalescer is None or methodUrl not in self._COALESCED_PATHS:
+            return self._sendRequest(methodUrl, paramDict, customLogFName, allowUseOfArchive, decode)
+        decoded = []
+
+        def sendRequest():
+            data = self._sendRequest(methodUrl, paramDict, customLogFName, allowUseOfArchive, decode = False)
+            return self._getCoalescedResult(data, decode, decoded)
+
+        data, state, _ = self._requestCoalescer.do(self._getCoalescingKey(methodUrl, paramDict, allowUseOfArchive),
+            sendRequest, canMemoize = lambda result: result[2])
+        self._setRequestState(state)
+        return self._decodeCoalescedResult(data, decode, decoded)
+
+
+    def _sendRequest(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None], allowUseOfArchive: Union[bool, None], decode: bool):
+        """send the request (respecting the rate limiter) and return the response"""
+        state = self._resetRequestState()
+        self._sleepIfNecessary()
+        self._logRequest(methodUrl, paramDict, customLogFName)
+        paramDict = self._prepareRequestParams(paramDict, allowUseOfArchive)
+        return self._postWithRetries(self._host + methodUrl, paramDict, state, processHeaders = True, decode = decode)
+
+
+    def _getCoalescingKey(self, methodUrl: str, paramDict: dict, allowUseOfArchive: Union[bool, None]):
+        """
+        return the key that identifies identical requests: the host, the api key, the path and the canonical parameters.
+        The api key is part of the key, so that a coalescer shared by several clients doesn't mix the responses of different users
+        """
+        return (self._host, self._apiKey, ResponseCache.getKey(methodUrl, self._prepareRequestParams(dict(paramDict or {}), allowUseOfArchive)))
+
+
+    def _getCoalescedResult(self, data: bytes, decode: bool, decoded: list):
+        """
+        return the result shared by the coalesced callers: the body of the response (that each caller decodes separately, so that
+        they don't share the same mutable object), the request state and whether the response can be remembered. The caller that
+        made the request keeps the decoded response in decoded. The raw responses are not checked, so they are not remembered
+        """
+        if not decode:
+            return data, self._getRequestState(), False
+        decoded.append(self._jsonCodec.decode(data))
+        return data, self._getRequestState(), self._canMemoizeResponse(decoded[0])
+
+
+    def _decodeCoalescedResult(self, data: bytes, decode: bool, decoded: list):
+        if not decode:
+            return data
+        return decoded[0] if len(decoded) > 0 else self._jsonCodec.decode(data)
+
+
+    @staticmethod
+    def _canMemoizeResponse(respInfo) -> bool:
+        """the responses with errors are not remembered by the request coalescer"""
+        return isinstance(respInfo, list) or (isinstance(respInfo, dict) and "error" not in respInfo)
+
+
+    def _postWithRetries(self, url: str, paramDict: dict, state: _RequestState, processHeaders: bool, decode: bool = True):
+        """
+        post the paramDict to the url and return the parsed json response. repeat the request in case of failures
+        @param url: full url to which to make the request
+        @param paramDict: the parameters to send
+        @param state: object in which to store the headers and the exception of the request
+        @param processHeaders: should the response headers be checked for warnings and token usage
+        @param decode: if False, the body of the response is returned without parsing it
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        # the body is encoded once and reused when the request is repeated
+        body = self._jsonCodec.encode(paramDict)
+        tryCount = 0
+        while True:
+            tryCount += 1
+            # fail fast if the host is known to be down
+            isProbe = self._circuitBreaker is not None and self._circuitBreaker.beforeRequest(host)
+            respInfo = None
+            state.statusCode = None
+            try:
+                try:
+                    # make the request. occupy the concurrency slot only while the request is in flight
+                    self._concurrencyController.acquire()
+                    startTime = time.time()
+                    try:
+                        respInfo = self._reqSession.post(url, data = body, headers = {"Content-Type": "application/json"}, timeout=60)
+                    finally:
+                        self._concurrencyController.release()
+                        self._recordRequestOutcome(host, time.time() - startTime,
+                            respInfo.status_code if respInfo is not None else None,
+                            respInfo.headers if respInfo is not None else None)
+                finally:
+                    if isProbe:
+                        self._circuitBreaker.releaseProbe(host)
+                # remember the returned headers
+                state.statusCode = respInfo.status_code
+                state.headers = respInfo.headers
+                # if we got some error codes print the error and repeat the request after a short time period
+                if respInfo.status_code != 200:
+                    raise Exception(respInfo.text)
+                if processHeaders:
+                    self._processResponseHeaders(respInfo.headers, state)
+                return self._jsonCodec.decode(respInfo.content) if decode else respInfo.content
+            except Exception as ex:
+                delay = self._getRetryDelay(url, paramDict, state, ex, tryCount)
+                if delay is None:
+                    break
+                time.sleep(delay)
+        raise state.exception or Exception("No valid return data provided")
+
+
+    def _recordRequestOutcome(self, host: str, latency: float, statusCode: Union[int, None], headers):
+        """report the outcome of a single http request to the concurrency controller and the circuit breaker"""
+        self._concurrencyController.recordResult(latency, statusCode, headers)
+        if self._circuitBreaker is not None:
+            if ConcurrencyController.isCongestionSignal(statusCode):
+                self._circuitBreaker.recordFailure(host)
+            else:
+                self._circuitBreaker.recordSuccess(host)
+
+
+    def _getRetryDelay(self, url: str, paramDict: dict, state: _RequestState, ex: Exception, tryCount: int):
+        """
+        called when a request failed. Report the error and determine if the request should be repeated
+        @returns: the number of seconds to wait before repeating the request or None if the request should not be repeated
+        """
+        state.exception = ex
+        if self._verboseOutput:
+            logger.error("Event Registry exception while executing the request:")
+            logger.error("endpoint: %s\nParams: %s", url, json.dumps(paramDict, indent=4))
+            self.printLastException()
+        # in case of invalid input parameters, don't try to repeat the search but we simply raise the same exception again
+        if state.statusCode in self._stopStatusCodes or not self._retryPolicy.shouldRetry(tryCount):
+            return None
+        # in case of the other exceptions (maybe the service is temporarily unavailable) we try to repeat the query
+        retryAfter = RetryPolicy.parseRetryAfter(state.headers.get("retry-after")) if state.statusCode is not None else None
+        delay = self._retryPolicy.getDelay(tryCount, retryAfter)
+        logger.info("The request will be automatically repeated in %.1f seconds...", delay)
+        return delay
+
+
+    def _getRequestState(self):
+        """return the information about the last request made in the current thread (or asyncio task)"""
+        states = _requestStates.get()
+        state = states.get(self) if states is not None else None
+        if state is None:
+            state = self._resetRequestState()
+        return state
+
+
+    def _resetRequestState(self):
+        """start tracking a new request in the current thread (or asyncio task)"""
+        state = _RequestState()
+        self._setRequestState(state)
+        return state
+
+
+    def _setRequestState(self, state: _RequestState):
+        """set the information about the last request made in the current thread (or asyncio task)"""
+        states = _requestStates.get()
+        states = weakref.WeakKeyDictionary(states) if states is not None else weakref.WeakKeyDictionary()
+        states[self] = state
+        _requestStates.set(states)
+
+
+    def _logRequest(self, methodUrl: str, paramDict: dict, customLogFName: Union[str, None] = None):
+        """if logging of requests is enabled, append the request info to the log file"""
+        if not self._logRequests:
+            return
+        try:
+            with open(customLogFName or self._requestLogFName, "a", encoding="utf-8") as log:
+                if isinstance(paramDict, dict):
+                    log.write("# " + json.dumps(paramDict) + "\n")
+                log.write(methodUrl + "\n\n")
+        except Exception as ex:
+            self._getRequestState().exception = ex
+
+
+    def _prepareRequestParams(self, paramDict: Union[dict, None], allowUseOfArchive: Union[bool, None] = None):
+        """
+        add to paramDict the parameters that are sent with every request (api key, archive flag, extra params)
+        @param paramDict: the parameters of the request. can be None
+        @param allowUseOfArchive: if not None, overrides the value set in the constructor
+        """
+        if paramDict is None:
+            paramDict = {}
+        # if we have api key then add it to the paramDict
+        if self._apiKey:
+            paramDict["apiKey"] = self._apiKey
+        # if we want to ignore the archive, set the flag
+        if isinstance(allowUseOfArchive, bool):
+            if not allowUseOfArchive:
+                paramDict["forceMaxDataTimeWindow"] = 31
+        # if we didn't override the parameter then check what we've set when constructing the EventRegistry class
+        elif self._allowUseOfArchive is False:
+            paramDict["forceMaxDataTimeWindow"] = 31
+        # if we also have some extra parameters, then set those too
+        if self._extraParams:
+            paramDict.update(self._extraParams)
+        return paramDict
+
+
+    def _getCacheKey(self, path: str, paramDict: dict, allowUseOfArchive: Union[bool, None] = None):
+        """
+        return the key under which the response for the request is cached or None if the response should not be cached.
+        The key depends on the host and all the parameters that are sent with the request, except the api key
+        """
+        if self._responseCache is None:
+            return None
+        paramDict = self._prepareRequestParams(dict(paramDict), allowUseOfArchive)
+        if self._responseCache.getTtl(path, paramDict) == CachePolicy.NO_CACHE:
+            return None
+        return ResponseCache.getKey(path, paramDict, host = self._host)
+
+
+    def _storeCachedResponse(self, cacheKey: Union[str, None], path: str, paramDict: dict, respInfo):
+        """store the response in the cache (for as long as determined by the cache policy) unless it is an error"""
+        if cacheKey is None or respInfo is None:
+            return
+        if isinstance(respInfo, (dict, LazyResponse)) and "error" in respInfo:
+            return
+        if isinstance(respInfo, LazyResponse):
+            self._responseCache.setRaw(cacheKey, respInfo.getData(), ttl = self._responseCache.getTtl(path, paramDict))
+        else:
+            self._responseCache.set(cacheKey, respInfo, ttl = self._responseCache.getTtl(path, paramDict))
+
+
+    def _processResponseHeaders(self, headers, state: _RequestState):
+        """report any warnings and remember the token usage reported in the headers of a successful response"""
+        # did we get a warning. if yes, print it
+        if headers.get("warning"):
+            logger.warning("=========== WARNING ===========\n%s\n===============================", headers.get("warning"))
+        # remember the available requests
+        state.dailyAvailableRequests = tryParseInt(headers.get("x-ratelimit-limit", ""), val = -1)
+        state.remainingAvailableRequests = tryParseInt(headers.get("x-ratelimit-remaining", ""), val = -1)
+        self._dailyAvailableRequests = state.dailyAvailableRequests
+        self._remainingAvailableRequests = state.remainingAvailableRequests
+
+
     def _sleepIfNecessary(self):
-        """ensure that queries are not made too fast"""
-        t = time.time()
-        if t - self._lastQueryTime < self._minDelayBetweenRequests:
-            time.sleep(self._minDelayBetweenRequests - (t - self._lastQueryTime))
-        self._lastQueryTime = t
+        """ensure that queries are not made too fast. Remember how long the caller had to wait"""
+        if self._rateLimiter is not None:
+            self._getRequestState().rateLimiterWaitTime = self._rateLimiter.acquire()
 
 
 
 class ArticleMapper:
-    def __init__(self, er: EventRegistry, rememberMappings: bool = True):
+    def __init__(self, er: EventRegistry,
+                 rememberMappings: bool = True,
+                 maxSize: int = 100000,
+                 fileName: Union[str, None] = None,
+                 chunkSize: int = 100,
+                 maxParallel: Union[int, None] = None):
         """
         create instance of article mapper
         it will map from article urls to article uris
         the mappings can be remembered so it will not repeat requests for the same article urls
-        """
+        @param er: instance of EventRegistry used to make the requests
+        @param rememberMappings: should the mappings be remembered
+        @param maxSize: the max number of mappings to keep in memory. When exceeded, the least recently used ones are removed from memory
+        @param fileName: path to the SQLite file where the mappings are stored, so that they are available after a restart.
+            If None, the mappings are only kept in memory
+        @param chunkSize: the number of urls that getArticleUris() sends in a single request
+        @param maxParallel: the number of requests that getArticleUris() makes at the same time. If None, maxConcurrentRequests of er is used
+        """
+        er._requireSync("ArticleMapper")
+        assert chunkSize > 0, "chunkSize should be a positive number"
         self._er = er
-        self._articleUrlToUri = {}
         self._rememberMappings = rememberMappings
+        # the mappings are stored as json, since a url can map to several uris
+        self._cache = UriCache(maxSize = maxSize, fileName = fileName, ttl = None) if rememberMappings else None
+        self._chunkSize = chunkSize
+        self._maxParallel = maxParallel
 
 
     def getArticleUri(self, articleUrl: str):
@@ -733,12 +1199,63 @@ class ArticleMapper:
         @param articleUrl: string containing the article url
         @returns string: list of strings representing article uris.
         """
-        if articleUrl in self._articleUrlToUri:
-            return self._articleUrlToUri[articleUrl]
-        res = self._er.getArticleUris(articleUrl)
-        if res and articleUrl in res:
-            val = res[articleUrl]
-            if self._rememberMappings:
-                self._articleUrlToUri[articleUrl] = val
-            return val
-        return None
\ No newline at end of file
+        return self.getArticleUris([articleUrl]).get(articleUrl)
+
+
+    def getArticleUris(self, articleUrls: List[str]) -> dict:
+        """
+        return the article uris for a list of article urls. The urls whose mappings are not remembered yet are sent in chunks of
+        chunkSize urls, several chunks at the same time
+        @param articleUrls: list of article urls
+        @returns: dict where the key is the article url and the value is the same as returned by getArticleUri() (None if the url was not mapped)
+        @raises: the exception of the first failed request, after the mappings returned by the other requests were remembered
+        """
+        assert isinstance(articleUrls, (list, tuple)), "articleUrls should be a list of urls"
+        mappings = {}
+        missingUrls = []
+        for articleUrl in dict.fromkeys(articleUrls):
+            found, value = self._cache.get(articleUrl) if self._cache is not None else (False, None)
+            if found:
+                mappings[articleUrl] = json.loads(value)
+            else:
+                missingUrls.append(articleUrl)
+        chunks = [missingUrls[i: i + self._chunkSize] for i in range(0, len(missingUrls), self._chunkSize)]
+        errors = []
+
+        def mapChunk(chunk):
+            try:
+                res = self._er.getArticleUris(chunk)
+            except Exception as ex:
+                errors.append(ex)
+                return
+            for articleUrl in chunk:
+                if res and articleUrl in res:
+                    mappings[articleUrl] = res[articleUrl]
+                    if self._cache is not None:
+                        self._cache.set(articleUrl, json.dumps(res[articleUrl]))
+                else:
+                    mappings[articleUrl] = None
+
+        maxParallel = min(self._maxParallel or self._er._maxConcurrentRequests, len(chunks))
+        if maxParallel <= 1:
+            for chunk in chunks:
+                mapChunk(chunk)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(maxParallel, thread_name_prefix = "eventregistry-mapper") as executor:
+                list(executor.map(mapChunk, chunks))
+        # the mappings of the successful requests are remembered, so repeating the call only requests the failed chunks
+        if len(errors) > 0:
+            logger.warning("Failed to map %d of the %d chunks of article urls", len(errors), len(chunks))
+            raise errors[0]
+        return dict((articleUrl, mappings[articleUrl]) for articleUrl in articleUrls)
+
+
+    def getStats(self) -> dict:
+        """return the statistics of the remembered mappings (see UriCache.getStats())"""
+        return self._cache.getStats() if self._cache is not None else {}
+
+
+    def close(self):
+        """close the file with the remembered mappings"""
+        if self._cache is not None:
+            self._cache.close()
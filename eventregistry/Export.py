@@ -0,0 +1,279 @@
+"""
+export of the results (articles, events, mentions, recent activity, ...) into files.
+
+NdjsonExporter writes one json object per line (NDJSON), optionally compressed with gzip or zstd. ParquetExporter writes
+the selected columns of the results into Parquet files. The results are written in batches, so the memory used does not
+depend on the number of exported results, and the files can be rotated after a given number of results, so that large
+archives are split into files of manageable size.
+
+The exporters accept lists of results (write()) or any iterable over the results (writeAll()). If the iterable has the
+iterBatches() method (QueryArticlesIter, QueryEventsIter, DateShardedIter, BulkQueryIter, ...) the results are written
+a page at a time. Usage:
+    with NdjsonExporter("articles-{part:04d}.ndjson.gz", compression = "gzip", maxItemsPerFile = 100000) as exporter:
+        exporter.writeAll(QueryArticlesIter(keywords = "Tesla").execQuery(er))
+
+The zstd compression requires the zstandard package and the Parquet export requires the pyarrow package. They are only
+imported when used.
+"""
+import gzip, itertools
+from typing import Union, List, Tuple, Iterable
+from eventregistry.Columnar import ARTICLE_COLUMNS, getRows, getArrowSchema, toArrowBatch
+from eventregistry.JsonCodec import JsonCodec, getDefaultJsonCodec
+
+
+class ExporterBase(object):
+    """
+    base class of the exporters. It splits the written results into files. Subclasses implement _openFile(), _writeItems() and _closeFile()
+    """
+    def __init__(self, fileNamePattern: str,
+                 maxItemsPerFile: Union[int, None] = None,
+                 columns: Union[List[Union[str, Tuple]], None] = None):
+        """
+        @param fileNamePattern: name of the file to write. If the files are rotated, the name has to contain "{part}" (or a formatted
+            version like "{part:04d}") that is replaced by the index of the file (0, 1, ...)
+        @param maxItemsPerFile: the number of results after which a new file is started. If None, all the results are written into a single file
+        @param columns: the columns to export as a list of (column name, path, type) tuples or paths (see Columnar.py)
+        """
+        assert maxItemsPerFile is None or maxItemsPerFile > 0, "maxItemsPerFile should be a positive number"
+        self._fileNamePattern = fileNamePattern
+        self._maxItemsPerFile = maxItemsPerFile
+        self._columns = columns
+        self._fileNames = []
+        self._fileItemCount = 0
+        self._itemCount = 0
+        self._isFileOpen = False
+        self._closed = False
+
+
+    def write(self, items: List):
+        """
+        write the list of results. New files are started when the current one is full
+        """
+        assert not self._closed, "the exporter was already closed"
+        start = 0
+        while start < len(items):
+            if self._isFileOpen and self._isFileFull():
+                self._closeCurrentFile()
+            if not self._isFileOpen:
+                self._openNextFile()
+            end = len(items)
+            if self._maxItemsPerFile is not None:
+                end = min(end, start + self._maxItemsPerFile - self._fileItemCount)
+            self._writeItems(items[start:end])
+            self._fileItemCount += end - start
+            self._itemCount += end - start
+            start = end
+
+
+    def writeAll(self, results: Iterable, batchSize: int = 1000) -> int:
+        """
+        write all the results from the iterable. If the iterable has the iterBatches() method (the iterators over the search results),
+        the results are written a page at a time, otherwise in batches of batchSize results
+        @param results: an iterator over the results (QueryArticlesIter, QueryEventsIter, DateShardedIter, ...) or any other iterable
+        @param batchSize: the number of results to write at once when the iterable has no iterBatches() method
+        @returns: the number of written results
+        """
+        assert batchSize > 0, "batchSize should be a positive number"
+        if hasattr(results, "iterBatches"):
+            batches = results.iterBatches()
+        else:
+            it = iter(results)
+            batches = iter(lambda: list(itertools.islice(it, batchSize)), [])
+        count = 0
+        for batch in batches:
+            self.write(batch)
+            count += len(batch)
+        return count
+
+
+    def getFileNames(self) -> List[str]:
+        """return the names of the files that were written so far"""
+        return list(self._fileNames)
+
+
+    def getItemCount(self) -> int:
+        """return the number of written results"""
+        return self._itemCount
+
+
+    def close(self):
+        """finish writing the current file. Has to be called (or the exporter used in a "with" block) for the files to be complete"""
+        if self._isFileOpen:
+            self._closeCurrentFile()
+        self._closed = True
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+    def _isFileFull(self) -> bool:
+        """should a new file be started before writing more results"""
+        return self._maxItemsPerFile is not None and self._fileItemCount >= self._maxItemsPerFile
+
+
+    def _openNextFile(self):
+        fileName = self._fileNamePattern.format(part = len(self._fileNames))
+        if fileName in self._fileNames:
+            raise ValueError("The file name pattern '%s' has to contain {part} in order to write more than one file" % self._fileNamePattern)
+        self._openFile(fileName)
+        self._fileNames.append(fileName)
+        self._fileItemCount = 0
+        self._isFileOpen = True
+
+
+    def _closeCurrentFile(self):
+        self._closeFile()
+        self._isFileOpen = False
+
+
+    def _openFile(self, fileName: str):
+        raise NotImplementedError
+
+
+    def _writeItems(self, items: List):
+        raise NotImplementedError
+
+
+    def _closeFile(self):
+        raise NotImplementedError
+
+
+
+class NdjsonExporter(ExporterBase):
+    """
+    exporter that writes each result as a json object on a separate line (NDJSON). The files can be compressed with gzip or zstd
+    """
+    # the supported compressions
+    COMPRESSIONS = [None, "gzip", "zstd"]
+
+    def __init__(self, fileNamePattern: str,
+                 compression: Union[str, None] = "gzip",
+                 compressionLevel: Union[int, None] = None,
+                 maxItemsPerFile: Union[int, None] = None,
+                 maxBytesPerFile: Union[int, None] = None,
+                 columns: Union[List[Union[str, Tuple]], None] = None,
+                 jsonCodec: Union[JsonCodec, None] = None):
+        """
+        @param fileNamePattern: name of the file to write (e.g. "articles-{part:04d}.ndjson.gz"). See ExporterBase
+        @param compression: None, "gzip" or "zstd" (requires the zstandard package)
+        @param compressionLevel: the compression level. If None, the default level is used (6 for gzip, 3 for zstd)
+        @param maxItemsPerFile: the number of results after which a new file is started
+        @param maxBytesPerFile: the number of (uncompressed) bytes after which a new file is started. The file is rotated after
+            the batch of results that exceeded the limit, so it can be larger by the size of a batch
+        @param columns: if set, only these columns of the results are written, as a list of (column name, path, type) tuples or paths.
+            If None, the complete results are written
+        @param jsonCodec: instance of JsonCodec used to encode the results. If None, getDefaultJsonCodec() is used
+        """
+        assert compression in self.COMPRESSIONS, "compression should be one of %s" % self.COMPRESSIONS
+        assert maxBytesPerFile is None or maxBytesPerFile > 0, "maxBytesPerFile should be a positive number"
+        ExporterBase.__init__(self, fileNamePattern, maxItemsPerFile = maxItemsPerFile, columns = columns)
+        self._compression = compression
+        self._compressionLevel = compressionLevel
+        self._maxBytesPerFile = maxBytesPerFile
+        self._jsonCodec = jsonCodec or getDefaultJsonCodec()
+        self._zstd = None
+        if compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("Compression with zstd requires the zstandard package. Install it by calling: pip install zstandard")
+            self._zstd = zstandard
+        self._rawFile = None
+        self._file = None
+        self._fileByteCount = 0
+
+
+    def _isFileFull(self) -> bool:
+        return ExporterBase._isFileFull(self) or (self._maxBytesPerFile is not None and self._fileByteCount >= self._maxBytesPerFile)
+
+
+    def _openFile(self, fileName: str):
+        self._rawFile = open(fileName, "wb")
+        if self._compression == "gzip":
+            self._file = gzip.GzipFile(fileobj = self._rawFile, mode = "wb", compresslevel = self._compressionLevel or 6)
+        elif self._compression == "zstd":
+            self._file = self._zstd.ZstdCompressor(level = self._compressionLevel or 3).stream_writer(self._rawFile, closefd = False)
+        else:
+            self._file = self._rawFile
+        self._fileByteCount = 0
+
+
+    def _writeItems(self, items: List):
+        if self._columns is not None:
+            items = getRows(items, self._columns)
+        # encode the whole batch at once - a single write is much faster than a write per result
+        encode = self._jsonCodec.encode
+        data = b"".join(encode(item) + b"\n" for item in items)
+        self._file.write(data)
+        self._fileByteCount += len(data)
+
+
+    def _closeFile(self):
+        if self._file is not self._rawFile:
+            self._file.close()
+        self._rawFile.close()
+        self._file = None
+        self._rawFile = None
+
+
+
+class ParquetExporter(ExporterBase):
+    """
+    exporter that writes the selected columns of the results into Parquet files. The results are collected into row groups
+    of rowGroupSize results, so at most that many results are held in memory. Requires the pyarrow package
+    """
+    def __init__(self, fileNamePattern: str,
+                 columns: List[Union[str, Tuple]] = ARTICLE_COLUMNS,
+                 compression: Union[str, None] = "zstd",
+                 rowGroupSize: int = 10000,
+                 maxItemsPerFile: Union[int, None] = None):
+        """
+        @param fileNamePattern: name of the file to write (e.g. "articles-{part:04d}.parquet"). See ExporterBase
+        @param columns: the columns to write as a list of (column name, path, type) tuples or paths. By default the common
+            properties of the articles (ARTICLE_COLUMNS). Use EVENT_COLUMNS for the events
+        @param compression: the compression of the Parquet file: None, "snappy", "gzip", "zstd", ...
+        @param rowGroupSize: the number of results in a row group
+        @param maxItemsPerFile: the number of results after which a new file is started
+        """
+        assert rowGroupSize > 0, "rowGroupSize should be a positive number"
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Export to Parquet requires the pyarrow package. Install it by calling: pip install pyarrow")
+        ExporterBase.__init__(self, fileNamePattern, maxItemsPerFile = maxItemsPerFile, columns = columns)
+        self._parquet = pyarrow.parquet
+        self._schema = getArrowSchema(columns)
+        self._compression = compression
+        self._rowGroupSize = rowGroupSize
+        self._writer = None
+        self._rows = []
+
+
+    def _openFile(self, fileName: str):
+        self._writer = self._parquet.ParquetWriter(fileName, self._schema, compression = self._compression or "none")
+        self._rows = []
+
+
+    def _writeItems(self, items: List):
+        self._rows.extend(items)
+        while len(self._rows) >= self._rowGroupSize:
+            self._writeRowGroup(self._rows[:self._rowGroupSize])
+            del self._rows[:self._rowGroupSize]
+
+
+    def _closeFile(self):
+        if len(self._rows) > 0:
+            self._writeRowGroup(self._rows)
+        self._rows = []
+        self._writer.close()
+        self._writer = None
+
+
+    def _writeRowGroup(self, items: List):
+        import pyarrow
+        self._writer.write_table(pyarrow.Table.from_batches([toArrowBatch(items, self._columns)], schema = self._schema))
@@ -0,0 +1,99 @@
+"""
+json codecs used to encode the bodies of the requests and to decode the responses.
+
+The responses with full article bodies are large and decoding them takes a noticeable share of the time spent in the
+client. JsonCodec uses the json module from the standard library, OrjsonCodec and UjsonCodec use the faster orjson and
+ujson packages. getDefaultJsonCodec() returns the codec used when none is provided: if orjson is installed, it is used to
+decode the responses, but the data is always encoded with the json module, so that the encoded requests don't depend on
+the installed packages (orjson for example rejects non-string dict keys). A codec can be passed to the EventRegistry and
+AsyncEventRegistry constructors using the jsonCodec parameter, e.g. jsonCodec = OrjsonCodec() to also encode with orjson.
+"""
+import json
+from typing import Union
+
+
+class JsonCodec(object):
+    """
+    codec that uses the json module from the standard library
+    """
+    name = "json"
+
+    def encode(self, obj) -> bytes:
+        """return the compact utf-8 encoded json representation of the object"""
+        return json.dumps(obj, separators = (",", ":"), ensure_ascii = False).encode("utf-8")
+
+
+    def encodeText(self, obj) -> str:
+        """return the json representation of the object as a string (e.g. to be sent as a parameter value)"""
+        return self.encode(obj).decode("utf-8")
+
+
+    def decode(self, data: Union[bytes, str]):
+        """parse the json data"""
+        return json.loads(data)
+
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    codec that uses the orjson package
+    """
+    name = "orjson"
+
+    def __init__(self, decodeOnly: bool = False):
+        """
+        @param decodeOnly: if True, orjson is only used to decode the data, while the data is encoded with the json module
+        """
+        try:
+            import orjson
+        except ImportError:
+            raise ImportError("OrjsonCodec requires the orjson package. Install it by calling: pip install orjson")
+        self._orjson = orjson
+        self._decodeOnly = decodeOnly
+        if decodeOnly:
+            self.name = "orjson-decode"
+
+
+    def encode(self, obj) -> bytes:
+        if self._decodeOnly:
+            return JsonCodec.encode(self, obj)
+        return self._orjson.dumps(obj)
+
+
+    def decode(self, data: Union[bytes, str]):
+        return self._orjson.loads(data)
+
+
+
+class UjsonCodec(JsonCodec):
+    """
+    codec that uses the ujson package
+    """
+    name = "ujson"
+
+    def __init__(self):
+        try:
+            import ujson
+        except ImportError:
+            raise ImportError("UjsonCodec requires the ujson package. Install it by calling: pip install ujson")
+        self._ujson = ujson
+
+
+    def encode(self, obj) -> bytes:
+        return self._ujson.dumps(obj, ensure_ascii = False, escape_forward_slashes = False).encode("utf-8")
+
+
+    def decode(self, data: Union[bytes, str]):
+        return self._ujson.loads(data)
+
+
+
+def getDefaultJsonCodec() -> JsonCodec:
+    """
+    return the codec used when none is provided: OrjsonCodec that only decodes with orjson if the package is installed,
+    otherwise JsonCodec. ujson is not used by default, since it doesn't decode all the floats exactly
+    """
+    try:
+        return OrjsonCodec(decodeOnly = True)
+    except ImportError:
+        return JsonCodec()
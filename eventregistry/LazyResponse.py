@@ -0,0 +1,182 @@
+"""
+lazy parsing of the responses.
+
+A query that requests several result types (e.g. RequestArticlesInfo, RequestArticlesConceptAggr and RequestArticlesTimeAggr
+in a single QueryArticles) returns one large json object with a section for each result type. LazyResponse scans the
+body of the response once to find where each top level section starts and ends and decodes a section only when it is
+accessed for the first time, so the sections that are not used are never turned into python objects.
+
+The response is only scanned when the json module is used to decode it (JsonCodec). In BenchmarkLazyResponse (a response
+with 5000 articles and two aggregates) reading one aggregate this way takes about 1.5 times as long as decoding the whole
+response with the json module, but the peak memory drops from 18 MB to a few KB. orjson and ujson decode the whole
+response faster than it can be scanned, so with OrjsonCodec and UjsonCodec (and with the default codec when orjson is
+installed) the response is decoded completely and LazyResponse only provides the same interface. Usage:
+
+    res = er.execQueryLazy(q)
+    for art in res["articles"]["results"]:  # only the "articles" section is decoded
+        print(art["uri"])
+"""
+import re
+from collections.abc import Mapping
+from typing import Union, Dict, Tuple
+from eventregistry.JsonCodec import JsonCodec, OrjsonCodec, UjsonCodec, getDefaultJsonCodec
+
+
+# everything up to and including the next object/array bracket that is not inside a string. The patterns are "unrolled"
+# (e.g. "[^"\\]*(?:\\.[^"\\]*)*" instead of "(?:[^"\\]|\\.)*"), which is much faster for long strings and can't
+# backtrack exponentially on invalid input
+_BRACKET_RE = re.compile(rb'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*[{}\[\]]', re.S)
+_STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_SCALAR_RE = re.compile(rb'[^,}\]\s]+')
+_WHITESPACE_RE = re.compile(rb'[ \t\n\r]*')
+
+
+class LazyResponse(Mapping):
+    """
+    read-only dict-like view of a json object (a response of the API) that decodes the values of the top level keys
+    only when they are accessed. The decoded values are kept, so each section is decoded at most once. With the codecs
+    that are faster than scanning (OrjsonCodec, UjsonCodec) all the sections are decoded immediately
+    """
+    def __init__(self, data: bytes, jsonCodec: Union[JsonCodec, None] = None):
+        """
+        @param data: the utf-8 encoded json object, e.g. as returned by jsonRequestRaw()
+        @param jsonCodec: the codec used to decode the sections. If None, the default codec is used
+        @raises ValueError: if the data is not a json object
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._jsonCodec = jsonCodec or getDefaultJsonCodec()
+        if isinstance(self._jsonCodec, (OrjsonCodec, UjsonCodec)):
+            decoded = self._jsonCodec.decode(data)
+            if not isinstance(decoded, dict):
+                raise ValueError("The response is not a json object")
+            self._data = None
+            self._sections = dict.fromkeys(decoded)
+            self._decoded = decoded
+        else:
+            self._data = data
+            self._sections = _scanSections(data)
+            self._decoded = {}
+
+
+    def __getitem__(self, key: str):
+        if key in self._decoded:
+            return self._decoded[key]
+        start, end = self._sections[key]
+        value = self._jsonCodec.decode(self._data[start:end])
+        self._decoded[key] = value
+        # once every section is decoded the body of the response is no longer needed
+        if len(self._decoded) == len(self._sections):
+            self._data = None
+        return value
+
+
+    def __contains__(self, key):
+        return key in self._sections
+
+
+    def __iter__(self):
+        return iter(self._sections)
+
+
+    def __len__(self):
+        return len(self._sections)
+
+
+    def __repr__(self):
+        return "LazyResponse(%s)" % ", ".join("%s%s" % (key, "" if key in self._decoded else "*") for key in self._sections)
+
+
+    def isDecoded(self, key: str) -> bool:
+        """was the section with the given key already decoded"""
+        return key in self._decoded
+
+
+    def getSectionSize(self, key: str) -> int:
+        """return the size of the (encoded) section in bytes"""
+        if self._data is None:
+            return len(self.getRaw(key))
+        start, end = self._sections[key]
+        return end - start
+
+
+    def getRaw(self, key: str) -> bytes:
+        """return the section as utf-8 encoded json without decoding it"""
+        if self._data is None:
+            return self._jsonCodec.encode(self._decoded[key])
+        start, end = self._sections[key]
+        return self._data[start:end]
+
+
+    def getData(self) -> bytes:
+        """return the complete response as utf-8 encoded json"""
+        if self._data is None:
+            return self._jsonCodec.encode(self._decoded)
+        return self._data
+
+
+    def toDict(self) -> dict:
+        """decode all the sections and return the response as a dict"""
+        return dict((key, self[key]) for key in self._sections)
+
+
+
+def _scanSections(data: bytes) -> Dict[str, Tuple[int, int]]:
+    """
+    return for each top level key of the json object the (start, end) offsets of its value. Only the structure
+    of the values is scanned (strings and brackets), the values are not decoded
+    """
+    pos = _skipWhitespace(data, 0)
+    if data[pos:pos + 1] != b"{":
+        raise ValueError("The response is not a json object")
+    sections = {}
+    pos = _skipWhitespace(data, pos + 1)
+    if data[pos:pos + 1] == b"}":
+        return sections
+    while True:
+        match = _STRING_RE.match(data, pos)
+        if match is None:
+            raise ValueError("Invalid json: expected a key at position %d" % pos)
+        key = JsonCodec().decode(match.group(0))
+        pos = _skipWhitespace(data, match.end())
+        if data[pos:pos + 1] != b":":
+            raise ValueError("Invalid json: expected ':' at position %d" % pos)
+        start = _skipWhitespace(data, pos + 1)
+        end = _findValueEnd(data, start)
+        sections[key] = (start, end)
+        pos = _skipWhitespace(data, end)
+        char = data[pos:pos + 1]
+        if char == b"}":
+            return sections
+        if char != b",":
+            raise ValueError("Invalid json: expected ',' or '}' at position %d" % pos)
+        pos = _skipWhitespace(data, pos + 1)
+
+
+def _findValueEnd(data: bytes, start: int) -> int:
+    """return the offset after the json value that starts at the given offset"""
+    char = data[start:start + 1]
+    if char == b"{" or char == b"[":
+        depth = 0
+        pos = start
+        # match() instead of finditer(), so that an unterminated value is not searched for again from every position
+        while True:
+            match = _BRACKET_RE.match(data, pos)
+            if match is None:
+                raise ValueError("Invalid json: the value at position %d is not terminated" % start)
+            pos = match.end()
+            char = data[pos - 1]
+            if char == 0x7b or char == 0x5b:     # { or [
+                depth += 1
+            else:                                # } or ]
+                depth -= 1
+                if depth == 0:
+                    return pos
+    match = (_STRING_RE if char == b'"' else _SCALAR_RE).match(data, start)
+    if match is None:
+        raise ValueError("Invalid json: expected a value at position %d" % start)
+    return match.end()
+
+
+def _skipWhitespace(data: bytes, pos: int) -> int:
+    return _WHITESPACE_RE.match(data, pos).end()
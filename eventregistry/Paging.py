@@ -0,0 +1,854 @@
+"""
+the paging engine used by the iterators over the search results (QueryArticlesIter, QueryEventsIter, QueryMentionsIter,
+QueryEventArticlesIter).
+
+QueryPager downloads the pages one after another. If prefetchDepth is set, the following pages are downloaded in
+background threads while the caller is processing the current page, so that the network round trips and the
+processing of the results overlap. If parallelPages is set, once the first page (and with it the total number of
+pages) is known, the remaining pages are downloaded by several threads at the same time.
+
+A page that fails to download (or returns an error) is requested again. If it still fails, PageDownloadError is
+raised, so that the results are never silently incomplete.
+
+The state of the iteration can be saved to a checkpoint file (see the checkpointFile parameter of the execQuery()
+methods). When a long export is interrupted, running the same query with the same checkpoint file continues where
+the previous run stopped, without downloading the already returned pages again and without returning duplicates.
+
+CursorPager is used for the results sorted by date (newest first). Instead of requesting page after page of the same
+query, it remembers the time of the last returned item and limits the following queries to the dates up to that time.
+The articles that are published while the iteration is running therefore don't shift the pages (causing duplicates and
+gaps in the results). Its state (the pinned time and the time and uris of the last returned items) is stored in the checkpoints.
+
+BulkQueryIter downloads the results in two phases: first the list of uris of all the matching items (up to 50,000 uris per
+request), then the details of the items in batches of uris that are downloaded in parallel. The list of uris is a
+consistent snapshot of the results and the uris that are already stored locally don't have to be downloaded again.
+"""
+import os, json, time, threading, collections, concurrent.futures
+from typing import Union, List, Callable, Tuple, Container
+from eventregistry.Base import QueryParamsBase, limitQueryDateRange
+from eventregistry.Retry import RetryPolicy
+from eventregistry.Cache import ResponseCache
+from eventregistry.Columnar import toColumnar, checkColumnar
+from eventregistry.Logger import logger
+
+
+class PageDownloadError(Exception):
+    """raised when a page of results could not be downloaded, even after repeating the request"""
+    def __init__(self, page: int, message: str):
+        Exception.__init__(self, "Failed to download page %d: %s" % (page, message))
+        self.page = page
+
+
+
+def _getItemUri(item) -> Union[str, None]:
+    """return the uri of a result (or None if the result has no uri)"""
+    return item.get("uri") if isinstance(item, dict) else None
+
+
+
+class PageQuery(QueryParamsBase):
+    """
+    snapshot of the parameters of a query for a single page of results. Since the snapshot is independent of the
+    iterator it was created from, it can be executed in a background thread while the iterator is being modified
+    """
+    def __init__(self, path: str, params: dict):
+        QueryParamsBase.__init__(self)
+        self._path = path
+        self.queryParams = params
+
+
+    @staticmethod
+    def fromQuery(query: QueryParamsBase):
+        """create a snapshot of the current parameters of the query"""
+        return PageQuery(query._getPath(), query._getQueryParams())
+
+
+    def _getPath(self):
+        return self._path
+
+
+
+class QueryPager(object):
+    """
+    downloads the pages of results for an iterator and returns the results one by one (getNextItem()) or page by page (getNextPage()).
+    At most 1 + prefetchDepth pages are held in memory at the same time: the page that is being returned to the caller
+    and the pages that are being downloaded in the background. When parallelPages is set, up to 2 * parallelPages pages
+    are requested ahead so that all the download threads are kept busy.
+    """
+    # max number of uris of the returned results that are stored in the state (see getState())
+    MAX_CHECKPOINT_URIS = 1000
+
+    def __init__(self, er,
+                 getPageQuery: Callable[[int, int], QueryParamsBase],
+                 getPageResults: Callable[[dict], Tuple[List, Union[int, None]]],
+                 pageSize: int,
+                 maxItems: int = -1,
+                 prefetchDepth: int = 0,
+                 parallelPages: int = 0,
+                 ordered: bool = True,
+                 maxPageRetries: int = 2):
+        """
+        @param er: instance of EventRegistry class used to execute the queries
+        @param getPageQuery: function that returns the query (PageQuery) for the given page number and number of results per page
+        @param getPageResults: function that parses the response and returns a tuple (list of results, total number of pages)
+        @param pageSize: number of results on a page
+        @param maxItems: the max number of items that the caller needs (-1 for all). No pages beyond this number of items are downloaded
+            and the last page is only as large as needed
+        @param prefetchDepth: number of pages to download in the background ahead of the page that is being processed. 0 means no prefetching
+        @param parallelPages: number of pages to download at the same time after the first page was downloaded. 0 means that the
+            pages are downloaded one at a time. The number of requests made at the same time is also limited by the
+            concurrency controller of the EventRegistry instance (see the maxConcurrentRequests parameter)
+        @param ordered: if True, the pages are returned in the page order. If False, they are returned in the order in which they were downloaded
+        @param maxPageRetries: the number of times a page that failed to download is requested again before PageDownloadError is raised
+        """
+        assert pageSize > 0, "pageSize should be a positive number"
+        assert prefetchDepth >= 0, "prefetchDepth should be a non-negative number"
+        assert parallelPages >= 0, "parallelPages should be a non-negative number"
+        assert maxPageRetries >= 0, "maxPageRetries should be a non-negative number"
+        self._er = er
+        self._getPageQuery = getPageQuery
+        self._getPageResults = getPageResults
+        self._pageSize = pageSize
+        self._maxItems = maxItems
+        self._prefetchDepth = max(prefetchDepth, 2 * parallelPages)
+        self._maxWorkers = parallelPages or prefetchDepth
+        self._ordered = ordered
+        self._retryPolicy = RetryPolicy(maxRetries = maxPageRetries, baseDelay = 1, maxDelay = 30)
+        if parallelPages > 1 and er.getConcurrencyController().getMaxLimit() < parallelPages:
+            logger.warning("Pages will not be downloaded in parallel since EventRegistry allows only %d concurrent requests. Set maxConcurrentRequests to at least %d",
+                er.getConcurrencyController().getMaxLimit(), parallelPages)
+        # the last page returned to the caller
+        self._page = 0
+        # the next page to request
+        self._nextPage = 1
+        self._totalPages = None
+        # (page, future) tuples of the pages that were requested but not yet returned
+        self._pending = collections.deque()
+        self._executor = None
+        # results that were downloaded but not yet returned by getNextItem()
+        self._items = collections.deque()
+        # number of items returned by getNextItem()
+        self._currItem = 0
+        # pages whose results were returned by getNextPage()
+        self._returnedPages = set()
+        # uris of the results on the last returned pages (stored in the checkpoints) and the uris loaded from a checkpoint.
+        # The results that were already returned before the paging was resumed are skipped, even if the pages have shifted
+        self._recentUris = collections.deque(maxlen = self.MAX_CHECKPOINT_URIS)
+        self._resumeUris = set()
+        self._statsLock = threading.Lock()
+        self._pageStats = []
+
+
+    def getPage(self) -> int:
+        """return the number of the last page returned by getNextPage()"""
+        return self._page
+
+
+    def getTotalPages(self) -> Union[int, None]:
+        """return the total number of pages or None if not yet known"""
+        return self._totalPages
+
+
+    def getPageStats(self) -> List[dict]:
+        """
+        return for each downloaded page the page number, the number of requested and returned results,
+        the number of attempts and the time (in seconds) it took to download it
+        """
+        with self._statsLock:
+            return list(self._pageStats)
+
+
+    def getCurrItem(self) -> int:
+        """return the number of items returned by getNextItem()"""
+        return self._currItem
+
+
+    def getBufferedItemCount(self) -> int:
+        """return the number of downloaded items that were not returned by getNextItem() yet"""
+        return len(self._items)
+
+
+    def getState(self) -> dict:
+        """
+        return the state of the paging as a json serializable dict: the pages that were already returned, the number of
+        returned items, the items of the current page that were not returned yet and the uris of the results on the last
+        returned pages (at most MAX_CHECKPOINT_URIS)
+        """
+        return {
+            "page": self._page,
+            "totalPages": self._totalPages,
+            "currItem": self._currItem,
+            "returnedPages": sorted(self._returnedPages),
+            "items": list(self._items),
+            "uris": list(self._recentUris)
+        }
+
+
+    def setState(self, state: dict):
+        """
+        continue the paging from the state returned by getState(). Has to be called before any page is requested
+        """
+        assert len(self._pending) == 0 and len(self._returnedPages) == 0, "the state can only be set before the paging starts"
+        self._page = state.get("page", 0)
+        self._totalPages = state.get("totalPages")
+        self._currItem = state.get("currItem", 0)
+        self._returnedPages = set(state.get("returnedPages", []))
+        self._items = collections.deque(state.get("items", []))
+        self._recentUris.extend(state.get("uris", []))
+        self._resumeUris = set(state.get("uris", []))
+
+
+    def getNextItem(self):
+        """
+        return the next result. Raises StopIteration when there are no more results or maxItems results were returned
+        """
+        if self._maxItems >= 0 and self._currItem >= self._maxItems:
+            self.close()
+            raise StopIteration
+        while len(self._items) == 0:
+            results = self.getNextPage()
+            if results is None:
+                raise StopIteration
+            self._items.extend(results)
+        self._currItem += 1
+        return self._items.popleft()
+
+
+    def getNextBatch(self) -> Union[List, None]:
+        """
+        return the results of the current page that were not returned yet or, if there are none, the results of the next page.
+        Returns None when there are no more results or maxItems results were returned
+        """
+        if self._maxItems >= 0 and self._currItem >= self._maxItems:
+            self.close()
+            return None
+        while len(self._items) == 0:
+            results = self.getNextPage()
+            if results is None:
+                return None
+            self._items.extend(results)
+        batch = list(self._items)
+        self._items.clear()
+        if self._maxItems >= 0:
+            batch = batch[:self._maxItems - self._currItem]
+        self._currItem += len(batch)
+        return batch
+
+
+    def getNextPage(self) -> Union[List, None]:
+        """
+        return the results on the next page or None if there are no more pages
+        """
+        self._schedulePages()
+        if len(self._pending) == 0:
+            self.close()
+            return None
+        if self._ordered or len(self._pending) == 1:
+            page, future = self._pending.popleft()
+        else:
+            page, future = self._popCompletedPage()
+        try:
+            results, totalPages = future.result()
+        except:
+            self.close()
+            raise
+        self._page = page
+        self._returnedPages.add(page)
+        if totalPages is not None:
+            self._totalPages = totalPages
+        if len(self._resumeUris) > 0:
+            results = [item for item in results if _getItemUri(item) not in self._resumeUris]
+        self._recentUris.extend(uri for uri in map(_getItemUri, results) if uri is not None)
+        # start downloading the following pages before the caller starts processing this one
+        if self._prefetchDepth > 0:
+            self._schedulePages()
+        return results
+
+
+    def close(self):
+        """cancel the downloads of the pages that were not started yet and stop the background threads"""
+        while len(self._pending) > 0:
+            self._pending.popleft()[1].cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait = False)
+            self._executor = None
+
+
+    def __del__(self):
+        if hasattr(self, "_executor"):
+            self.close()
+
+
+    def _getLastPage(self) -> Union[int, None]:
+        """return the last page that has to be downloaded or None if not yet known"""
+        lastPage = None
+        if self._maxItems >= 0:
+            lastPage = (self._maxItems + self._pageSize - 1) // self._pageSize
+        if self._totalPages is not None:
+            lastPage = self._totalPages if lastPage is None else min(lastPage, self._totalPages)
+        return lastPage
+
+
+    def _getPageRequest(self, page: int) -> Tuple[int, int]:
+        """
+        return the (page, count) to request in order to obtain the given page. If maxItems ends within the page, a smaller
+        page is requested. Its size has to divide the offset of the page, so that the results start at the same position
+        """
+        if self._maxItems < 0:
+            return page, self._pageSize
+        offset = (page - 1) * self._pageSize
+        remaining = self._maxItems - offset
+        if remaining >= self._pageSize:
+            return page, self._pageSize
+        if offset == 0:
+            return 1, remaining
+        count = min(size for size in range(remaining, self._pageSize + 1) if offset % size == 0)
+        return offset // count + 1, count
+
+
+    def _schedulePages(self):
+        """request the next pages, so that up to prefetchDepth pages are downloaded ahead"""
+        lastPage = self._getLastPage()
+        # until we know the number of pages, we only request one page at a time
+        maxPending = 1 if self._totalPages is None else max(1, self._prefetchDepth)
+        while len(self._pending) < maxPending:
+            # skip the pages that were returned before the paging was resumed from a checkpoint
+            while self._nextPage in self._returnedPages:
+                self._nextPage += 1
+            if lastPage is not None and self._nextPage > lastPage:
+                break
+            self._pending.append((self._nextPage, self._requestPage(self._nextPage)))
+            self._nextPage += 1
+
+
+    def _popCompletedPage(self) -> Tuple[int, concurrent.futures.Future]:
+        """wait until any of the pending pages is downloaded and remove it from the pending pages"""
+        done, _ = concurrent.futures.wait([future for _, future in self._pending], return_when = concurrent.futures.FIRST_COMPLETED)
+        for item in self._pending:
+            if item[1] in done:
+                self._pending.remove(item)
+                return item
+
+
+    def _requestPage(self, page: int) -> concurrent.futures.Future:
+        # the query for the page is prepared in the caller's thread. only the request is made in the background
+        requestPage, count = self._getPageRequest(page)
+        query = self._getPageQuery(requestPage, count)
+        if self._prefetchDepth == 0:
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(self._downloadPage(page, count, count == self._pageSize, query))
+            except Exception as ex:
+                future.set_exception(ex)
+            return future
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers = self._maxWorkers, thread_name_prefix = "eventregistry-prefetch")
+        return self._executor.submit(self._downloadPage, page, count, count == self._pageSize, query)
+
+
+    def _downloadPage(self, page: int, count: int, isFullPage: bool, query: QueryParamsBase) -> Tuple[List, Union[int, None]]:
+        """
+        download the page, repeating the request if it fails
+        @returns: tuple (list of results, total number of pages). The total number of pages is None if the page
+            was requested with a different page size
+        """
+        startTime = time.time()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                res = self._er.execQuery(query)
+                if not isinstance(res, dict) or "error" not in res:
+                    break
+                error = str(res["error"])
+            except Exception as ex:
+                error = str(ex)
+            if not self._retryPolicy.shouldRetry(attempt):
+                raise PageDownloadError(page, error)
+            delay = self._retryPolicy.getDelay(attempt)
+            logger.warning("Download of page %d failed (attempt %d): %s. The request will be repeated in %.1f seconds", page, attempt, error, delay)
+            time.sleep(delay)
+        results, totalPages = self._getPageResults(res)
+        with self._statsLock:
+            self._pageStats.append({
+                "page": page,
+                "count": count,
+                "resultCount": len(results),
+                "attempts": attempt,
+                "time": time.time() - startTime
+            })
+        # the number of pages is relative to the page size used in the request
+        return results, totalPages if isFullPage else None
+
+
+
+class CursorPager(QueryPager):
+    """
+    pager for the results sorted by time in descending order that advances using the (time, uri) of the last returned
+    item instead of page numbers:
+
+    - the time when the iteration started is pinned and the items that are newer are skipped
+    - once the results reach an earlier date, the following queries are limited to end with that date (dateEnd) and
+      the paging restarts at the first page. The newly published articles can't shift the results of such a query.
+      The position of the last returned item is not used, since the articles indexed later can still change the
+      positions within that date - the already returned items at the start of the query are skipped instead
+    - the items that are newer than the last returned item (or as old and already returned) are skipped. Only the uris of the
+      returned items with the same time as the last one are kept, so the memory used for deduplication is bounded
+
+    The pages are downloaded one at a time, since each query depends on the results of the previous one
+    """
+    def __init__(self, er,
+                 getPageQuery: Callable[[int, int], QueryParamsBase],
+                 getPageResults: Callable[[dict], Tuple[List, Union[int, None]]],
+                 getItemTime: Callable[[dict], Union[str, None]],
+                 pageSize: int,
+                 maxItems: int = -1,
+                 maxPageRetries: int = 2):
+        """
+        @param getItemTime: function that returns the time of an item in the ISO format (YYYY-MM-DDTHH:MM:SSZ)
+        See the QueryPager constructor for the description of the other parameters
+        """
+        QueryPager.__init__(self, er, getPageQuery, getPageResults, pageSize, maxItems = maxItems, maxPageRetries = maxPageRetries)
+        self._getItemTime = getItemTime
+        # the items published after this time are skipped
+        self._pinnedTime = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self._dateEnd = self._pinnedTime[:10]
+        # time of the last returned item and the uris of the returned items with that time
+        self._boundaryTime = None
+        self._boundaryUris = set()
+        self._finished = False
+
+
+    def getNextPage(self) -> Union[List, None]:
+        while not self._finished:
+            page = self._nextPage
+            query = self._getPageQuery(page, self._pageSize)
+            query.queryParams = limitQueryDateRange(query.queryParams, dateEnd = self._dateEnd)
+            results, totalPages = self._downloadPage(page, self._pageSize, True, query)
+            self._page = page
+            items = [item for item in results if self._isNewItem(item)]
+            if len(results) == 0 or (totalPages is not None and page >= totalPages):
+                self._finished = True
+            elif self._boundaryTime is not None and self._boundaryTime[:10] < self._dateEnd:
+                # continue with a query that ends on the date of the last item. The items up to the last one are skipped
+                self._dateEnd = self._boundaryTime[:10]
+                self._nextPage = 1
+            else:
+                self._nextPage = page + 1
+            if len(items) > 0:
+                return items
+        return None
+
+
+    def getState(self) -> dict:
+        """
+        return the state of the paging as a json serializable dict: the pinned time, the date the queries end with, the
+        (time, uris) of the last returned items and the page where the paging continues
+        """
+        return {
+            "cursor": True,
+            "page": self._page,
+            "nextPage": self._nextPage,
+            "currItem": self._currItem,
+            "items": list(self._items),
+            "pinnedTime": self._pinnedTime,
+            "dateEnd": self._dateEnd,
+            "boundaryTime": self._boundaryTime,
+            "boundaryUris": sorted(self._boundaryUris),
+            "finished": self._finished
+        }
+
+
+    def setState(self, state: dict):
+        """
+        continue the paging from the state returned by getState(). Has to be called before any page is requested
+        """
+        assert self._page == 0 and self._currItem == 0, "the state can only be set before the paging starts"
+        self._page = state.get("page", 0)
+        self._nextPage = state.get("nextPage", 1)
+        self._currItem = state.get("currItem", 0)
+        self._items = collections.deque(state.get("items", []))
+        self._pinnedTime = state["pinnedTime"]
+        self._dateEnd = state["dateEnd"]
+        self._boundaryTime = state.get("boundaryTime")
+        self._boundaryUris = set(state.get("boundaryUris", []))
+        self._finished = state.get("finished", False)
+
+
+    def _isNewItem(self, item) -> bool:
+        """check if the item should be returned and if so, move the boundary to it"""
+        itemTime = self._getItemTime(item)
+        if itemTime is None:
+            return True
+        if itemTime > self._pinnedTime:
+            return False
+        uri = item.get("uri")
+        if self._boundaryTime is None or itemTime < self._boundaryTime:
+            self._boundaryTime = itemTime
+            self._boundaryUris = set()
+        elif itemTime > self._boundaryTime or uri in self._boundaryUris:
+            return False
+        self._boundaryUris.add(uri)
+        return True
+
+
+
+class QueryIterBase(object):
+    """
+    base class of the iterators over the search results. It uses QueryPager to download the pages of results.
+    Subclasses have to implement _getPageQuery() and _getPageResults() and call _initPager() in execQuery()
+    """
+    # version of the format of the checkpoint files
+    CHECKPOINT_VERSION = 1
+
+    def _initPager(self, eventRegistry,
+                   pageSize: int,
+                   maxItems: int = -1,
+                   prefetchDepth: int = 0,
+                   parallelPages: int = 0,
+                   ordered: bool = True,
+                   maxPageRetries: int = 2,
+                   checkpointFile: Union[str, None] = None,
+                   cursor: bool = False):
+        """
+        create the pager. See the QueryPager constructor for the description of the parameters
+        @param checkpointFile: if set, the state of the iteration is saved to this file every time all the items of a page
+            were returned. If the file already exists, the iteration continues from the saved state
+        @param cursor: if True, CursorPager is used. The results have to be sorted by time in descending order
+        """
+        eventRegistry._requireSync(type(self).__name__)
+        self._er = eventRegistry
+        self._maxItems = maxItems
+        if cursor:
+            assert prefetchDepth == 0 and parallelPages == 0, "the pages can not be prefetched or downloaded in parallel when using the cursor"
+            self._pager = CursorPager(eventRegistry, self._getPageQuery, self._getPageResults, self._getItemTime, pageSize,
+                maxItems = maxItems, maxPageRetries = maxPageRetries)
+        else:
+            self._pager = QueryPager(eventRegistry, self._getPageQuery, self._getPageResults, pageSize,
+                maxItems = maxItems, prefetchDepth = prefetchDepth, parallelPages = parallelPages,
+                ordered = ordered, maxPageRetries = maxPageRetries)
+        self._checkpointFile = checkpointFile
+        self._checkpointItem = 0
+        if checkpointFile is not None and os.path.exists(checkpointFile):
+            self.loadCheckpoint(checkpointFile)
+
+
+    def getPageStats(self) -> List[dict]:
+        """
+        return for each downloaded page the page number, the number of requested and returned results,
+        the number of attempts and the time (in seconds) it took to download it
+        """
+        return self._pager.getPageStats()
+
+
+    def getCheckpoint(self) -> dict:
+        """
+        return the state of the iteration as a json serializable dict. The state contains the query (including the sort
+        settings and the page size), the pages that were already returned, the number of returned items and the items
+        that were downloaded but not returned yet
+        """
+        query = self._getCheckpointQuery()
+        state = self._pager.getState()
+        state.update({
+            "version": self.CHECKPOINT_VERSION,
+            "path": query._getPath(),
+            "queryParams": query._getQueryParams(),
+            "maxItems": self._maxItems
+        })
+        return state
+
+
+    def saveCheckpoint(self, fileName: str):
+        """
+        save the state of the iteration to the file. The file is replaced atomically, so an interrupted write does not
+        corrupt the previous checkpoint. Can be called at any time - all the items returned so far are considered processed
+        """
+        tmpFileName = fileName + ".tmp"
+        with open(tmpFileName, "w", encoding = "utf-8") as f:
+            json.dump(self.getCheckpoint(), f)
+        os.replace(tmpFileName, fileName)
+        self._checkpointItem = self._pager.getCurrItem()
+
+
+    def loadCheckpoint(self, fileName: str):
+        """
+        continue the iteration from the state saved in the file. Has to be called after execQuery() and before the first
+        item is returned. Raises ValueError if the checkpoint was created for a different query
+        """
+        with open(fileName, "r", encoding = "utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != self.CHECKPOINT_VERSION:
+            raise ValueError("Checkpoint file %s has an unsupported version %s" % (fileName, state.get("version")))
+        query = self._getCheckpointQuery()
+        # compare the parameters in the same way as the response cache does (canonical json, ignoring the apiKey)
+        if ResponseCache.getKey(query._getPath(), query._getQueryParams()) != ResponseCache.getKey(state.get("path"), state.get("queryParams")):
+            raise ValueError("Checkpoint file %s was created for a different query" % fileName)
+        if state.get("cursor", False) != isinstance(self._pager, CursorPager):
+            raise ValueError("Checkpoint file %s was created with a different value of the cursor parameter" % fileName)
+        if state.get("maxItems", -1) != self._maxItems:
+            logger.warning("Checkpoint file %s was created with maxItems %s. Using the new value %s", fileName, state.get("maxItems"), self._maxItems)
+        self._pager.setState(state)
+        self._checkpointItem = self._pager.getCurrItem()
+        logger.debug("Resuming iteration from checkpoint %s after %d items", fileName, self._checkpointItem)
+
+
+    def _getCheckpointQuery(self) -> QueryParamsBase:
+        """return the query for the first page, which identifies the query and its settings in the checkpoint"""
+        return self._getPageQuery(1, self._pager._pageSize)
+
+
+    def _getPageQuery(self, page: int, count: int) -> QueryParamsBase:
+        """return the query (PageQuery) for the given page of results"""
+        raise NotImplementedError
+
+
+    def _getPageResults(self, res: dict) -> Tuple[List, Union[int, None]]:
+        """return the results and the total number of pages from the response"""
+        raise NotImplementedError
+
+
+    def _getItemTime(self, item: dict) -> Union[str, None]:
+        """return the time of the item in ISO format. Required by the cursor paging"""
+        raise NotImplementedError
+
+
+    def close(self):
+        """
+        stop downloading the pages in the background. Called automatically once all the results were returned. Call it (or use
+        the iterator in a with statement) when the iteration is stopped early, e.g. with break. The iteration can't be continued after it
+        """
+        if getattr(self, "_pager", None) is not None:
+            self._pager.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+    def __iter__(self):
+        return self
+
+
+    def iterBatches(self, columnar: Union[str, None] = None, columns: Union[List, None] = None):
+        """
+        return a generator over the batches of results. Each batch contains the results of a page (or the results of the
+        current page that were not returned by the iterator yet). When the generator is closed before all the batches were
+        returned (e.g. after a break), the iterator is closed as well
+        @param columnar: if None, the batches are lists of results. Otherwise the batches are converted into columns:
+            "dict" (dict of lists), "numpy" (dict of NumPy arrays) or "arrow" (Arrow RecordBatch). See Columnar.py
+        @param columns: the columns used when columnar is set, as a list of (column name, path, type) tuples.
+            By default the common properties of the returned items (ARTICLE_COLUMNS or EVENT_COLUMNS) are used
+        """
+        columns = columns or self._getDefaultColumns()
+        checkColumnar(columnar, columns)
+        return self._iterBatches(columnar, columns)
+
+
+    def _iterBatches(self, columnar: Union[str, None], columns: Union[List, None]):
+        try:
+            while True:
+                self._updateCheckpoint()
+                batch = self._pager.getNextBatch()
+                if batch is None:
+                    self._updateCheckpoint()
+                    return
+                yield toColumnar(batch, columnar, columns)
+        except GeneratorExit:
+            self.close()
+            raise
+
+
+    def _getDefaultColumns(self) -> Union[List, None]:
+        """return the columns used by iterBatches() when columnar is set and no columns are provided"""
+        return None
+
+
+    def iterRecords(self):
+        """
+        return an iterator over the results converted to compact records (ArticleRecord or EventRecord, see Records.py)
+        instead of dicts. Useful when many results are kept in memory
+        """
+        recordClass = self._getRecordClass()
+        if recordClass is None:
+            raise ValueError("The results of %s can not be converted to records" % type(self).__name__)
+        return map(recordClass.fromDict, self)
+
+
+    def _getRecordClass(self):
+        """return the class of the records used by iterRecords() or None if the results can't be converted to records"""
+        return None
+
+
+    def _updateCheckpoint(self):
+        """
+        save the checkpoint if all the items of a page were returned since the last save. When the next item is requested,
+        the caller has processed the previous ones, so the saved state doesn't contain any items and the checkpoints are small
+        """
+        if self._checkpointFile is not None and self._pager.getBufferedItemCount() == 0 and self._pager.getCurrItem() != self._checkpointItem:
+            self.saveCheckpoint(self._checkpointFile)
+
+
+    def __next__(self):
+        self._updateCheckpoint()
+        try:
+            return self._pager.getNextItem()
+        except StopIteration:
+            self._updateCheckpoint()
+            raise
+
+
+
+class BulkQueryIter(object):
+    """
+    iterator that first downloads the list of uris of all the results and then the details of the results in batches
+    of uris. Created by the execBulkQuery() methods of QueryArticlesIter and QueryEventsIter
+    """
+    def __init__(self, er,
+                 getUriPageQuery: Callable[[int, int], QueryParamsBase],
+                 getUriPageResults: Callable[[dict], Tuple[List, Union[int, None]]],
+                 getDetailsQuery: Callable[[List[str]], QueryParamsBase],
+                 getDetailsResults: Callable[[dict], List],
+                 uriPageSize: int,
+                 batchSize: int,
+                 maxItems: int = -1,
+                 skipUris: Union[Container, None] = None,
+                 parallelBatches: int = 4,
+                 maxPageRetries: int = 2,
+                 defaultColumns: Union[List, None] = None):
+        """
+        @param er: instance of EventRegistry class used to execute the queries
+        @param getUriPageQuery: function that returns the query for the given page and page size of the uri list
+        @param getUriPageResults: function that parses the response and returns a tuple (list of uris, total number of pages)
+        @param getDetailsQuery: function that returns the query for the details of the given list of uris
+        @param getDetailsResults: function that parses the response and returns the list of results
+        @param uriPageSize: number of uris to download in a single request
+        @param batchSize: number of uris for which the details are downloaded in a single request
+        @param maxItems: the max number of items to return (-1 for all)
+        @param skipUris: uris for which the details should not be downloaded (e.g. the ones already in a local store).
+            Can be any object that supports the "in" operator (set, dict, database wrapper, ...)
+        @param parallelBatches: number of batches of details that are downloaded at the same time
+        @param maxPageRetries: the number of times a failed request is repeated before PageDownloadError is raised
+        @param defaultColumns: the columns used by iterBatches() when columnar is set and no columns are provided
+        """
+        er._requireSync("BulkQueryIter")
+        self._er = er
+        self._defaultColumns = defaultColumns
+        self._getDetailsQuery = getDetailsQuery
+        self._getDetailsResults = getDetailsResults
+        self._batchSize = batchSize
+        self._maxItems = maxItems
+        self._skipUris = skipUris
+        self._parallelBatches = parallelBatches
+        self._maxPageRetries = maxPageRetries
+        self._uriPager = QueryPager(er, getUriPageQuery, getUriPageResults, uriPageSize, maxPageRetries = maxPageRetries)
+        self._uris = None
+        self._skippedCount = 0
+        self._detailsPager = None
+
+
+    def getUris(self) -> List[str]:
+        """
+        return the uris of the results for which the details will be downloaded (without the skipped uris).
+        The list of uris is downloaded on the first call
+        """
+        if self._uris is None:
+            uris = []
+            seen = set()
+            while True:
+                try:
+                    uri = self._uriPager.getNextItem()
+                except StopIteration:
+                    break
+                if uri in seen:
+                    continue
+                seen.add(uri)
+                if self._skipUris is not None and uri in self._skipUris:
+                    self._skippedCount += 1
+                    continue
+                uris.append(uri)
+                if self._maxItems >= 0 and len(uris) >= self._maxItems:
+                    self._uriPager.close()
+                    break
+            self._uris = uris
+        return list(self._uris)
+
+
+    def getSkippedCount(self) -> int:
+        """return the number of uris that were skipped because they were in skipUris"""
+        return self._skippedCount
+
+
+    def getPageStats(self) -> List[dict]:
+        """return the statistics of the downloaded pages of the uri list followed by the ones of the batches of details (see QueryPager.getPageStats())"""
+        stats = self._uriPager.getPageStats()
+        if self._detailsPager is not None:
+            stats += self._detailsPager.getPageStats()
+        return stats
+
+
+    def close(self):
+        """stop the downloads"""
+        self._uriPager.close()
+        if self._detailsPager is not None:
+            self._detailsPager.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+    def __iter__(self):
+        return self
+
+
+    def iterBatches(self, columnar: Union[str, None] = None, columns: Union[List, None] = None):
+        """
+        return a generator over the batches of results. Each batch contains the details for a batch of uris.
+        See QueryIterBase.iterBatches() for the description of the parameters
+        """
+        columns = columns or self._defaultColumns
+        checkColumnar(columnar, columns)
+        return self._iterBatches(columnar, columns)
+
+
+    def _iterBatches(self, columnar: Union[str, None], columns: Union[List, None]):
+        try:
+            while self._initDetailsPager():
+                batch = self._detailsPager.getNextBatch()
+                if batch is None:
+                    return
+                yield toColumnar(batch, columnar, columns)
+        except GeneratorExit:
+            self.close()
+            raise
+
+
+    def __next__(self):
+        if not self._initDetailsPager():
+            raise StopIteration
+        return self._detailsPager.getNextItem()
+
+
+    def _initDetailsPager(self) -> bool:
+        """create the pager for the details once the uris are known. Returns False if there are no results"""
+        if self._detailsPager is None:
+            uris = self.getUris()
+            if len(uris) == 0:
+                return False
+            batchCount = (len(uris) + self._batchSize - 1) // self._batchSize
+            batches = [uris[i * self._batchSize: (i + 1) * self._batchSize] for i in range(batchCount)]
+            # every batch of uris is a page. The number of pages is known from the start, so the pages after the first one are downloaded in parallel
+            self._detailsPager = QueryPager(self._er,
+                lambda page, count: self._getDetailsQuery(batches[page - 1]),
+                lambda res: (self._getDetailsResults(res), batchCount),
+                self._batchSize, parallelPages = self._parallelBatches if batchCount > 1 else 0,
+                maxPageRetries = self._maxPageRetries)
+        return True
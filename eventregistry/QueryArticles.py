@@ -4,7 +4,10 @@ from eventregistry.ReturnInfo import *
 from eventregistry.Query import *
 from eventregistry.Logger import logger
 from eventregistry.EventRegistry import EventRegistry
-from typing import Union, List, Literal
+from eventregistry.Paging import QueryIterBase, PageQuery, BulkQueryIter
+from eventregistry.Columnar import ARTICLE_COLUMNS
+from eventregistry.Records import ArticleRecord
+from typing import Union, List, Literal, Container
 
 
 class QueryArticles(Query):
@@ -278,18 +281,22 @@ class QueryArticles(Query):
 
 
 
-class QueryArticlesIter(QueryArticles, six.Iterator):
+class QueryArticlesIter(QueryArticles, QueryIterBase, six.Iterator):
     """
     class that simplifies and combines functionality from QueryArticles and RequestArticlesInfo. It provides an iterator
     over the list of articles that match the specified conditions
     """
-    def count(self, eventRegistry: EventRegistry):
+    def count(self, eventRegistry: EventRegistry, raiseOnError: bool = False):
         """
         return the number of articles that match the criteria
+        @param raiseOnError: if True, an exception is raised when the response contains an error. Otherwise the error is logged and 0 is returned
         """
         self.setRequestedResult(RequestArticlesInfo())
+        eventRegistry._requireSync("QueryArticlesIter.count()")
         res = eventRegistry.execQuery(self)
         if "error" in res:
+            if raiseOnError:
+                raise Exception(res["error"])
             logger.error(res["error"])
         count = res.get("articles", {}).get("totalResults", 0)
         return count
@@ -300,6 +307,12 @@ class QueryArticlesIter(QueryArticles, six.Iterator):
                   sortByAsc: bool = False,
                   returnInfo: Union[ReturnInfo, None] = None,
                   maxItems: int = -1,
+                  prefetchDepth: int = 0,
+                  parallelPages: int = 0,
+                  ordered: bool = True,
+                  maxPageRetries: int = 2,
+                  checkpointFile: Union[str, None] = None,
+                  cursor: bool = False,
                   **kwargs):
         """
         @param eventRegistry: instance of EventRegistry class. used to query new article list and uris
@@ -307,22 +320,81 @@ class QueryArticlesIter(QueryArticles, six.Iterator):
         @param sortByAsc: should the results be sorted in ascending order (True) or descending (False)
         @param returnInfo: what details should be included in the returned information
         @param maxItems: maximum number of items to be returned. Used to stop iteration sooner than results run out
-        """
-        self._er = eventRegistry
+        @param prefetchDepth: number of pages to download in the background while the current page is being processed.
+            0 (default) means that the next page is downloaded only once all the items from the current page were returned
+        @param parallelPages: number of pages to download at the same time once the number of pages is known (after the first page).
+            Requires an EventRegistry instance that allows that many concurrent requests (see maxConcurrentRequests). 0 (default) downloads one page at a time
+        @param ordered: used with prefetchDepth or parallelPages. If True (default), the items are returned in the same order as in the results.
+            If False, the pages are returned in the order in which they were downloaded
+        @param maxPageRetries: the number of times a page that failed to download (or returned an error) is requested again.
+            If the page still can't be obtained, PageDownloadError is raised
+        @param checkpointFile: if set, the state of the iteration is saved to this file after all the items of a page were returned.
+            If the file exists, the iteration continues where the previous run stopped (the query has to be the same)
+        @param cursor: if True, the following pages are not requested by page number but by the time of the last returned article
+            (the articles published later are skipped). This way the articles that are published during the iteration don't cause
+            duplicates and gaps in the results. Requires sortBy = "date" and sortByAsc = False and can't be used with prefetchDepth
+            and parallelPages. The state of the cursor is stored in the checkpointFile
+        """
+        assert not cursor or (sortBy == "date" and not sortByAsc), "cursor can only be used when the articles are sorted by date in descending order"
         self._sortBy = sortBy
         self._sortByAsc = sortByAsc
         self._returnInfo = returnInfo
         self._articleBatchSize = 100    # always download 100 - best for the user since it uses his token and we want to download as much as possible in a single search
-        self._articlePage = 0
-        self._totalPages = None
-        # if we want to return only a subset of items:
-        self._maxItems = maxItems
-        self._currItem = 0
-        # list of cached articles that are yet to be returned by the iterator
-        self._articleList = []
+        self._initPager(eventRegistry, self._articleBatchSize, maxItems = maxItems,
+            prefetchDepth = prefetchDepth, parallelPages = parallelPages, ordered = ordered, maxPageRetries = maxPageRetries,
+            checkpointFile = checkpointFile, cursor = cursor)
         return self
 
 
+    def execBulkQuery(self, eventRegistry: EventRegistry,
+                      sortBy: str = "rel",
+                      sortByAsc: bool = False,
+                      returnInfo: Union[ReturnInfo, None] = None,
+                      maxItems: int = -1,
+                      skipUris: Union[Container, None] = None,
+                      parallelBatches: int = 4,
+                      maxPageRetries: int = 2):
+        """
+        download the articles in two phases: first the uris of all matching articles (up to 50,000 per request)
+        and then the details of the articles in batches of 100 uris, several batches at the same time.
+        Since the list of uris is obtained at the start, the results don't change while they are being downloaded
+        @param eventRegistry: instance of EventRegistry class. used to query new article list and uris
+        @param sortBy: how are articles sorted. See execQuery() for the options
+        @param sortByAsc: should the results be sorted in ascending order (True) or descending (False)
+        @param returnInfo: what details should be included in the returned information
+        @param maxItems: maximum number of articles to be returned
+        @param skipUris: uris of the articles that should not be downloaded (e.g. the articles that are already stored locally).
+            Can be any object that supports the "in" operator
+        @param parallelBatches: number of batches of articles to download at the same time. Requires an EventRegistry
+            instance that allows that many concurrent requests (see maxConcurrentRequests)
+        @param maxPageRetries: the number of times a request that failed (or returned an error) is repeated.
+            If the results still can't be obtained, PageDownloadError is raised
+        @returns: BulkQueryIter instance - an iterator over the articles
+        """
+        self._sortBy = sortBy
+        self._sortByAsc = sortByAsc
+        self._returnInfo = returnInfo
+        self._er = eventRegistry
+        uriPageSize = 50000
+
+        def getUriPageQuery(page: int, count: int):
+            self.setRequestedResult(RequestArticlesUriWgtList(page = page, count = count, sortBy = sortBy, sortByAsc = sortByAsc))
+            return PageQuery.fromQuery(self)
+
+        def getUriPageResults(res: dict):
+            uriWgtList = res.get("uriWgtList", {})
+            return eventRegistry.getUriFromUriWgt(uriWgtList.get("results", [])), (uriWgtList.get("totalResults", 0) + uriPageSize - 1) // uriPageSize
+
+        def getDetailsQuery(uriList: List[str]):
+            q = QueryArticles.initWithArticleUriList(uriList)
+            q.setRequestedResult(RequestArticlesInfo(count = len(uriList), sortBy = sortBy, sortByAsc = sortByAsc, returnInfo = returnInfo))
+            return PageQuery.fromQuery(q)
+
+        return BulkQueryIter(eventRegistry, getUriPageQuery, getUriPageResults, getDetailsQuery, lambda res: self._getPageResults(res)[0], uriPageSize, 100,
+            maxItems = maxItems, skipUris = skipUris, parallelBatches = parallelBatches, maxPageRetries = maxPageRetries,
+            defaultColumns = ARTICLE_COLUMNS)
+
+
     @staticmethod
     def initWithComplexQuery(query: Union[ComplexArticleQuery, str, dict]):
         """
@@ -359,42 +431,32 @@ class QueryArticlesIter(QueryArticles, six.Iterator):
         return q
 
 
-    def _getNextArticleBatch(self):
-        """download next batch of articles based on the article uris in the uri list"""
-        # try to get more uris, if none
-        self._articlePage += 1
-        # if we have already obtained all pages, then exit
-        if self._totalPages != None and self._articlePage > self._totalPages:
-            return
-        self.setRequestedResult(RequestArticlesInfo(page=self._articlePage,
+    def _getPageQuery(self, page: int, count: int):
+        """return the query for the given page of articles"""
+        self.setRequestedResult(RequestArticlesInfo(page=page, count=count,
             sortBy=self._sortBy, sortByAsc=self._sortByAsc,
             returnInfo = self._returnInfo))
         if self._er._verboseOutput:
-            logger.debug("Downloading article page %d...", self._articlePage)
-        res = self._er.execQuery(self)
-        if "error" in res:
-            logger.error("Error while obtaining a list of articles: %s", res["error"])
-        else:
-            self._totalPages = res.get("articles", {}).get("pages", 0)
-        results = res.get("articles", {}).get("results", [])
-        self._articleList.extend(results)
+            logger.debug("Downloading article page %d...", page)
+        return PageQuery.fromQuery(self)
 
 
-    def __iter__(self):
-        return self
+    def _getPageResults(self, res: dict):
+        """return the articles and the total number of pages from the response"""
+        return res.get("articles", {}).get("results", []), res.get("articles", {}).get("pages", 0)
+
+
+    def _getItemTime(self, item: dict):
+        """return the time of the article"""
+        return item.get("dateTime")
+
+
+    def _getDefaultColumns(self):
+        return ARTICLE_COLUMNS
 
 
-    def __next__(self):
-        """iterate over the available articles"""
-        self._currItem += 1
-        # if we want to return only the first X items, then finish once reached
-        if self._maxItems >= 0 and self._currItem > self._maxItems:
-            raise StopIteration
-        if len(self._articleList) == 0:
-            self._getNextArticleBatch()
-        if len(self._articleList) > 0:
-            return self._articleList.pop(0)
-        raise StopIteration
+    def _getRecordClass(self):
+        return ArticleRecord
 
 
 
@@ -5,6 +5,9 @@ from eventregistry.QueryArticles import QueryArticles, RequestArticlesInfo
 from eventregistry.Query import *
 from eventregistry.Logger import logger
 from eventregistry.EventRegistry import EventRegistry
+from eventregistry.Paging import QueryIterBase, PageQuery
+from eventregistry.Columnar import ARTICLE_COLUMNS
+from eventregistry.Records import ArticleRecord
 from typing import Union, List, Literal
 
 
@@ -39,7 +42,7 @@ class QueryEvent(Query):
 
 
 
-class QueryEventArticlesIter(QueryEvent, six.Iterator):
+class QueryEventArticlesIter(QueryEvent, QueryIterBase, six.Iterator):
     """
     Class for obtaining an iterator over all articles in the event
     """
@@ -159,6 +162,7 @@ class QueryEventArticlesIter(QueryEvent, six.Iterator):
         @param eventRegistry: instance of EventRegistry class. used to obtain the necessary data
         """
         self.setRequestedResult(RequestEventArticles(**self.queryParams))
+        eventRegistry._requireSync("QueryEventArticlesIter.count()")
         res = eventRegistry.execQuery(self)
         if "error" in res:
             logger.error(res["error"])
@@ -169,7 +173,13 @@ class QueryEventArticlesIter(QueryEvent, six.Iterator):
     def execQuery(self, eventRegistry: EventRegistry,
             sortBy: str = "cosSim", sortByAsc: bool = False,
             returnInfo: Union[ReturnInfo, None] = None,
-            maxItems: int = -1):
+            maxItems: int = -1,
+            prefetchDepth: int = 0,
+            parallelPages: int = 0,
+            ordered: bool = True,
+            maxPageRetries: int = 2,
+            checkpointFile: Union[str, None] = None,
+            cursor: bool = False):
         """
         @param eventRegistry: instance of EventRegistry class. used to obtain the necessary data
 
@@ -177,64 +187,59 @@ class QueryEventArticlesIter(QueryEvent, six.Iterator):
         @param sortByAsc: should the results be sorted in ascending order (True) or descending (False)
         @param returnInfo: what details should be included in the returned information
         @param maxItems: maximum number of items to be returned. Used to stop iteration sooner than results run out
+        @param prefetchDepth: number of pages to download in the background while the current page is being processed.
+            0 (default) means that the next page is downloaded only once all the items from the current page were returned
+        @param parallelPages: number of pages to download at the same time once the number of pages is known (after the first page).
+            Requires an EventRegistry instance that allows that many concurrent requests (see maxConcurrentRequests). 0 (default) downloads one page at a time
+        @param ordered: used with prefetchDepth or parallelPages. If True (default), the items are returned in the same order as in the results.
+            If False, the pages are returned in the order in which they were downloaded
+        @param maxPageRetries: the number of times a page that failed to download (or returned an error) is requested again.
+            If the page still can't be obtained, PageDownloadError is raised
+        @param checkpointFile: if set, the state of the iteration is saved to this file after all the items of a page were returned.
+            If the file exists, the iteration continues where the previous run stopped (the query has to be the same)
+        @param cursor: if True, the following pages are not requested by page number but by the time of the last returned article
+            (the articles added to the event later are skipped), so that the new articles don't cause duplicates and gaps in the results.
+            Requires sortBy = "date" and sortByAsc = False and can't be used with prefetchDepth and parallelPages
         """
-        self._er = eventRegistry
-        self._articlePage = 0
-        self._totalPages = None
-        # if we want to return only a subset of items:
-        self._maxItems = maxItems
-        self._currItem = 0
-
+        assert not cursor or (sortBy == "date" and not sortByAsc), "cursor can only be used when the articles are sorted by date in descending order"
         self._articlesSortBy = sortBy
         self._articlesSortByAsc = sortByAsc
         self._returnInfo = returnInfo
-
-        # download the list of article uris
-        self._articleList = []
+        self._initPager(eventRegistry, 100, maxItems = maxItems,
+            prefetchDepth = prefetchDepth, parallelPages = parallelPages, ordered = ordered, maxPageRetries = maxPageRetries,
+            checkpointFile = checkpointFile, cursor = cursor)
         return self
 
 
-    def _getNextArticleBatch(self):
-        """download next batch of events based on the event uris in the uri list"""
-        eventUri = self.queryParams["eventUri"]
-        # move to the next page to download
-        self._articlePage += 1
-        # if we have already obtained all pages, then exit
-        if self._totalPages != None and self._articlePage > self._totalPages:
-            return
+    def _getPageQuery(self, page: int, count: int):
+        """return the query for the given page of event articles"""
         if self._er._verboseOutput:
-            logger.debug("Downloading article page %d from event %s", self._articlePage, eventUri)
-
+            logger.debug("Downloading article page %d from event %s", page, self.queryParams["eventUri"])
         self.setRequestedResult(RequestEventArticles(
-            page = self._articlePage,
+            page = page, count = count,
             sortBy = self._articlesSortBy, sortByAsc = self._articlesSortByAsc,
             returnInfo = self._returnInfo,
             **self.queryParams))
-        res = self._er.execQuery(self)
-        if "error" in res:
-            logger.error(res["error"])
-        else:
-            self._totalPages = res.get(eventUri, {}).get("articles", {}).get("pages", 0)
-        arts = res.get(eventUri, {}).get("articles", {}).get("results", [])
-        self._articleList.extend(arts)
+        return PageQuery.fromQuery(self)
 
 
-    def __iter__(self):
-        # clear any past info - iterator should start from beginning
-        return self
+    def _getPageResults(self, res: dict):
+        """return the articles and the total number of pages from the response"""
+        articles = res.get(self.queryParams["eventUri"], {}).get("articles", {})
+        return articles.get("results", []), articles.get("pages", 0)
+
+
+    def _getItemTime(self, item: dict):
+        """return the time of the article"""
+        return item.get("dateTime")
+
+
+    def _getDefaultColumns(self):
+        return ARTICLE_COLUMNS
 
 
-    def __next__(self):
-        """iterate over the available events"""
-        self._currItem += 1
-        # if we want to return only the first X items, then finish once reached
-        if self._maxItems >= 0 and self._currItem > self._maxItems:
-            raise StopIteration
-        if len(self._articleList) == 0:
-            self._getNextArticleBatch()
-        if len(self._articleList) > 0:
-            return self._articleList.pop(0)
-        raise StopIteration
+    def _getRecordClass(self):
+        return ArticleRecord
 
 
 
@@ -4,7 +4,10 @@ from eventregistry.ReturnInfo import *
 from eventregistry.Query import *
 from eventregistry.Logger import logger
 from eventregistry.EventRegistry import EventRegistry
-from typing import Union, List, Literal
+from eventregistry.Paging import QueryIterBase, PageQuery, BulkQueryIter
+from eventregistry.Columnar import EVENT_COLUMNS
+from eventregistry.Records import EventRecord
+from typing import Union, List, Literal, Container
 
 class QueryEvents(Query):
     def __init__(self,
@@ -230,19 +233,23 @@ class QueryEvents(Query):
 
 
 
-class QueryEventsIter(QueryEvents, six.Iterator):
+class QueryEventsIter(QueryEvents, QueryIterBase, six.Iterator):
     """
     class that simplifies and combines functionality from QueryEvents and RequestEventsInfo. It provides an iterator
     over the list of events that match the specified conditions
     """
 
-    def count(self, eventRegistry: EventRegistry):
+    def count(self, eventRegistry: EventRegistry, raiseOnError: bool = False):
         """
         return the number of events that match the criteria
+        @param raiseOnError: if True, an exception is raised when the response contains an error. Otherwise the error is logged and 0 is returned
         """
         self.setRequestedResult(RequestEventsInfo())
+        eventRegistry._requireSync("QueryEventsIter.count()")
         res = eventRegistry.execQuery(self)
         if "error" in res:
+            if raiseOnError:
+                raise Exception(res["error"])
             logger.error(res["error"])
         count = res.get("events", {}).get("totalResults", 0)
         return count
@@ -253,6 +260,11 @@ class QueryEventsIter(QueryEvents, six.Iterator):
                   sortByAsc: bool = False,
                   returnInfo: Union[ReturnInfo, None] = None,
                   maxItems: int = -1,
+                  prefetchDepth: int = 0,
+                  parallelPages: int = 0,
+                  ordered: bool = True,
+                  maxPageRetries: int = 2,
+                  checkpointFile: Union[str, None] = None,
                   **kwargs):
         """
         @param eventRegistry: instance of EventRegistry class. used to query new event list and uris
@@ -261,19 +273,24 @@ class QueryEventsIter(QueryEvents, six.Iterator):
         @param sortByAsc: should the results be sorted in ascending order (True) or descending (False)
         @param returnInfo: what details should be included in the returned information
         @param maxItems: maximum number of items to be returned. Used to stop iteration sooner than results run out
+        @param prefetchDepth: number of pages to download in the background while the current page is being processed.
+            0 (default) means that the next page is downloaded only once all the items from the current page were returned
+        @param parallelPages: number of pages to download at the same time once the number of pages is known (after the first page).
+            Requires an EventRegistry instance that allows that many concurrent requests (see maxConcurrentRequests). 0 (default) downloads one page at a time
+        @param ordered: used with prefetchDepth or parallelPages. If True (default), the items are returned in the same order as in the results.
+            If False, the pages are returned in the order in which they were downloaded
+        @param maxPageRetries: the number of times a page that failed to download (or returned an error) is requested again.
+            If the page still can't be obtained, PageDownloadError is raised
+        @param checkpointFile: if set, the state of the iteration is saved to this file after all the items of a page were returned.
+            If the file exists, the iteration continues where the previous run stopped (the query has to be the same)
         """
-        self._er = eventRegistry
         self._sortBy = sortBy
         self._sortByAsc = sortByAsc
         self._returnInfo = returnInfo
         self._eventBatchSize = 50      # always download max - best for the user since it uses his token and we want to download as much as possible in a single search
-        self._eventPage = 0
-        self._totalPages = None
-        # if we want to return only a subset of items:
-        self._maxItems = maxItems
-        self._currItem = 0
-        # list of cached events that are yet to be returned by the iterator
-        self._eventList = []
+        self._initPager(eventRegistry, self._eventBatchSize, maxItems = maxItems,
+            prefetchDepth = prefetchDepth, parallelPages = parallelPages, ordered = ordered, maxPageRetries = maxPageRetries,
+            checkpointFile = checkpointFile)
         return self
 
 
@@ -295,42 +312,76 @@ class QueryEventsIter(QueryEvents, six.Iterator):
         return q
 
 
-    def _getNextEventBatch(self):
-        """download next batch of events based on the event uris in the uri list"""
-        self._eventPage += 1
-        # if we have already obtained all pages, then exit
-        if self._totalPages is not None and self._eventPage > self._totalPages:
-            return
-        self.setRequestedResult(RequestEventsInfo(page=self._eventPage, count=self._eventBatchSize,
+    def execBulkQuery(self, eventRegistry: EventRegistry,
+                      sortBy: str = "rel",
+                      sortByAsc: bool = False,
+                      returnInfo: Union[ReturnInfo, None] = None,
+                      maxItems: int = -1,
+                      skipUris: Union[Container, None] = None,
+                      parallelBatches: int = 4,
+                      maxPageRetries: int = 2):
+        """
+        download the events in two phases: first the uris of all matching events (up to 50,000 per request)
+        and then the details of the events in batches of 50 uris, several batches at the same time.
+        Since the list of uris is obtained at the start, the results don't change while they are being downloaded
+        @param eventRegistry: instance of EventRegistry class. used to query new event list and uris
+        @param sortBy: how are events sorted. See execQuery() for the options
+        @param sortByAsc: should the results be sorted in ascending order (True) or descending (False)
+        @param returnInfo: what details should be included in the returned information
+        @param maxItems: maximum number of events to be returned
+        @param skipUris: uris of the events that should not be downloaded (e.g. the events that are already stored locally).
+            Can be any object that supports the "in" operator
+        @param parallelBatches: number of batches of events to download at the same time. Requires an EventRegistry
+            instance that allows that many concurrent requests (see maxConcurrentRequests)
+        @param maxPageRetries: the number of times a request that failed (or returned an error) is repeated.
+            If the results still can't be obtained, PageDownloadError is raised
+        @returns: BulkQueryIter instance - an iterator over the events
+        """
+        self._sortBy = sortBy
+        self._sortByAsc = sortByAsc
+        self._returnInfo = returnInfo
+        self._er = eventRegistry
+        uriPageSize = 50000
+
+        def getUriPageQuery(page: int, count: int):
+            self.setRequestedResult(RequestEventsUriWgtList(page = page, count = count, sortBy = sortBy, sortByAsc = sortByAsc))
+            return PageQuery.fromQuery(self)
+
+        def getUriPageResults(res: dict):
+            uriWgtList = res.get("uriWgtList", {})
+            return eventRegistry.getUriFromUriWgt(uriWgtList.get("results", [])), (uriWgtList.get("totalResults", 0) + uriPageSize - 1) // uriPageSize
+
+        def getDetailsQuery(uriList: List[str]):
+            q = QueryEvents.initWithEventUriList(uriList)
+            q.setRequestedResult(RequestEventsInfo(count = len(uriList), sortBy = sortBy, sortByAsc = sortByAsc, returnInfo = returnInfo))
+            return PageQuery.fromQuery(q)
+
+        return BulkQueryIter(eventRegistry, getUriPageQuery, getUriPageResults, getDetailsQuery, lambda res: self._getPageResults(res)[0], uriPageSize, 50,
+            maxItems = maxItems, skipUris = skipUris, parallelBatches = parallelBatches, maxPageRetries = maxPageRetries,
+            defaultColumns = EVENT_COLUMNS)
+
+
+    def _getPageQuery(self, page: int, count: int):
+        """return the query for the given page of events"""
+        self.setRequestedResult(RequestEventsInfo(page=page, count=count,
             sortBy= self._sortBy, sortByAsc=self._sortByAsc,
             returnInfo = self._returnInfo))
-        # download articles and make sure that we set the same archive flag as it was returned when we were processing the uriList request
         if self._er._verboseOutput:
-            logger.debug("Downloading event page %d...", self._eventPage)
-        res = self._er.execQuery(self)
-        if "error" in res:
-            logger.error("Error while obtaining a list of events: %s", res["error"])
-        else:
-            self._totalPages = res.get("events", {}).get("pages", 0)
-        results = res.get("events", {}).get("results", [])
-        self._eventList.extend(results)
+            logger.debug("Downloading event page %d...", page)
+        return PageQuery.fromQuery(self)
 
 
-    def __iter__(self):
-        return self
+    def _getPageResults(self, res: dict):
+        """return the events and the total number of pages from the response"""
+        return res.get("events", {}).get("results", []), res.get("events", {}).get("pages", 0)
+
+
+    def _getDefaultColumns(self):
+        return EVENT_COLUMNS
 
 
-    def __next__(self):
-        """iterate over the available events"""
-        self._currItem += 1
-        # if we want to return only the first X items, then finish once reached
-        if self._maxItems >= 0 and self._currItem > self._maxItems:
-            raise StopIteration
-        if len(self._eventList) == 0:
-            self._getNextEventBatch()
-        if len(self._eventList) > 0:
-            return self._eventList.pop(0)
-        raise StopIteration
+    def _getRecordClass(self):
+        return EventRecord
 
 
 
@@ -4,6 +4,7 @@ from eventregistry.ReturnInfo import *
 from eventregistry.Query import *
 from eventregistry.Logger import logger
 from eventregistry.EventRegistry import EventRegistry
+from eventregistry.Paging import QueryIterBase, PageQuery
 from typing import Union, List
 
 
@@ -250,7 +251,7 @@ class QueryMentions(Query):
 
 
 
-class QueryMentionsIter(QueryMentions, six.Iterator):
+class QueryMentionsIter(QueryMentions, QueryIterBase, six.Iterator):
     """
     class that simplifies and combines functionality from QueryMentions and RequestMentionsInfo. It provides an iterator
     over the list of mentions that match the specified conditions
@@ -260,6 +261,7 @@ class QueryMentionsIter(QueryMentions, six.Iterator):
         return the number of mentions that match the criteria
         """
         self.setRequestedResult(RequestMentionsInfo())
+        eventRegistry._requireSync("QueryMentionsIter.count()")
         res = eventRegistry.execQuery(self)
         if "error" in res:
             logger.error(res["error"])
@@ -272,6 +274,11 @@ class QueryMentionsIter(QueryMentions, six.Iterator):
                   sortByAsc: bool = False,
                   returnInfo: Union[ReturnInfo, None] = None,
                   maxItems: int = -1,
+                  prefetchDepth: int = 0,
+                  parallelPages: int = 0,
+                  ordered: bool = True,
+                  maxPageRetries: int = 2,
+                  checkpointFile: Union[str, None] = None,
                   **kwargs):
         """
         @param eventRegistry: instance of EventRegistry class. used to query new mention list and uris
@@ -279,19 +286,24 @@ class QueryMentionsIter(QueryMentions, six.Iterator):
         @param sortByAsc: should the results be sorted in ascending order (True) or descending (False)
         @param returnInfo: what details should be included in the returned information
         @param maxItems: maximum number of items to be returned. Used to stop iteration sooner than results run out
+        @param prefetchDepth: number of pages to download in the background while the current page is being processed.
+            0 (default) means that the next page is downloaded only once all the items from the current page were returned
+        @param parallelPages: number of pages to download at the same time once the number of pages is known (after the first page).
+            Requires an EventRegistry instance that allows that many concurrent requests (see maxConcurrentRequests). 0 (default) downloads one page at a time
+        @param ordered: used with prefetchDepth or parallelPages. If True (default), the items are returned in the same order as in the results.
+            If False, the pages are returned in the order in which they were downloaded
+        @param maxPageRetries: the number of times a page that failed to download (or returned an error) is requested again.
+            If the page still can't be obtained, PageDownloadError is raised
+        @param checkpointFile: if set, the state of the iteration is saved to this file after all the items of a page were returned.
+            If the file exists, the iteration continues where the previous run stopped (the query has to be the same)
         """
-        self._er = eventRegistry
         self._sortBy = sortBy
         self._sortByAsc = sortByAsc
         self._returnInfo = returnInfo
         self._mentionBatchSize = 100    # always download 100 - best for the user since it uses his token and we want to download as much as possible in a single search
-        self._mentionPage = 0
-        self._totalPages = None
-        # if we want to return only a subset of items:
-        self._maxItems = maxItems
-        self._currItem = 0
-        # list of cached mentions that are yet to be returned by the iterator
-        self._mentionList = []
+        self._initPager(eventRegistry, self._mentionBatchSize, maxItems = maxItems,
+            prefetchDepth = prefetchDepth, parallelPages = parallelPages, ordered = ordered, maxPageRetries = maxPageRetries,
+            checkpointFile = checkpointFile)
         return self
 
 
@@ -325,42 +337,19 @@ class QueryMentionsIter(QueryMentions, six.Iterator):
         return q
 
 
-    def _getNextMentionBatch(self):
-        """download next batch of mentions based on the mention uris in the uri list"""
-        # try to get more uris, if none
-        self._mentionPage += 1
-        # if we have already obtained all pages, then exit
-        if self._totalPages is not None and self._mentionPage > self._totalPages:
-            return
-        self.setRequestedResult(RequestMentionsInfo(page=self._mentionPage,
+    def _getPageQuery(self, page: int, count: int):
+        """return the query for the given page of mentions"""
+        self.setRequestedResult(RequestMentionsInfo(page=page, count=count,
             sortBy=self._sortBy, sortByAsc=self._sortByAsc,
             returnInfo = self._returnInfo))
         if self._er._verboseOutput:
-            logger.debug("Downloading mention page %d...", self._mentionPage)
-        res = self._er.execQuery(self)
-        if "error" in res:
-            logger.error("Error while obtaining a list of mentions: %s", res["error"])
-        else:
-            self._totalPages = res.get("mentions", {}).get("pages", 0)
-        results = res.get("mentions", {}).get("results", [])
-        self._mentionList.extend(results)
-
-
-    def __iter__(self):
-        return self
+            logger.debug("Downloading mention page %d...", page)
+        return PageQuery.fromQuery(self)
 
 
-    def __next__(self):
-        """iterate over the available mentions"""
-        self._currItem += 1
-        # if we want to return only the first X items, then finish once reached
-        if self._maxItems >= 0 and self._currItem > self._maxItems:
-            raise StopIteration
-        if len(self._mentionList) == 0:
-            self._getNextMentionBatch()
-        if len(self._mentionList) > 0:
-            return self._mentionList.pop(0)
-        raise StopIteration
+    def _getPageResults(self, res: dict):
+        """return the mentions and the total number of pages from the response"""
+        return res.get("mentions", {}).get("results", []), res.get("mentions", {}).get("pages", 0)
 
 
 
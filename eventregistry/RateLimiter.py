@@ -0,0 +1,182 @@
+"""
+rate limiters that can be used to control how frequently the requests are made to Event Registry.
+
+A rate limiter can be provided to the EventRegistry (or AsyncEventRegistry) constructor using the rateLimiter parameter.
+The same instance can be shared by several EventRegistry instances and by multiple threads. In order to share the
+request budget among several processes use the FileTokenBucketRateLimiter.
+"""
+import os, time, threading, asyncio
+
+
+class RateLimiter(object):
+    """
+    base class for the rate limiters. Subclasses have to implement the _reserve() method that reserves the permission
+    to make a request and returns the number of seconds the caller has to wait before making it
+    """
+    def __init__(self):
+        self._statsLock = threading.Lock()
+        self._requestCount = 0
+        self._delayedRequestCount = 0
+        self._totalWaitTime = 0.0
+        self._maxWaitTime = 0.0
+
+
+    def reserve(self) -> float:
+        """
+        reserve a time slot for one request. The method does not block
+        @returns: the number of seconds the caller should wait before making the request
+        """
+        waitTime = max(0.0, self._reserve())
+        with self._statsLock:
+            self._requestCount += 1
+            if waitTime > 0:
+                self._delayedRequestCount += 1
+            self._totalWaitTime += waitTime
+            self._maxWaitTime = max(self._maxWaitTime, waitTime)
+        return waitTime
+
+
+    def acquire(self) -> float:
+        """
+        block until the request can be made
+        @returns: the number of seconds the caller waited
+        """
+        waitTime = self.reserve()
+        if waitTime > 0:
+            time.sleep(waitTime)
+        return waitTime
+
+
+    async def acquireAsync(self) -> float:
+        """
+        asyncio version of acquire(). Waits without blocking the event loop
+        @returns: the number of seconds the caller waited
+        """
+        waitTime = self.reserve()
+        if waitTime > 0:
+            await asyncio.sleep(waitTime)
+        return waitTime
+
+
+    def getStats(self) -> dict:
+        """
+        return the statistics about the requests that passed through the rate limiter: the number of requests,
+        the number of requests that had to wait and the total, average and max wait time in seconds
+        """
+        with self._statsLock:
+            return {
+                "requestCount": self._requestCount,
+                "delayedRequestCount": self._delayedRequestCount,
+                "totalWaitTime": self._totalWaitTime,
+                "averageWaitTime": self._totalWaitTime / self._requestCount if self._requestCount > 0 else 0.0,
+                "maxWaitTime": self._maxWaitTime
+            }
+
+
+    def _reserve(self) -> float:
+        raise NotImplementedError
+
+
+    @staticmethod
+    def _takeToken(tokens: float, lastTime: float, now: float, requestsPerSecond: float, burst: float):
+        """
+        token bucket step shared by the implementations. Refill the bucket for the time passed since lastTime and take one token.
+        The number of tokens can become negative - in that case the caller has to wait until the bucket is refilled.
+        @returns: tuple (new number of tokens, seconds to wait)
+        """
+        tokens = min(burst, tokens + max(0.0, now - lastTime) * requestsPerSecond)
+        tokens -= 1
+        waitTime = -tokens / requestsPerSecond if tokens < 0 else 0.0
+        return tokens, waitTime
+
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """
+    in-process token bucket rate limiter. On average it allows requestsPerSecond requests per second,
+    and up to burst requests can be made at once after a period of inactivity.
+    """
+    def __init__(self, requestsPerSecond: float, burst: int = 1):
+        """
+        @param requestsPerSecond: the number of requests per second that are allowed on average
+        @param burst: the max number of requests that can be made without waiting
+        """
+        RateLimiter.__init__(self)
+        assert requestsPerSecond > 0, "requestsPerSecond should be a positive number"
+        assert burst >= 1, "burst should be at least 1"
+        self._requestsPerSecond = float(requestsPerSecond)
+        self._burst = float(burst)
+        self._tokens = float(burst)
+        self._lastTime = time.monotonic()
+        self._lock = threading.Lock()
+
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, waitTime = self._takeToken(self._tokens, self._lastTime, now, self._requestsPerSecond, self._burst)
+            self._lastTime = now
+            return waitTime
+
+
+
+class FileTokenBucketRateLimiter(RateLimiter):
+    """
+    token bucket rate limiter whose state is stored in a file, so that the request budget is shared by all the processes
+    (on the same machine) that use the same file. Access to the file is synchronized using an exclusive file lock.
+    """
+    def __init__(self, fileName: str, requestsPerSecond: float, burst: int = 1):
+        """
+        @param fileName: path to the file where the state of the bucket is stored. The file is created if it doesn't exist
+        @param requestsPerSecond: the number of requests per second that are allowed on average (in total by all processes)
+        @param burst: the max number of requests that can be made without waiting
+        """
+        RateLimiter.__init__(self)
+        assert requestsPerSecond > 0, "requestsPerSecond should be a positive number"
+        assert burst >= 1, "burst should be at least 1"
+        self._fileName = fileName
+        self._requestsPerSecond = float(requestsPerSecond)
+        self._burst = float(burst)
+        self._lock = threading.Lock()
+
+
+    def _reserve(self) -> float:
+        with self._lock:
+            with open(self._fileName, "a+b") as f:
+                self._lockFile(f)
+                try:
+                    f.seek(0)
+                    content = f.read().decode("ascii").split()
+                    # time.time() is used since the monotonic clock is not comparable between processes
+                    now = time.time()
+                    tokens, lastTime = (float(content[0]), float(content[1])) if len(content) == 2 else (self._burst, now)
+                    tokens, waitTime = self._takeToken(tokens, lastTime, now, self._requestsPerSecond, self._burst)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(("%r %r" % (tokens, now)).encode("ascii"))
+                    f.flush()
+                finally:
+                    self._unlockFile(f)
+            return waitTime
+
+
+    @staticmethod
+    def _lockFile(f):
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+    @staticmethod
+    def _unlockFile(f):
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
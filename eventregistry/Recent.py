@@ -22,7 +22,7 @@ class GetRecentEvents(QueryParamsBase):
         @param returnInfo: what details should be included in the returned information
         """
         QueryParamsBase.__init__(self)
-
+        eventRegistry._requireSync("GetRecentEvents")
         self._er = eventRegistry
         self._setVal("recentActivityEventsMandatoryLocation", mandatoryLocation)
         # return only events that have at least a story in the specified language
@@ -68,7 +68,7 @@ class GetRecentArticles(QueryParamsBase):
         @param returnInfo: what details should be included in the returned information
         """
         QueryParamsBase.__init__(self)
-
+        eventRegistry._requireSync("GetRecentArticles")
         self._er = eventRegistry
         self._setVal("recentActivityArticlesMandatorySourceLocation", mandatorySourceLocation)
         if articleLang is not None:
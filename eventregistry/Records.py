@@ -0,0 +1,194 @@
+"""
+compact representation of the results (articles, events) for the applications that keep many of them in memory.
+
+A result returned by the API is a dict with nested dicts and lists and each of them repeats the same keys. A record stores
+the commonly used properties in the __slots__ of an object, the repeated values (language, data type, source uri,
+concept uris, ...) are interned so that all the records share a single copy of each, and the remaining properties are
+kept as a compact json string that is only decoded when they are accessed. Usage:
+
+    for art in QueryArticlesIter(keywords = "Tesla").execQuery(er).iterRecords():
+        print(art.uri, art.sourceUri, art.conceptUris)
+
+    res = er.execQuery(q)
+    arts = toRecords(res["articles"]["results"], ArticleRecord)
+
+Run "python -m eventregistry.tests.BenchmarkRecords" to compare the memory used by the records and by the dicts.
+"""
+import sys
+from typing import Union, List, Tuple, Iterable
+from eventregistry.JsonCodec import getDefaultJsonCodec
+
+# codec used to store the properties that are not kept as attributes
+_jsonCodec = getDefaultJsonCodec()
+
+
+class RecordBase(object):
+    """
+    base class of the records. Subclasses define the properties stored in the slots in FIELDS as
+    (attribute name, path in the result, should the value be interned) tuples
+    """
+    __slots__ = ("_extra",)
+    FIELDS = []
+    # lists of items in the result from which the tuples of interned uris are stored: (attribute name, key in the result)
+    URI_LISTS = []
+
+    @classmethod
+    def fromDict(cls, item: dict):
+        """create the record from a result (dict) returned by the API"""
+        record = cls.__new__(cls)
+        rest = dict(item)
+        for name, path, intern in cls.FIELDS:
+            value = _popPath(rest, path)
+            if intern and isinstance(value, str):
+                value = sys.intern(value)
+            object.__setattr__(record, name, value)
+        for name, key in cls.URI_LISTS:
+            values = rest.pop(key, None)
+            uris = tuple(sys.intern(value["uri"]) for value in values if isinstance(value, dict) and isinstance(value.get("uri"), str)) if isinstance(values, list) else ()
+            object.__setattr__(record, name, uris)
+            if values is not None:
+                _storeUriListDetails(rest, key, values, uris)
+        record._extra = _jsonCodec.encodeText(rest) if len(rest) > 0 else None
+        return record
+
+
+    def get(self, key: str, default = None):
+        """return the value of a property of the result: an attribute of the record or one of the properties stored as json"""
+        for name, path, _ in self.FIELDS:
+            if path == key:
+                value = getattr(self, name)
+                return default if value is None else value
+        extra = self.getExtra()
+        self._restoreUriLists(extra)
+        return extra.get(key, default)
+
+
+    def getExtra(self) -> dict:
+        """
+        return the properties of the result that are not stored as attributes (decoded from json on every call).
+        The items of the lists in URI_LISTS (concepts, categories) are returned without their uris
+        """
+        return _jsonCodec.decode(self._extra) if self._extra is not None else {}
+
+
+    def toDict(self) -> dict:
+        """return the result as a dict, in the same form as it was returned by the API"""
+        item = self.getExtra()
+        self._restoreUriLists(item)
+        for name, path, _ in self.FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                _setPath(item, path, value)
+        return item
+
+
+    def _restoreUriLists(self, extra: dict):
+        """add the uris (stored in the tuples) back to the items of the lists in URI_LISTS"""
+        for name, key in self.URI_LISTS:
+            uris = getattr(self, name)
+            details = extra.get(key)
+            if details is None:
+                if len(uris) > 0:
+                    extra[key] = [{"uri": uri} for uri in uris]
+            elif _isStrippedList(details, uris):
+                extra[key] = [dict(uri = uri, **itemDetails) for uri, itemDetails in zip(uris, details)]
+
+
+    def __repr__(self):
+        return "%s(uri=%r)" % (type(self).__name__, getattr(self, "uri", None))
+
+
+
+class ArticleRecord(RecordBase):
+    """
+    compact representation of an article. The attributes are None for the properties that were not returned
+    """
+    FIELDS = [
+        ("uri", "uri", False),
+        ("lang", "lang", True),
+        ("isDuplicate", "isDuplicate", False),
+        ("date", "date", True),
+        ("time", "time", False),
+        ("dateTime", "dateTime", False),
+        ("dataType", "dataType", True),
+        ("sim", "sim", False),
+        ("url", "url", False),
+        ("title", "title", False),
+        ("body", "body", False),
+        ("sourceUri", "source.uri", True),
+        ("eventUri", "eventUri", True),
+        ("sentiment", "sentiment", False),
+        ("wgt", "wgt", False),
+        ("relevance", "relevance", False),
+    ]
+    URI_LISTS = [("conceptUris", "concepts"), ("categoryUris", "categories")]
+    __slots__ = tuple(name for name, _, _ in FIELDS) + tuple(name for name, _ in URI_LISTS)
+
+
+
+class EventRecord(RecordBase):
+    """
+    compact representation of an event. The attributes are None for the properties that were not returned
+    """
+    FIELDS = [
+        ("uri", "uri", False),
+        ("eventDate", "eventDate", True),
+        ("totalArticleCount", "totalArticleCount", False),
+        ("sentiment", "sentiment", False),
+        ("socialScore", "socialScore", False),
+        ("wgt", "wgt", False),
+        ("relevance", "relevance", False),
+    ]
+    URI_LISTS = [("conceptUris", "concepts"), ("categoryUris", "categories")]
+    __slots__ = tuple(name for name, _, _ in FIELDS) + tuple(name for name, _ in URI_LISTS)
+
+
+
+def toRecords(items: Iterable[dict], recordClass = ArticleRecord) -> List[RecordBase]:
+    """
+    convert the results (e.g. res["articles"]["results"] returned by execQuery()) to records
+    @param items: list of results
+    @param recordClass: ArticleRecord or EventRecord
+    """
+    return [recordClass.fromDict(item) for item in items]
+
+
+def _storeUriListDetails(rest: dict, key: str, values, uris: Tuple[str]):
+    """
+    store in rest the properties of the list items other than their uris (e.g. the labels and scores of the concepts),
+    so that the uris are not stored twice. Lists with items that don't have a uri are stored unchanged
+    """
+    details = [dict((k, v) for k, v in value.items() if k != "uri") for value in values] if isinstance(values, list) and len(values) == len(uris) else None
+    if details is None:
+        rest[key] = values
+    # the list is not stored if it can be created from the uris alone (unless it is empty)
+    elif len(values) == 0 or any(len(itemDetails) > 0 for itemDetails in details):
+        rest[key] = details
+
+
+def _isStrippedList(details, uris: Tuple[str]) -> bool:
+    """is details a list created by _storeUriListDetails() from a list with the given uris"""
+    return isinstance(details, list) and len(details) == len(uris) and all(isinstance(itemDetails, dict) and "uri" not in itemDetails for itemDetails in details)
+
+
+def _popPath(item: dict, path: str):
+    """
+    return the value at the (dot separated) path. The value is removed from the item if that doesn't lose any data:
+    a nested dict is removed only when the value is its only property
+    """
+    if "." not in path:
+        return item.pop(path, None)
+    key, subKey = path.split(".", 1)
+    parent = item.get(key)
+    if not isinstance(parent, dict):
+        return None
+    if len(parent) == 1 and subKey in parent:
+        del item[key]
+    return parent.get(subKey)
+
+
+def _setPath(item: dict, path: str, value):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        item = item.setdefault(key, {})
+    item[keys[-1]] = value
@@ -0,0 +1,226 @@
+"""
+classes that determine how the failed requests are repeated.
+
+RetryPolicy computes the wait time before repeating a failed request (exponential backoff with full jitter,
+respecting the Retry-After header). CircuitBreaker keeps track of the failures for each host and makes the
+requests fail fast while the host is considered to be down.
+"""
+import time, random, threading, datetime, email.utils
+from typing import Union
+
+
+class CircuitBreakerOpenError(Exception):
+    """raised when a request is not made because the circuit breaker for the host is open"""
+    pass
+
+
+
+class RetryPolicy(object):
+    """
+    exponential backoff with full jitter: before repeating the request for the n-th time, wait a random time between 0 and
+    min(maxDelay, baseDelay * multiplier ** (n - 1)) seconds. If the service returned a Retry-After header, wait at least that long.
+    """
+    def __init__(self,
+                 maxRetries: int = -1,
+                 baseDelay: float = 1,
+                 maxDelay: float = 60,
+                 multiplier: float = 2,
+                 jitter: bool = True,
+                 respectRetryAfter: bool = True,
+                 maxRetryAfter: float = 600):
+        """
+        @param maxRetries: the max number of times a failed request is repeated (-1 for indefinitely)
+        @param baseDelay: the upper bound (in seconds) of the wait time before the first repetition
+        @param maxDelay: the largest upper bound (in seconds) of the wait time
+        @param multiplier: by how much the upper bound of the wait time grows with each repetition
+        @param jitter: if True, the wait time is chosen randomly between 0 and the upper bound (full jitter). If False, the upper bound is used
+        @param respectRetryAfter: if True, wait at least as long as requested by the Retry-After header of the response
+        @param maxRetryAfter: the max number of seconds we are willing to wait because of the Retry-After header
+        """
+        assert baseDelay >= 0 and maxDelay >= baseDelay, "baseDelay should be non-negative and not larger than maxDelay"
+        assert multiplier >= 1, "multiplier should be at least 1"
+        self._maxRetries = maxRetries
+        self._baseDelay = baseDelay
+        self._maxDelay = maxDelay
+        self._multiplier = multiplier
+        self._jitter = jitter
+        self._respectRetryAfter = respectRetryAfter
+        self._maxRetryAfter = maxRetryAfter
+        self._lock = threading.Lock()
+        self._retryCount = 0
+        self._retryAfterCount = 0
+        self._totalDelay = 0.0
+
+
+    def shouldRetry(self, tryCount: int) -> bool:
+        """
+        should the request be repeated after it failed for the tryCount-th time
+        """
+        return self._maxRetries < 0 or tryCount <= self._maxRetries
+
+
+    def getDelay(self, tryCount: int, retryAfter: Union[float, None] = None) -> float:
+        """
+        return the number of seconds to wait before repeating the request that failed for the tryCount-th time
+        @param tryCount: how many times the request has failed so far (1, 2, ...)
+        @param retryAfter: number of seconds the service asked us to wait (from the Retry-After header) or None
+        """
+        upperBound = min(self._maxDelay, self._baseDelay * self._multiplier ** max(0, tryCount - 1))
+        delay = random.uniform(0, upperBound) if self._jitter else upperBound
+        usedRetryAfter = self._respectRetryAfter and retryAfter is not None
+        if usedRetryAfter:
+            delay = max(delay, min(retryAfter, self._maxRetryAfter))
+        with self._lock:
+            self._retryCount += 1
+            self._totalDelay += delay
+            if usedRetryAfter:
+                self._retryAfterCount += 1
+        return delay
+
+
+    def getStats(self) -> dict:
+        """return the number of repeated requests, how many of them respected Retry-After and the total wait time in seconds"""
+        with self._lock:
+            return {
+                "retryCount": self._retryCount,
+                "retryAfterCount": self._retryAfterCount,
+                "totalDelay": self._totalDelay
+            }
+
+
+    @staticmethod
+    def parseRetryAfter(value: Union[str, None]) -> Union[float, None]:
+        """
+        parse the value of the Retry-After header. It can be a number of seconds or a http date
+        @returns: the number of seconds to wait or None if the value is missing or invalid
+        """
+        if value is None:
+            return None
+        value = str(value).strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retryDate = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+        if retryDate is None:
+            return None
+        if retryDate.tzinfo is None:
+            retryDate = retryDate.replace(tzinfo = datetime.timezone.utc)
+        return max(0.0, (retryDate - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+
+class CircuitBreaker(object):
+    """
+    per-host circuit breaker. After failureThreshold consecutive failures on a host the circuit opens and all requests
+    to the host fail immediately with CircuitBreakerOpenError. After recoveryTimeout seconds the circuit becomes half-open
+    and lets through up to halfOpenMaxCalls probe requests. A successful probe closes the circuit, a failed one opens it again.
+    The callers have to call releaseProbe() for every probe request when it finishes, whatever its outcome
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "halfOpen"
+
+    def __init__(self, failureThreshold: int = 5, recoveryTimeout: float = 30, halfOpenMaxCalls: int = 1):
+        """
+        @param failureThreshold: number of consecutive failures after which the circuit opens
+        @param recoveryTimeout: number of seconds the circuit stays open before probe requests are allowed
+        @param halfOpenMaxCalls: number of probe requests that can be in flight while the circuit is half-open
+        """
+        assert failureThreshold > 0, "failureThreshold should be a positive number"
+        assert halfOpenMaxCalls > 0, "halfOpenMaxCalls should be a positive number"
+        self._failureThreshold = failureThreshold
+        self._recoveryTimeout = recoveryTimeout
+        self._halfOpenMaxCalls = halfOpenMaxCalls
+        self._lock = threading.Lock()
+        # state of each host
+        self._hosts = {}
+
+
+    def beforeRequest(self, host: str) -> bool:
+        """
+        check if a request to the host can be made. Raises CircuitBreakerOpenError if the circuit for the host is open
+        @returns: True if the request is a probe of a half-open circuit. In that case releaseProbe() has to be called
+            when the request finishes (also when it fails or is cancelled)
+        """
+        with self._lock:
+            hostState = self._getHostState(host)
+            if hostState["state"] == self.OPEN:
+                if time.monotonic() - hostState["openedAt"] < self._recoveryTimeout:
+                    hostState["rejectedCount"] += 1
+                    raise CircuitBreakerOpenError("Circuit breaker for host %s is open. Requests will be allowed again in %.1f seconds" %
+                        (host, self._recoveryTimeout - (time.monotonic() - hostState["openedAt"])))
+                hostState["state"] = self.HALF_OPEN
+            if hostState["state"] == self.HALF_OPEN:
+                if hostState["probesInFlight"] >= self._halfOpenMaxCalls:
+                    hostState["rejectedCount"] += 1
+                    raise CircuitBreakerOpenError("Circuit breaker for host %s is half-open and is waiting for the probe requests to finish" % host)
+                hostState["probesInFlight"] += 1
+                return True
+            return False
+
+
+    def releaseProbe(self, host: str):
+        """report that a probe request (see beforeRequest()) finished, so that another probe can be made if the circuit is still half-open"""
+        with self._lock:
+            hostState = self._getHostState(host)
+            hostState["probesInFlight"] = max(0, hostState["probesInFlight"] - 1)
+
+
+    def recordSuccess(self, host: str):
+        """report that a request to the host succeeded (the host responded without signs of being overloaded)"""
+        with self._lock:
+            hostState = self._getHostState(host)
+            hostState["successCount"] += 1
+            hostState["consecutiveFailures"] = 0
+            if hostState["state"] != self.CLOSED:
+                hostState["state"] = self.CLOSED
+
+
+    def recordFailure(self, host: str):
+        """report that a request to the host failed (timeout, connection error, 429 or 5xx response)"""
+        with self._lock:
+            hostState = self._getHostState(host)
+            hostState["failureCount"] += 1
+            hostState["consecutiveFailures"] += 1
+            if hostState["state"] == self.HALF_OPEN or hostState["consecutiveFailures"] >= self._failureThreshold:
+                if hostState["state"] != self.OPEN:
+                    hostState["openCount"] += 1
+                hostState["state"] = self.OPEN
+                hostState["openedAt"] = time.monotonic()
+
+
+    def getState(self, host: str) -> str:
+        """return the state of the circuit for the host: CircuitBreaker.CLOSED, CircuitBreaker.OPEN or CircuitBreaker.HALF_OPEN"""
+        with self._lock:
+            return self._getHostState(host)["state"]
+
+
+    def getStats(self) -> dict:
+        """return for each host the state of the circuit and the number of successful, failed and rejected requests and how many times the circuit opened"""
+        with self._lock:
+            return dict((host, {
+                "state": hostState["state"],
+                "successCount": hostState["successCount"],
+                "failureCount": hostState["failureCount"],
+                "rejectedCount": hostState["rejectedCount"],
+                "openCount": hostState["openCount"]
+            }) for host, hostState in self._hosts.items())
+
+
+    def _getHostState(self, host: str) -> dict:
+        if host not in self._hosts:
+            self._hosts[host] = {
+                "state": self.CLOSED,
+                "consecutiveFailures": 0,
+                "openedAt": 0.0,
+                "probesInFlight": 0,
+                "successCount": 0,
+                "failureCount": 0,
+                "rejectedCount": 0,
+                "openCount": 0
+            }
+        return self._hosts[host]
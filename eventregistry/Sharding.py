@@ -0,0 +1,292 @@
+"""
+splitting of large queries into date windows (shards) that are downloaded at the same time.
+
+An iterator over the results (QueryArticlesIter, QueryEventsIter) downloads the pages of a single query, so the time needed
+to download the results of a large query grows with the number of pages. DateShardedIter splits the date range of the
+query (dateStart..dateEnd) into windows. The size of the windows is adapted to the number of results: the range is split
+in half as long as a window contains more than maxShardItems results (as reported by count()). The windows are then
+iterated in several threads at the same time and their results are merged into a single stream without duplicates.
+
+The download threads are daemon threads that don't reference the iterator. They stop when close() is called, when the
+"with" block that uses the iterator is left or when the iterator is garbage collected.
+"""
+import copy, time, queue, datetime, collections, threading, concurrent.futures
+from typing import Union, List, Tuple
+from eventregistry.Base import QueryParamsBase, getQueryDateRange, limitQueryDateRange
+from eventregistry.Columnar import toColumnar, checkColumnar
+from eventregistry.Retry import RetryPolicy
+from eventregistry.Logger import logger
+
+
+class DateShardedIter(object):
+    """
+    iterator over the results of a QueryArticlesIter or QueryEventsIter that downloads the results for several date windows
+    at the same time. The items are returned in the order in which they were downloaded, not in the order of the sortBy
+    parameter. Usage:
+        q = QueryArticlesIter(keywords = "Tesla", dateStart = "2023-01-01", dateEnd = "2023-06-30")
+        with DateShardedIter(q, er, maxShards = 8) as it:
+            for art in it:
+                ...
+    """
+    def __init__(self, query: QueryParamsBase, eventRegistry,
+                 maxShardItems: int = 10000,
+                 maxShards: int = 4,
+                 maxItems: int = -1,
+                 **kwargs):
+        """
+        @param query: instance of QueryArticlesIter or QueryEventsIter (created using the constructor or initWithComplexQuery()).
+            The query has to specify dateStart. If dateEnd is not specified, today is used
+        @param eventRegistry: instance of EventRegistry class used to execute the queries. It should allow at least maxShards
+            concurrent requests (see the maxConcurrentRequests parameter)
+        @param maxShardItems: windows with more results than this are split further (down to windows of a single day)
+        @param maxShards: number of date windows that are downloaded at the same time
+        @param maxItems: maximum number of items to be returned (-1 for all)
+        @param kwargs: other parameters that are passed to the execQuery() method of the query for every window (sortBy, returnInfo, prefetchDepth, ...)
+        """
+        assert maxShardItems > 0, "maxShardItems should be a positive number"
+        assert maxShards > 0, "maxShards should be a positive number"
+        assert "maxItems" not in kwargs, "use the maxItems parameter of DateShardedIter"
+        eventRegistry._requireSync("DateShardedIter")
+        self._query = query
+        self._er = eventRegistry
+        self._maxShardItems = maxShardItems
+        self._maxShards = maxShards
+        self._maxItems = maxItems
+        self._execKwargs = kwargs
+        if maxShards > 1 and eventRegistry.getConcurrencyController().getMaxLimit() < maxShards:
+            logger.warning("Only %d of the %d date windows will be downloaded at the same time since EventRegistry allows only %d concurrent requests. Set maxConcurrentRequests to at least %d",
+                eventRegistry.getConcurrencyController().getMaxLimit(), maxShards, eventRegistry.getConcurrencyController().getMaxLimit(), maxShards)
+        self._shards = None
+        self._started = False
+        # the downloaded pages of items. Bounded, so that the threads stop downloading when the caller is not consuming the items
+        self._queue = queue.Queue(maxsize = 2 * maxShards)
+        # the items of the current page that were not returned yet
+        self._items = collections.deque()
+        self._stopEvent = threading.Event()
+        self._runningShards = 0
+        self._seenUris = set()
+        self._currItem = 0
+        self._retryPolicy = RetryPolicy(maxRetries = 2, baseDelay = 1, maxDelay = 30)
+
+
+    def getShards(self) -> List[Tuple[str, str, int]]:
+        """
+        return the date windows that the query is split into as a list of (dateStart, dateEnd, number of results) tuples.
+        The windows are computed (using count() queries) on the first call
+        """
+        if self._shards is None:
+            self._shards = self._computeShards()
+        return list(self._shards)
+
+
+    def close(self):
+        """stop the downloads of the windows"""
+        self._stopEvent.set()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+    def __del__(self):
+        # the download threads only hold the queue and the stop event, so the iterator can be collected while they are running
+        if hasattr(self, "_stopEvent"):
+            self._stopEvent.set()
+
+
+    def iterBatches(self, columnar: Union[str, None] = None, columns: Union[List, None] = None):
+        """
+        return a generator over the batches of results. Each batch contains the new results of a page of one of the windows.
+        See QueryIterBase.iterBatches() for the description of the parameters
+        """
+        columns = columns or self._query._getDefaultColumns()
+        checkColumnar(columnar, columns)
+        return self._iterBatches(columnar, columns)
+
+
+    def iterRecords(self):
+        """return an iterator over the results converted to compact records. See QueryIterBase.iterRecords()"""
+        recordClass = self._query._getRecordClass()
+        if recordClass is None:
+            raise ValueError("The results of %s can not be converted to records" % type(self._query).__name__)
+        return map(recordClass.fromDict, self)
+
+
+    def _iterBatches(self, columnar: Union[str, None], columns: Union[List, None]):
+        try:
+            while self._maxItems < 0 or self._currItem < self._maxItems:
+                if len(self._items) > 0:
+                    batch = list(self._items)
+                    self._items.clear()
+                else:
+                    batch = self._getNextBatch()
+                    if batch is None:
+                        return
+                if self._maxItems >= 0:
+                    batch = batch[:self._maxItems - self._currItem]
+                self._currItem += len(batch)
+                yield toColumnar(batch, columnar, columns)
+            self.close()
+        except GeneratorExit:
+            self.close()
+            raise
+
+
+    def __iter__(self):
+        return self
+
+
+    def __next__(self):
+        if self._maxItems >= 0 and self._currItem >= self._maxItems:
+            self.close()
+            raise StopIteration
+        while len(self._items) == 0:
+            batch = self._getNextBatch()
+            if batch is None:
+                raise StopIteration
+            self._items.extend(batch)
+        self._currItem += 1
+        return self._items.popleft()
+
+
+    def _getNextBatch(self) -> Union[List, None]:
+        """return the new items from the next downloaded page of any window or None if all the windows were downloaded"""
+        if not self._started and not self._stopEvent.is_set():
+            self._start()
+        while True:
+            if self._runningShards == 0 and self._queue.empty():
+                self.close()
+                return None
+            kind, value = self._queue.get()
+            if kind == "done":
+                self._runningShards -= 1
+            elif kind == "error":
+                self.close()
+                raise value
+            else:
+                batch = [item for item in value if self._isNew(item)]
+                if len(batch) > 0:
+                    return batch
+
+
+    def _isNew(self, item) -> bool:
+        """return False for items that were already returned (the windows don't overlap, but the same item can appear twice if the results change during the download)"""
+        uri = item.get("uri") if isinstance(item, dict) else None
+        if uri is None:
+            return True
+        if uri in self._seenUris:
+            return False
+        self._seenUris.add(uri)
+        return True
+
+
+    def _start(self):
+        self._started = True
+        shards = self.getShards()
+        self._runningShards = len(shards)
+        pendingQueries = queue.Queue()
+        for dateStart, dateEnd, _ in shards:
+            pendingQueries.put(self._getShardQuery(dateStart, dateEnd))
+        for i in range(min(self._maxShards, len(shards))):
+            thread = threading.Thread(target = DateShardedIter._downloadShards, name = "eventregistry-shard-%d" % i, daemon = True,
+                args = (pendingQueries, self._er, self._execKwargs, self._queue, self._stopEvent))
+            thread.start()
+
+
+    @staticmethod
+    def _downloadShards(pendingQueries: queue.Queue, er, execKwargs: dict, resultQueue: queue.Queue, stopEvent: threading.Event):
+        """
+        iterate over the results of the windows and put the pages of results into the result queue. The method is static
+        so that the thread doesn't keep the iterator alive
+        """
+        while not stopEvent.is_set():
+            try:
+                query = pendingQueries.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                it = query.execQuery(er, **execKwargs)
+                for batch in it.iterBatches():
+                    if not DateShardedIter._put(resultQueue, stopEvent, ("items", batch)):
+                        return
+            except Exception as ex:
+                DateShardedIter._put(resultQueue, stopEvent, ("error", ex))
+                return
+            DateShardedIter._put(resultQueue, stopEvent, ("done", None))
+
+
+    @staticmethod
+    def _put(resultQueue: queue.Queue, stopEvent: threading.Event, value) -> bool:
+        """add the value to the queue. Returns False if the iteration was stopped in the meantime"""
+        while not stopEvent.is_set():
+            try:
+                resultQueue.put(value, timeout = 0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+
+    def _computeShards(self) -> List[Tuple[str, str, int]]:
+        """split the date range of the query into windows with at most maxShardItems results"""
+        dateStart, dateEnd = getQueryDateRange(self._query.queryParams)
+        if dateStart is None:
+            raise ValueError("The query has to specify dateStart in order to be split into date windows")
+        if dateEnd is None:
+            dateEnd = datetime.date.today().isoformat()
+        windows = [(dateStart, dateEnd)]
+        shards = []
+        # the windows of the same size are counted at the same time
+        with concurrent.futures.ThreadPoolExecutor(max_workers = self._maxShards, thread_name_prefix = "eventregistry-shard") as executor:
+            while len(windows) > 0:
+                counts = list(executor.map(lambda window: self._countWindow(*window), windows))
+                nextWindows = []
+                for (start, end), count in zip(windows, counts):
+                    if count <= self._maxShardItems or start == end:
+                        if count > 0:
+                            shards.append((start, end, count))
+                    else:
+                        nextWindows.extend(self._splitWindow(start, end))
+                windows = nextWindows
+        shards.sort()
+        logger.debug("The query was split into %d date windows", len(shards))
+        return shards
+
+
+    def _countWindow(self, dateStart: str, dateEnd: str) -> int:
+        """
+        return the number of results in the window. A failed request is repeated and if it still fails, the exception is raised.
+        Otherwise the results of the window would be silently left out
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._getShardQuery(dateStart, dateEnd).count(self._er, raiseOnError = True)
+            except Exception as ex:
+                if not self._retryPolicy.shouldRetry(attempt):
+                    raise
+                delay = self._retryPolicy.getDelay(attempt)
+                logger.warning("Counting the results from %s to %s failed (attempt %d): %s. The request will be repeated in %.1f seconds", dateStart, dateEnd, attempt, ex, delay)
+                time.sleep(delay)
+
+
+    @staticmethod
+    def _splitWindow(dateStart: str, dateEnd: str) -> List[Tuple[str, str]]:
+        """split the window into two halves"""
+        start = datetime.date.fromisoformat(dateStart)
+        end = datetime.date.fromisoformat(dateEnd)
+        middle = start + (end - start) // 2
+        return [(start.isoformat(), middle.isoformat()), ((middle + datetime.timedelta(days = 1)).isoformat(), end.isoformat())]
+
+
+    def _getShardQuery(self, dateStart: str, dateEnd: str):
+        """return a copy of the query that is limited to the given window"""
+        q = copy.copy(self._query)
+        q.queryParams = limitQueryDateRange(self._query.queryParams, dateStart, dateEnd)
+        q.resultTypeList = []
+        return q
@@ -28,6 +28,7 @@ class TopicPages(QueryParamsBase):
         """
         get the list of topic pages owned by me
         """
+        self.eventRegistry._requireSync("TopicPages.getMyTopicPages()")
         userProfile = self.eventRegistry.jsonRequest("/api/v1/user/getUserProfile", {})
         return userProfile.get("ownedTopicPages", [])
 
@@ -88,6 +89,7 @@ class TopicPage(QueryParamsBase):
             "includeTopicPageOwner": True,
             "uri": uri
         }
+        self.eventRegistry._requireSync("TopicPage.loadTopicPageFromER()")
         self.topicPage = self._createEmptyTopicPage()
         self.concept = self.eventRegistry.jsonRequest("/api/v1/topicPage", params)
         self.topicPage.update(self.concept.get("topicPage", {}))
@@ -407,7 +409,7 @@ class TopicPage(QueryParamsBase):
             "articlesSortBy": sortBy,
             "articlesSortByAsc": sortByAsc,
             "articlesPage": page,
-            "topicPage": json.dumps(self.topicPage)
+            "topicPage": self.eventRegistry.getJsonCodec().encodeText(self.topicPage)
         }
         params.update(returnInfo.getParams("articles"))
         params.update(kwargs)
@@ -439,7 +441,7 @@ class TopicPage(QueryParamsBase):
             "eventsPage": page,
             "eventsSortBy": sortBy,
             "eventsSortByAsc": sortByAsc,
-            "topicPage": json.dumps(self.topicPage)
+            "topicPage": self.eventRegistry.getJsonCodec().encodeText(self.topicPage)
         }
         params.update(returnInfo.getParams("events"))
         params.update(kwargs)
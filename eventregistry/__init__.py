@@ -1,6 +1,18 @@
 ﻿from eventregistry._version import __version__
 
 from eventregistry.Base import *
+from eventregistry.RateLimiter import *
+from eventregistry.Concurrency import *
+from eventregistry.Coalescing import *
+from eventregistry.Retry import *
+from eventregistry.Cache import *
+from eventregistry.JsonCodec import *
+from eventregistry.LazyResponse import *
+from eventregistry.Columnar import *
+from eventregistry.Paging import *
+from eventregistry.Sharding import *
+from eventregistry.Export import *
+from eventregistry.Records import *
 from eventregistry.EventForText import *
 from eventregistry.ReturnInfo import *
 from eventregistry.Query import *
@@ -13,8 +25,10 @@ from eventregistry.QueryStory import *
 from eventregistry.Counts import *
 from eventregistry.DailyShares import *
 from eventregistry.Info import *
+from eventregistry.Batching import *
 from eventregistry.Recent import *
 from eventregistry.Trends import *
 from eventregistry.Analytics import *
 from eventregistry.TopicPage import *
-from eventregistry.EventRegistry import *
\ No newline at end of file
+from eventregistry.EventRegistry import *
+from eventregistry.AsyncEventRegistry import *
\ No newline at end of file
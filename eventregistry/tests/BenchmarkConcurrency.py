@@ -0,0 +1,32 @@
+"""
+benchmark that shows how the throughput of a shared EventRegistry instance scales with the number of threads.
+Requests are made against a local stub server that responds after a fixed latency.
+
+Run it with: python -m eventregistry.tests.BenchmarkConcurrency
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from eventregistry import EventRegistry
+from eventregistry.tests.StubServer import StubServer
+
+
+def runBenchmark(latency: float = 0.05, requestsPerThread: int = 20, threadCounts = (1, 2, 4, 8, 16, 32)):
+    results = []
+    with StubServer(lambda path, params: (200, {}, {"articles": {"results": []}}), latency = latency) as server:
+        for threadCount in threadCounts:
+            er = EventRegistry(apiKey = "benchmark", host = server.url, minDelayBetweenRequests = 0, maxConcurrentRequests = threadCount)
+            requestCount = threadCount * requestsPerThread
+            start = time.time()
+            with ThreadPoolExecutor(threadCount) as pool:
+                list(pool.map(lambda i: er.jsonRequest("/api/v1/article", {"i": i}), range(requestCount)))
+            elapsed = time.time() - start
+            results.append((threadCount, requestCount / elapsed))
+    baseline = results[0][1]
+    print("threads    req/s    speedup")
+    for threadCount, throughput in results:
+        print("%7d  %7.1f  %8.2fx" % (threadCount, throughput, throughput / baseline))
+    return results
+
+
+if __name__ == "__main__":
+    runBenchmark()
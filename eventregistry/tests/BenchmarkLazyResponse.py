@@ -0,0 +1,51 @@
+"""
+benchmark that compares the time and the peak memory needed to read one section of a large response with several
+result types when the whole response is decoded (as by execQuery()) and when it is decoded lazily (as by execQueryLazy()).
+The lazy decoding is only used with JsonCodec, so the time of decoding the whole response with orjson is shown for comparison.
+
+Run it with: python -m eventregistry.tests.BenchmarkLazyResponse
+"""
+import json, time, tracemalloc
+from eventregistry import JsonCodec, OrjsonCodec, LazyResponse
+from eventregistry.tests.BenchmarkRecords import createArticlesJson
+
+
+def createResponse(articleCount: int = 5000) -> bytes:
+    """return the body of a response with the articles, the concept aggregate and the time aggregate"""
+    concepts = [{"uri": "http://en.wikipedia.org/wiki/Concept_%d" % i, "type": "wiki", "score": i, "label": {"eng": "Concept %d" % i}} for i in range(500)]
+    times = [{"date": "2023-06-%02d" % (i + 1), "count": 100 + i} for i in range(30)]
+    return ('{"articles":{"results":%s,"page":1,"pages":1,"totalResults":%d},"conceptAggr":{"results":%s},"timeAggr":{"results":%s}}' % (
+        createArticlesJson(articleCount), articleCount, json.dumps(concepts), json.dumps(times))).encode("utf-8")
+
+
+def measure(read):
+    """return the seconds and the peak number of bytes allocated by read()"""
+    tracemalloc.start()
+    startTime = time.time()
+    read()
+    duration = time.time() - startTime
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak
+
+
+def runBenchmark(articleCount: int = 5000):
+    data = createResponse(articleCount)
+    codec = JsonCodec()
+    fullTime, fullPeak = measure(lambda: codec.decode(data)["timeAggr"])
+    lazyTime, lazyPeak = measure(lambda: LazyResponse(data, codec)["timeAggr"])
+    print("response size: %d bytes, reading the timeAggr section" % len(data))
+    print("decoding     seconds    peak bytes")
+    print("full       %9.3f  %12d" % (fullTime, fullPeak))
+    print("lazy       %9.3f  %12d" % (lazyTime, lazyPeak))
+    try:
+        orjsonCodec = OrjsonCodec()
+    except ImportError:
+        return fullPeak, lazyPeak
+    orjsonTime, orjsonPeak = measure(lambda: orjsonCodec.decode(data)["timeAggr"])
+    print("orjson     %9.3f  %12d" % (orjsonTime, orjsonPeak))
+    return fullPeak, lazyPeak
+
+
+if __name__ == "__main__":
+    runBenchmark()
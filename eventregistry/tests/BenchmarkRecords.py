@@ -0,0 +1,51 @@
+"""
+benchmark that compares the memory used by the articles kept as dicts (as returned by the API) and as ArticleRecord objects.
+The articles are decoded from json, so that the strings are not shared between them in the same way as in a real response.
+
+Run it with: python -m eventregistry.tests.BenchmarkRecords
+"""
+import json, random, tracemalloc
+from eventregistry import ArticleRecord
+
+
+def createArticlesJson(count: int = 20000):
+    """return the json of a list of articles that resemble the results of the API (without the article body)"""
+    sources = ["bbc.co.uk", "theguardian.com", "reuters.com", "spiegel.de", "lemonde.fr"]
+    concepts = ["http://en.wikipedia.org/wiki/" + name for name in ["Tesla,_Inc.", "Elon_Musk", "Electric_vehicle", "Germany", "Stock", "China", "Battery"]]
+    random.seed(1)
+    articles = []
+    for i in range(count):
+        articles.append({
+            "uri": str(7000000000 + i), "lang": random.choice(["eng", "deu", "fra"]), "isDuplicate": False,
+            "date": "2023-06-%02d" % (i % 30 + 1), "time": "12:%02d:00" % (i % 60), "dateTime": "2023-06-%02dT12:%02d:00Z" % (i % 30 + 1, i % 60),
+            "dataType": "news", "sim": 0, "url": "https://example.com/article/%d" % i, "title": "Title of the article %d" % i,
+            "source": {"uri": random.choice(sources), "dataType": "news", "title": "Source"},
+            "concepts": [{"uri": uri, "type": "wiki", "score": 3} for uri in random.sample(concepts, 4)],
+            "eventUri": "eng-%d" % (i % 1000), "sentiment": 0.1, "wgt": 400000000 + i, "relevance": 1
+        })
+    return json.dumps(articles)
+
+
+def measure(create):
+    """return the result of create() and the number of bytes allocated by it"""
+    tracemalloc.start()
+    result = create()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def runBenchmark(count: int = 20000):
+    data = createArticlesJson(count)
+    dicts, dictSize = measure(lambda: json.loads(data))
+    del dicts
+    records, recordSize = measure(lambda: [ArticleRecord.fromDict(art) for art in json.loads(data)])
+    print("representation    bytes/article")
+    print("dict              %13.0f" % (dictSize / count))
+    print("ArticleRecord     %13.0f" % (recordSize / count))
+    print("saved             %12.0f%%" % (100 * (1 - recordSize / dictSize)))
+    return dictSize / count, recordSize / count
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,132 @@
+"""
+a minimal local http server that imitates the Event Registry api. Used by the tests and benchmarks that should not depend on the real service
+"""
+import json, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubServer(object):
+    """
+    http server running in a background thread. For every POST request it calls responder(path, params) which should return
+    a tuple (statusCode, headers, body). body can be a dict/list (returned as json) or a string.
+    Usage:
+        with StubServer(lambda path, params: (200, {}, {"ok": True})) as server:
+            er = EventRegistry(host = server.url)
+    """
+    def __init__(self, responder = None, latency: float = 0):
+        """
+        @param responder: function that receives the path and the json decoded parameters and returns (statusCode, headers, body)
+        @param latency: number of seconds to wait before returning each response
+        """
+        self.responder = responder or (lambda path, params: (200, {}, params))
+        self.latency = latency
+        self.requests = []
+        self._lock = threading.Lock()
+        self._inFlight = 0
+        self.maxInFlight = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                params = json.loads(self.rfile.read(length) or b"{}")
+                stub._onRequestStart(self.path, params)
+                try:
+                    if stub.latency > 0:
+                        time.sleep(stub.latency)
+                    status, headers, body = stub.responder(self.path, params)
+                finally:
+                    stub._onRequestEnd()
+                data = body if isinstance(body, bytes) else (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self._server.server_address[1]
+        self._thread = None
+
+
+    def _onRequestStart(self, path, params):
+        with self._lock:
+            self.requests.append((path, params))
+            self._inFlight += 1
+            self.maxInFlight = max(self.maxInFlight, self._inFlight)
+
+
+    def _onRequestEnd(self):
+        with self._lock:
+            self._inFlight -= 1
+
+
+    def start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+
+def createEventRegistry(server: StubServer, erClass = None, **kwargs):
+    """
+    return an instance of EventRegistry (or of erClass, e.g. AsyncEventRegistry) that sends the requests to the server
+    without any delay between them. The keyword arguments are passed to the constructor and override the defaults
+    """
+    from eventregistry.EventRegistry import EventRegistry
+    params = dict(apiKey = "testKey", host = server.url, hostAnalytics = server.url, minDelayBetweenRequests = 0)
+    params.update(kwargs)
+    return (erClass or EventRegistry)(**params)
+
+
+
+class PagedResponder(object):
+    """
+    responder for StubServer that imitates the paged results of the search queries (articles, events, mentions).
+    Items are dicts {"uri": "0"}, {"uri": "1"}, ...
+    """
+    def __init__(self, totalItems: int, resultType: str = "articles", wrapKey: str = None):
+        """
+        @param totalItems: number of items that match the query
+        @param resultType: "articles", "events" or "mentions". Determines the name of the page and count parameters and of the result property
+        @param wrapKey: if set, the results are returned inside this property (as done for the articles of an event, where the event uri is used)
+        """
+        self.totalItems = totalItems
+        self.resultType = resultType
+        self.wrapKey = wrapKey
+        self.pages = []
+        self._lock = threading.Lock()
+
+
+    def __call__(self, path, params):
+        page = params.get(self.resultType + "Page", 1)
+        count = params.get(self.resultType + "Count", 100)
+        with self._lock:
+            self.pages.append(page)
+        start = (page - 1) * count
+        results = [{"uri": str(i)} for i in range(start, min(start + count, self.totalItems))]
+        body = {self.resultType: {"results": results, "page": page, "totalResults": self.totalItems, "pages": (self.totalItems + count - 1) // count}}
+        if self.wrapKey is not None:
+            body = {self.wrapKey: body}
+        return (200, {}, body)
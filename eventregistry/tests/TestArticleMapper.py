@@ -0,0 +1,88 @@
+import unittest, tempfile, shutil, os
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, createEventRegistry
+
+
+def mapperResponder(path, params):
+    urls = params["articleUrl"] if isinstance(params["articleUrl"], list) else [params["articleUrl"]]
+    return (200, {}, dict((url, None if "unknown" in url else "uri-" + url.rsplit("/", 1)[-1]) for url in urls if "missing" not in url))
+
+
+
+class TestArticleMapper(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.urls = ["https://example.com/news/%d" % i for i in range(250)]
+
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+
+    def testBulkMapping(self):
+        with StubServer(mapperResponder, latency = 0.1) as server:
+            mapper = ArticleMapper(createEventRegistry(server, maxConcurrentRequests = 3), chunkSize = 100)
+            mappings = mapper.getArticleUris(self.urls + self.urls[:10])
+            # the urls are sent in chunks, the chunks at the same time
+            self.assertEqual(sorted(len(params["articleUrl"]) for path, params in server.requests), [50, 100, 100])
+            self.assertEqual(server.maxInFlight, 3)
+            self.assertEqual(list(mappings), self.urls)
+            self.assertEqual(mappings["https://example.com/news/7"], "uri-7")
+
+            # the remembered mappings are not requested again
+            self.assertEqual(mapper.getArticleUri("https://example.com/news/9"), "uri-9")
+            mappings = mapper.getArticleUris(["https://example.com/news/1", "https://example.com/unknown/1", "https://example.com/missing/1"])
+            self.assertEqual(mappings, {"https://example.com/news/1": "uri-1", "https://example.com/unknown/1": None, "https://example.com/missing/1": None})
+            self.assertEqual(server.requests[-1][1]["articleUrl"], ["https://example.com/unknown/1", "https://example.com/missing/1"])
+            # the urls that the service returned (also without a match) are remembered, the ones it didn't return are not
+            mapper.getArticleUris(["https://example.com/unknown/1", "https://example.com/missing/1"])
+            self.assertEqual(server.requests[-1][1]["articleUrl"], ["https://example.com/missing/1"])
+            self.assertEqual(len(server.requests), 5)
+
+
+    def testFailedChunk(self):
+        failing = ["https://example.com/news/150"]
+        def responder(path, params):
+            if failing[0] in params["articleUrl"]:
+                return (400, {}, "invalid request")
+            return mapperResponder(path, params)
+
+        with StubServer(responder) as server:
+            mapper = ArticleMapper(createEventRegistry(server, maxConcurrentRequests = 3), chunkSize = 100)
+            self.assertRaises(Exception, mapper.getArticleUris, self.urls)
+            # the mappings of the successful chunks are remembered and only the failed chunk is requested again
+            failing[0] = None
+            mappings = mapper.getArticleUris(self.urls)
+            self.assertEqual(mappings["https://example.com/news/249"], "uri-249")
+            self.assertEqual(len(server.requests), 4)
+            self.assertEqual(server.requests[-1][1]["articleUrl"], self.urls[100:200])
+
+
+    def testBoundedMemoryAndFile(self):
+        fileName = os.path.join(self.folder, "mappings.db")
+        with StubServer(mapperResponder) as server:
+            mapper = ArticleMapper(createEventRegistry(server), maxSize = 50, fileName = fileName)
+            mapper.getArticleUris(self.urls)
+            self.assertEqual(mapper.getStats()["memoryCount"], 50)
+            self.assertEqual(mapper.getStats()["fileCount"], 250)
+            mapper.close()
+            requestCount = len(server.requests)
+
+            # a new mapper reads the mappings from the file
+            mapper = ArticleMapper(createEventRegistry(server), maxSize = 50, fileName = fileName)
+            self.assertEqual(mapper.getArticleUri(self.urls[0]), "uri-0")
+            self.assertEqual(mapper.getArticleUris(self.urls)[self.urls[-1]], "uri-249")
+            self.assertEqual(len(server.requests), requestCount)
+            mapper.close()
+
+            # without remembering the mappings every call makes a request
+            mapper = ArticleMapper(createEventRegistry(server), rememberMappings = False)
+            mapper.getArticleUri(self.urls[0])
+            mapper.getArticleUri(self.urls[0])
+            self.assertEqual(len(server.requests), requestCount + 2)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestArticleMapper)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,94 @@
+import unittest, asyncio
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, createEventRegistry
+
+
+class TestAsyncEventRegistry(unittest.TestCase):
+    def testExecQuery(self):
+        async def run(server):
+            async with createEventRegistry(server, AsyncEventRegistry) as er:
+                q = QueryArticles(keywords = "Tesla")
+                return await er.execQuery(q)
+
+        with StubServer(lambda path, params: (200, {"x-ratelimit-remaining": "99"}, {"path": path, "params": params})) as server:
+            res = asyncio.run(run(server))
+        self.assertEqual(res["path"], "/api/v1/article")
+        self.assertEqual(res["params"]["keyword"], "Tesla")
+        self.assertEqual(res["params"]["apiKey"], "testKey")
+
+
+    def testSuggestAndGetUri(self):
+        async def run(server):
+            async with createEventRegistry(server, AsyncEventRegistry) as er:
+                suggestions = await er.suggestConcepts("Obama")
+                uri = await er.getConceptUri("Obama")
+                return suggestions, uri
+
+        with StubServer(lambda path, params: (200, {}, [{"uri": "http://en.wikipedia.org/wiki/" + params["prefix"]}])) as server:
+            suggestions, uri = asyncio.run(run(server))
+        self.assertEqual(len(suggestions), 1)
+        self.assertEqual(uri, "http://en.wikipedia.org/wiki/Obama")
+
+
+    def testAnalytics(self):
+        async def run(server):
+            async with createEventRegistry(server, AsyncEventRegistry) as er:
+                return await Analytics(er).detectLanguage("hello world")
+
+        with StubServer(lambda path, params: (200, {}, {"path": path})) as server:
+            res = asyncio.run(run(server))
+        self.assertEqual(res["path"], "/api/v1/detectLanguage")
+
+
+    def testStopStatusCodeRaises(self):
+        async def run(server):
+            async with createEventRegistry(server, AsyncEventRegistry) as er:
+                await er.jsonRequest("/api/v1/article", {})
+
+        with StubServer(lambda path, params: (400, {}, "invalid parameter")) as server:
+            with self.assertRaises(Exception):
+                asyncio.run(run(server))
+            self.assertEqual(len(server.requests), 1)
+
+
+    def testSyncHelpersAreRejected(self):
+        with StubServer(lambda path, params: (200, {}, {})) as server:
+            er = createEventRegistry(server, AsyncEventRegistry)
+            self.assertRaises(TypeError, QueryArticlesIter(keywords = "Tesla").count, er)
+            self.assertRaises(TypeError, QueryEventsIter(keywords = "Tesla").count, er)
+            self.assertRaises(TypeError, QueryArticlesIter(keywords = "Tesla").execQuery, er)
+            self.assertRaises(TypeError, GetRecentArticles, er)
+            self.assertRaises(TypeError, GetRecentEvents, er)
+            self.assertRaises(TypeError, GetEventForText, er)
+            self.assertRaises(TypeError, DateShardedIter, QueryArticlesIter(keywords = "Tesla", dateStart = "2023-01-01"), er)
+            self.assertRaises(TypeError, TopicPage(er).loadTopicPageFromER, "uri")
+            self.assertEqual(len(server.requests), 0)
+
+
+    def testConcurrentRequests(self):
+        async def run(server):
+            async with createEventRegistry(server, AsyncEventRegistry) as er:
+                return await asyncio.gather(*[er.jsonRequest("/api/v1/article", {"i": i}) for i in range(20)])
+
+        with StubServer(lambda path, params: (200, {}, {"i": params["i"]}), latency = 0.2) as server:
+            results = asyncio.run(run(server))
+        self.assertEqual([r["i"] for r in results], list(range(20)))
+        # requests should overlap rather than be executed one after another
+        self.assertTrue(server.maxInFlight > 1)
+
+
+    def testDefaultIsNotRateLimited(self):
+        async def run(server):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url) as er:
+                self.assertIsNone(er.getRateLimiter())
+                return await asyncio.gather(*[er.jsonRequest("/api/v1/article", {"i": i}) for i in range(10)])
+
+        with StubServer(lambda path, params: (200, {}, {"i": params["i"]}), latency = 0.2) as server:
+            asyncio.run(run(server))
+            # with the previous default (0.5 seconds between requests) the requests were made one after another
+            self.assertTrue(server.maxInFlight > 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestAsyncEventRegistry)
+    unittest.TextTestRunner(verbosity=3).run(suite)
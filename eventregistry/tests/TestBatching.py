@@ -0,0 +1,123 @@
+import unittest, asyncio, threading, time
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, createEventRegistry
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def infoResponder(path, params):
+    uris = params["uri"] if isinstance(params["uri"], list) else [params["uri"]]
+    if "error" in uris:
+        return (200, {}, {"error": "invalid uri"})
+    items = [{"uri": uri, "title": uri.upper(), "path": path} for uri in uris if not uri.startswith("unknown")]
+    if params.get("action") == "getStats":
+        return (200, {}, items)
+    # the entities are returned as a dict (keyed by their ids)
+    return (200, {}, dict((str(i), item) for i, item in enumerate(items)))
+
+
+
+class TestBatching(unittest.TestCase):
+    def testGetMany(self):
+        uris = ["source%d.com" % (i % 120) for i in range(250)] + ["unknown.com"]
+        with StubServer(infoResponder) as server:
+            with InfoLoader(createEventRegistry(server, maxConcurrentRequests = 4), GetSourceInfo, maxBatchSize = 50, batchDelay = 5, cacheSize = 150) as loader:
+                sources = loader.getMany(uris)
+                # two full batches and the rest when the list is complete
+                self.assertEqual(sorted(len(params["uri"]) for path, params in server.requests), [21, 50, 50])
+                self.assertEqual([source["uri"] for source in sources[:250]], uris[:250])
+                self.assertEqual(sources[7]["path"], "/api/v1/source")
+                self.assertEqual(sources[-1], None)
+                # the recently returned entities are cached, the entities that don't exist are not
+                self.assertEqual(loader.get("source119.com")["title"], "SOURCE119.COM")
+                self.assertEqual(loader.getStats()["cachedCount"], 120)
+                self.assertEqual(len(server.requests), 3)
+                self.assertEqual(loader.getMany(["unknown.com"]), [None])
+                self.assertEqual(len(server.requests), 4)
+                # the least recently used entities are removed from the cache
+                loader.getMany(["source%d.com" % i for i in range(120, 170)])
+                self.assertEqual(loader.getStats()["cachedCount"], 150)
+                self.assertEqual(loader.get("source169.com")["uri"], "source169.com")
+                self.assertEqual(len(server.requests), 5)
+
+
+    def testConcurrentCallers(self):
+        with StubServer(infoResponder, latency = 0.05) as server:
+            loader = InfoLoader(createEventRegistry(server, maxConcurrentRequests = 4), GetConceptInfo, returnInfo = ReturnInfo(conceptInfo = ConceptInfoFlags(synonyms = True)), batchDelay = 0.3)
+            results = {}
+            barrier = threading.Barrier(20)
+            def run(i):
+                barrier.wait()
+                results[i] = loader.get("http://en.wikipedia.org/wiki/Concept_%d" % (i % 10))
+            threads = [threading.Thread(target = run, args = (i,)) for i in range(20)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            loader.close()
+            # the individual requests were collected into a single request
+            self.assertEqual(len(server.requests), 1)
+            path, params = server.requests[0]
+            self.assertEqual(path, "/api/v1/concept")
+            self.assertEqual(len(params["uri"]), 10)
+            self.assertTrue(params["includeConceptSynonyms"])
+        self.assertEqual(results[13]["uri"], "http://en.wikipedia.org/wiki/Concept_3")
+
+
+    def testSourceStatsAndErrors(self):
+        with StubServer(infoResponder) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4)
+            loader = InfoLoader(er, GetSourceStats)
+            self.assertEqual([stats["uri"] for stats in loader.getMany(["bbc.co.uk", "cnn.com"])], ["bbc.co.uk", "cnn.com"])
+            self.assertEqual(server.requests[0][1]["action"], "getStats")
+            loader.close()
+
+            loader = InfoLoader(er, GetCategoryInfo)
+            futures = [loader.load("error"), loader.load("news/Business")]
+            loader.close()
+            for future in futures:
+                self.assertRaises(Exception, future.result)
+            self.assertRaises(AssertionError, InfoLoader, er, GetSourceStats, returnInfo = ReturnInfo())
+            self.assertRaises(AssertionError, InfoLoader, er, QueryArticles)
+
+
+    def testClose(self):
+        with StubServer(infoResponder) as server:
+            loader = InfoLoader(createEventRegistry(server, maxConcurrentRequests = 4), GetSourceInfo, batchDelay = 0.2)
+            future = loader.load("bbc.co.uk")
+            loader.close()
+            # the waiting uris are requested when the loader is closed and the scheduled dispatch is cancelled
+            self.assertEqual(future.result(timeout = 5)["uri"], "bbc.co.uk")
+            time.sleep(0.3)
+            self.assertEqual(len(server.requests), 1)
+            self.assertRaises(RuntimeError, loader.load, "cnn.com")
+
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def testAsync(self):
+        async def run(server):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0) as er:
+                self.assertRaises(TypeError, InfoLoader, er)
+                loader = AsyncInfoLoader(er, GetSourceInfo)
+                sources = await asyncio.gather(*[loader.get("source%d.com" % (i % 15)) for i in range(40)])
+                more = await loader.getMany(["source1.com", "source20.com"])
+                async with AsyncInfoLoader(er, GetSourceInfo, batchDelay = 5) as otherLoader:
+                    future = otherLoader.load("source30.com")
+                self.assertEqual(future.result()["uri"], "source30.com")
+                self.assertRaises(RuntimeError, otherLoader.load, "source31.com")
+                return sources, more
+
+        with StubServer(infoResponder) as server:
+            sources, more = asyncio.run(run(server))
+            self.assertEqual([len(params["uri"]) for path, params in server.requests], [15, 1, 1])
+        self.assertEqual(sources[17]["uri"], "source2.com")
+        self.assertEqual([source["uri"] for source in more], ["source1.com", "source20.com"])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestBatching)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,212 @@
+import unittest, os, time, json, zlib, datetime, tempfile, shutil, asyncio, sqlite3
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.folder, "cache.sqlite")
+
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+
+    def testKeyIsCanonical(self):
+        key = ResponseCache.getKey("/api/v1/article", {"keyword": "Tesla", "lang": "eng", "apiKey": "a"})
+        # order of the parameters and the api key don't matter
+        self.assertEqual(key, ResponseCache.getKey("/api/v1/article", {"apiKey": "b", "lang": "eng", "keyword": "Tesla"}))
+        self.assertNotEqual(key, ResponseCache.getKey("/api/v1/event", {"keyword": "Tesla", "lang": "eng"}))
+        self.assertNotEqual(key, ResponseCache.getKey("/api/v1/article", {"keyword": "Tesla", "lang": "deu"}))
+        hostKey = ResponseCache.getKey("/api/v1/article", {"keyword": "Tesla", "lang": "eng"}, host = "https://eventregistry.org")
+        self.assertEqual(hostKey, ResponseCache.getKey("/api/v1/article", {"keyword": "Tesla", "lang": "eng"}, host = "https://eventregistry.org/"))
+        self.assertNotEqual(hostKey, key)
+        self.assertNotEqual(hostKey, ResponseCache.getKey("/api/v1/article", {"keyword": "Tesla", "lang": "eng"}, host = "http://localhost:8090"))
+
+
+    def testGetSetAndStats(self):
+        cache = ResponseCache(self.fileName)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", {"articles": {"results": [{"uri": "1"}] * 100}})
+        self.assertEqual(cache.get("a")["articles"]["results"][0]["uri"], "1")
+        stats = cache.getStats()
+        self.assertEqual(stats["hitCount"], 1)
+        self.assertEqual(stats["missCount"], 1)
+        self.assertEqual(stats["entryCount"], 1)
+        # responses are compressed
+        self.assertTrue(0 < stats["bytesRead"] < stats["uncompressedBytesRead"])
+        cache.close()
+        # the cache is persisted on disk
+        cache = ResponseCache(self.fileName)
+        self.assertIsNotNone(cache.get("a"))
+        cache.close()
+
+
+    def testJsonCodec(self):
+        class CountingCodec(JsonCodec):
+            def __init__(self):
+                self.counts = [0, 0]
+
+            def encode(self, obj):
+                self.counts[0] += 1
+                return JsonCodec.encode(self, obj)
+
+            def decode(self, data):
+                self.counts[1] += 1
+                return JsonCodec.decode(self, data)
+
+        codec = CountingCodec()
+        cache = ResponseCache(self.fileName, jsonCodec = codec)
+        cache.set("a", {"title": "Škoda"})
+        self.assertEqual(cache.get("a"), {"title": "Škoda"})
+        self.assertEqual(codec.counts, [1, 1])
+
+
+    def testTtl(self):
+        cache = ResponseCache(self.fileName, ttl = 0.2)
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2}, ttl = None)
+        time.sleep(0.3)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), {"v": 2})
+        self.assertEqual(cache.getStats()["expiredCount"], 1)
+
+
+    def testLruEviction(self):
+        value = {"v": os.urandom(2000).hex()}
+        entrySize = len(zlib.compress(json.dumps(value, separators = (",", ":")).encode("utf-8"), 1))
+        # room for three entries
+        cache = ResponseCache(self.fileName, maxSize = entrySize * 3 + 10, compressionLevel = 1)
+        for i in range(3):
+            cache.set(str(i), value)
+            time.sleep(0.01)
+        # use the first entry so that the second one is the least recently used
+        self.assertIsNotNone(cache.get("0"))
+        time.sleep(0.01)
+        cache.set("3", value)
+        self.assertIsNone(cache.get("1"))
+        self.assertIsNotNone(cache.get("0"))
+        self.assertIsNotNone(cache.get("3"))
+        stats = cache.getStats()
+        self.assertTrue(stats["evictionCount"] >= 1)
+        self.assertEqual(stats["entryCount"], 3)
+
+
+    def testTotalSizeIsMaintained(self):
+        def getSize():
+            return cache._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        # a cache file created without the table with the total size
+        conn = sqlite3.connect(self.fileName)
+        conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, " +
+                     "createdAt REAL NOT NULL, expiresAt REAL, lastAccess REAL NOT NULL)")
+        conn.execute("INSERT INTO responses VALUES ('old', x'00', 123, 0, NULL, 0)")
+        conn.commit()
+        conn.close()
+        cache = ResponseCache(self.fileName, maxSize = 20000, compressionLevel = 1)
+        self.assertEqual(cache.getStats()["size"], 123)
+        for i in range(30):
+            cache.set(str(i % 12), {"v": os.urandom(300 * (i % 5 + 1)).hex()})
+            self.assertEqual(cache.getStats()["size"], getSize())
+        cache.delete("3")
+        self.assertEqual(cache.getStats()["size"], getSize())
+        self.assertTrue(getSize() <= 20000)
+        cache.clear()
+        self.assertEqual(cache.getStats()["size"], 0)
+
+
+    def testExecQueryUsesCache(self):
+        with StubServer(lambda path, params: (200, {}, {"articles": {"results": [], "keyword": params["keyword"]}})) as server:
+            cache = ResponseCache(self.fileName)
+            er = EventRegistry(apiKey = "key1", host = server.url, minDelayBetweenRequests = 0, responseCache = cache)
+            self.assertEqual(er.execQuery(QueryArticles(keywords = "Tesla"))["articles"]["keyword"], "Tesla")
+            self.assertEqual(er.execQuery(QueryArticles(keywords = "Tesla"))["articles"]["keyword"], "Tesla")
+            self.assertEqual(len(server.requests), 1)
+            # a different api key uses the same cached responses
+            er2 = EventRegistry(apiKey = "key2", host = server.url, minDelayBetweenRequests = 0, responseCache = cache)
+            er2.execQuery(QueryArticles(keywords = "Tesla"))
+            self.assertEqual(len(server.requests), 1)
+            # different parameters or archive setting result in a new request
+            er.execQuery(QueryArticles(keywords = "Musk"))
+            er.execQuery(QueryArticles(keywords = "Tesla"), allowUseOfArchive = False)
+            self.assertEqual(len(server.requests), 3)
+            self.assertEqual(cache.getStats()["hitCount"], 2)
+
+
+    def testHostIsPartOfKey(self):
+        cache = ResponseCache(self.fileName)
+        with StubServer(lambda path, params: (200, {}, {"server": 1})) as server1, StubServer(lambda path, params: (200, {}, {"server": 2})) as server2:
+            er1 = EventRegistry(apiKey = "key", host = server1.url, minDelayBetweenRequests = 0, responseCache = cache)
+            er2 = EventRegistry(apiKey = "key", host = server2.url, minDelayBetweenRequests = 0, responseCache = cache)
+            self.assertEqual(er1.execQuery(QueryArticles(keywords = "Tesla"))["server"], 1)
+            self.assertEqual(er2.execQuery(QueryArticles(keywords = "Tesla"))["server"], 2)
+            self.assertEqual(er1.execQuery(QueryArticles(keywords = "Tesla"))["server"], 1)
+            self.assertEqual((len(server1.requests), len(server2.requests)), (1, 1))
+        cache.close()
+
+
+    def testErrorsAreNotCached(self):
+        with StubServer(lambda path, params: (200, {}, {"error": "invalid query"})) as server:
+            er = EventRegistry(apiKey = "key", host = server.url, minDelayBetweenRequests = 0, responseCache = ResponseCache(self.fileName))
+            er.execQuery(QueryArticles(keywords = "Tesla"))
+            er.execQuery(QueryArticles(keywords = "Tesla"))
+            self.assertEqual(len(server.requests), 2)
+
+
+    def testAsyncExecQueryUsesCache(self):
+        async def run(server):
+            async with AsyncEventRegistry(apiKey = "key", host = server.url, minDelayBetweenRequests = 0, responseCache = ResponseCache(self.fileName)) as er:
+                await er.execQuery(QueryArticles(keywords = "Tesla"))
+                return await er.execQuery(QueryArticles(keywords = "Tesla"))
+
+        with StubServer(lambda path, params: (200, {}, {"articles": {"results": []}})) as server:
+            self.assertEqual(asyncio.run(run(server)), {"articles": {"results": []}})
+            self.assertEqual(len(server.requests), 1)
+
+
+    def testQueryDateRange(self):
+        q = QueryArticles(keywords = "Tesla", dateStart = "2023-01-01", dateEnd = "2023-01-31")
+        self.assertEqual(getQueryDateRange(q._getQueryParams()), ("2023-01-01", "2023-01-31"))
+        self.assertEqual(getQueryDateRange(QueryArticles(keywords = "Tesla")._getQueryParams()), (None, None))
+        # dates in the complex query. The items of $and narrow the range, the items of $or extend it
+        cq = ComplexArticleQuery(CombinedQuery.AND([
+            BaseQuery(keyword = "Tesla", dateStart = "2023-01-01", dateEnd = "2023-03-01"),
+            BaseQuery(dateEnd = "2023-02-01")]))
+        self.assertEqual(getQueryDateRange(QueryArticles.initWithComplexQuery(cq)._getQueryParams()), ("2023-01-01", "2023-02-01"))
+        cq = ComplexArticleQuery(CombinedQuery.OR([
+            BaseQuery(keyword = "Tesla", dateStart = "2023-01-01", dateEnd = "2023-03-01"),
+            BaseQuery(keyword = "Musk", dateStart = "2023-02-01")]))
+        self.assertEqual(getQueryDateRange(QueryArticles.initWithComplexQuery(cq)._getQueryParams()), ("2023-01-01", None))
+
+
+    def testDateAwarePolicy(self):
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        policy = DateAwareCachePolicy(historicalAfterDays = 2, recentTtl = 600, liveTtl = 0)
+        def getTtl(query):
+            return policy.getTtl(query._getPath(), query._getQueryParams())
+        self.assertIsNone(getTtl(QueryArticles(keywords = "Tesla", dateEnd = today - datetime.timedelta(days = 30))))
+        self.assertEqual(getTtl(QueryArticles(keywords = "Tesla", dateEnd = today - datetime.timedelta(days = 1))), 600)
+        self.assertEqual(getTtl(QueryArticles(keywords = "Tesla", dateEnd = today)), CachePolicy.NO_CACHE)
+        self.assertEqual(getTtl(QueryArticles(keywords = "Tesla")), CachePolicy.NO_CACHE)
+        self.assertEqual(getTtl(GetTopSharedArticles(date = today - datetime.timedelta(days = 10))), CachePolicy.NEVER_EXPIRE)
+        historical = ComplexArticleQuery(BaseQuery(keyword = "Tesla", dateEnd = today - datetime.timedelta(days = 10)))
+        self.assertIsNone(getTtl(QueryArticles.initWithComplexQuery(historical)))
+
+
+    def testExecQueryUsesPolicy(self):
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        with StubServer(lambda path, params: (200, {}, {"articles": {"results": []}})) as server:
+            cache = ResponseCache(self.fileName, policy = DateAwareCachePolicy())
+            er = EventRegistry(apiKey = "key", host = server.url, minDelayBetweenRequests = 0, responseCache = cache)
+            for i in range(2):
+                er.execQuery(QueryArticles(keywords = "Tesla", dateEnd = "2020-01-01"))
+                er.execQuery(QueryArticles(keywords = "Tesla", dateEnd = today))
+            # only the historical query was cached
+            self.assertEqual(len(server.requests), 3)
+            self.assertEqual(cache.getStats()["entryCount"], 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestCache)
+    unittest.TextTestRunner(verbosity=3).run(suite)
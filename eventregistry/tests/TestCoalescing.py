@@ -0,0 +1,147 @@
+import unittest, asyncio, threading, time
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, createEventRegistry
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class TestCoalescing(unittest.TestCase):
+    def runInThreads(self, fn, count = 10):
+        results = [None] * count
+        barrier = threading.Barrier(count)
+        def run(i):
+            barrier.wait()
+            results[i] = fn()
+        threads = [threading.Thread(target = run, args = (i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+
+    def testConcurrentIdenticalRequests(self):
+        responder = lambda path, params: (200, {"x-ratelimit-remaining": "77"}, [{"uri": "http://en.wikipedia.org/wiki/" + params["prefix"]}])
+        with StubServer(responder, latency = 0.3) as server:
+            coalescer = RequestCoalescer()
+            er = createEventRegistry(server, maxConcurrentRequests = 10, requestCoalescer = coalescer)
+            results = self.runInThreads(lambda: (er.suggestConcepts("Obama"), er.getLastHeader("x-ratelimit-remaining")))
+            self.assertEqual(len(server.requests), 1)
+            self.assertTrue(all(res == results[0] for res in results))
+            self.assertEqual(results[0][1], "77")
+            self.assertEqual(coalescer.getStats()["coalescedCount"], 9)
+            self.assertEqual(coalescer.getStats()["inFlightCount"], 0)
+
+            # different parameters are not coalesced and without the memo time the next call makes a new request
+            self.runInThreads(lambda: er.suggestConcepts("Obama", lang = "deu"), count = 3)
+            self.assertEqual(len(server.requests), 2)
+            er.suggestConcepts("Obama")
+            self.assertEqual(len(server.requests), 3)
+
+
+    def testMemoTime(self):
+        counter = [0]
+        def responder(path, params):
+            counter[0] += 1
+            return (200, {}, {"keyword": params.get("keyword"), "count": counter[0]} if params.get("keyword") != "error" else {"error": "invalid query"})
+
+        with StubServer(responder) as server:
+            coalescer = RequestCoalescer(memoTime = 0.5)
+            er = createEventRegistry(server, maxConcurrentRequests = 10, requestCoalescer = coalescer)
+            first = er.execQuery(QueryArticles(keywords = "Tesla"))
+            self.assertEqual(er.execQuery(QueryArticles(keywords = "Tesla")), first)
+            self.assertEqual(er.jsonRequest("/api/v1/article", QueryArticles(keywords = "Tesla")._getQueryParams()), first)
+            self.assertEqual(len(server.requests), 1)
+            self.assertEqual(coalescer.getStats()["memoHitCount"], 2)
+            # the raw responses and the errors are not remembered
+            er.jsonRequestRaw("/api/v1/article", {"keyword": "Tesla"})
+            er.jsonRequestRaw("/api/v1/article", {"keyword": "Tesla"})
+            er.execQuery(QueryArticles(keywords = "error"))
+            er.execQuery(QueryArticles(keywords = "error"))
+            self.assertEqual(len(server.requests), 5)
+            time.sleep(0.6)
+            self.assertEqual(er.execQuery(QueryArticles(keywords = "Tesla"))["count"], 6)
+
+
+    def testSharedCoalescer(self):
+        responder = lambda path, params: (200, {}, {"apiKey": params.get("apiKey"), "results": [1, 2]})
+        with StubServer(responder, latency = 0.2) as server, StubServer(responder, latency = 0.2) as otherServer:
+            coalescer = RequestCoalescer(memoTime = 10)
+            ers = [createEventRegistry(server, maxConcurrentRequests = 10, requestCoalescer = coalescer), createEventRegistry(otherServer, maxConcurrentRequests = 10, requestCoalescer = coalescer),
+                   createEventRegistry(server, apiKey = "otherKey", requestCoalescer = coalescer)]
+            results = self.runInThreads(lambda: [er.execQuery(QueryArticles(keywords = "Tesla")) for er in ers], count = 5)
+            # the requests of different hosts and different users are not coalesced
+            self.assertEqual(len(server.requests), 2)
+            self.assertEqual(len(otherServer.requests), 1)
+            self.assertEqual([res["apiKey"] for res in results[0]], ["testKey", "testKey", "otherKey"])
+            # each caller receives its own copy of the response
+            results[0][0]["results"].append(3)
+            self.assertEqual(results[1][0]["results"], [1, 2])
+            self.assertEqual(ers[0].execQuery(QueryArticles(keywords = "Tesla"))["results"], [1, 2])
+            # the requests that are not read-only are always sent
+            self.runInThreads(lambda: ers[0].jsonRequest("/api/v1/trainTopic", {"action": "addText", "text": "Tesla"}), count = 3)
+            self.assertEqual(len(server.requests), 5)
+
+
+    def testExceptionIsShared(self):
+        coalescer = RequestCoalescer(memoTime = 10)
+        calls = []
+        def fail():
+            calls.append(1)
+            time.sleep(0.2)
+            raise ValueError("request failed")
+
+        def run():
+            try:
+                return coalescer.do("key", fail)
+            except ValueError as ex:
+                return ex
+        results = self.runInThreads(run, count = 5)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(res, ValueError) for res in results))
+        # the failure is not remembered
+        self.assertEqual(coalescer.do("key", lambda: 5), 5)
+
+
+    def testAbandonedAsyncRequestIsRepeated(self):
+        coalescer = RequestCoalescer()
+        calls = []
+        async def request():
+            calls.append(1)
+            await asyncio.sleep(0.2)
+            return len(calls)
+
+        async def run():
+            leader = asyncio.ensure_future(coalescer.doAsync("key", request))
+            await asyncio.sleep(0.05)
+            follower = asyncio.ensure_future(coalescer.doAsync("key", request))
+            await asyncio.sleep(0.05)
+            leader.cancel()
+            # the follower is not cancelled with the leader - it makes the request itself
+            return await follower
+
+        self.assertEqual(asyncio.run(run()), 2)
+        self.assertEqual(coalescer.getStats()["inFlightCount"], 0)
+
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def testAsyncEventRegistry(self):
+        async def run(server, coalescer):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, requestCoalescer = coalescer) as er:
+                return await asyncio.gather(*[er.execQuery(QueryArticles(keywords = "Tesla")) for _ in range(10)])
+
+        with StubServer(lambda path, params: (200, {}, {"keyword": params.get("keyword")}), latency = 0.2) as server:
+            coalescer = RequestCoalescer()
+            results = asyncio.run(run(server, coalescer))
+            self.assertEqual(len(server.requests), 1)
+        self.assertTrue(all(res == {"keyword": "Tesla"} for res in results))
+        self.assertEqual(coalescer.getStats()["coalescedCount"], 9)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestCoalescing)
+    unittest.TextTestRunner(verbosity=3).run(suite)
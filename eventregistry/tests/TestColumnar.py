@@ -0,0 +1,48 @@
+import unittest
+from eventregistry import *
+
+try:
+    import numpy, pyarrow
+except ImportError:
+    numpy = pyarrow = None
+
+
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            {"uri": "1", "date": "2023-06-01", "time": "10:00:00", "lang": "eng", "source": {"uri": "bbc.co.uk"}, "sentiment": 0.2, "shares": {"facebook": 10}, "eventUri": "eng-1"},
+            {"uri": "2", "date": "2023-06-02", "time": "11:00:00", "lang": "deu", "source": {"uri": "spiegel.de"}, "sentiment": None, "shares": {}, "eventUri": None},
+        ]
+
+
+    def testColumns(self):
+        columns = getColumns(self.articles)
+        self.assertEqual(columns["uri"], ["1", "2"])
+        self.assertEqual(columns["sourceUri"], ["bbc.co.uk", "spiegel.de"])
+        self.assertEqual(columns["shares"], [10, None])
+        self.assertEqual(getColumns(self.articles, ["source.uri", ("fb", "shares.facebook", "int")]), {"source.uri": ["bbc.co.uk", "spiegel.de"], "fb": [10, None]})
+
+
+    @unittest.skipIf(numpy is None, "numpy and pyarrow are not installed")
+    def testNumpy(self):
+        arrays = toNumpyColumns(self.articles)
+        self.assertEqual(arrays["sentiment"].dtype, numpy.float64)
+        self.assertTrue(numpy.isnan(arrays["sentiment"][1]))
+        # int columns with missing values are converted to floats
+        self.assertEqual(arrays["shares"].dtype, numpy.float64)
+        self.assertEqual(list(arrays["lang"]), ["eng", "deu"])
+
+
+    @unittest.skipIf(pyarrow is None, "numpy and pyarrow are not installed")
+    def testArrow(self):
+        batch = toArrowBatch(self.articles)
+        self.assertEqual(batch.num_rows, 2)
+        self.assertEqual(batch.schema.field("shares").type, pyarrow.int64())
+        self.assertEqual(batch.column("shares").to_pylist(), [10, None])
+        self.assertEqual(batch.column("eventUri").to_pylist(), ["eng-1", None])
+        self.assertEqual(toColumnar(self.articles, "arrow").schema, getArrowSchema(ARTICLE_COLUMNS))
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestColumnar)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,100 @@
+import unittest, threading, time, asyncio
+from concurrent.futures import ThreadPoolExecutor
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer
+
+
+class TestConcurrency(unittest.TestCase):
+    def testAdditiveIncrease(self):
+        ctrl = AdaptiveConcurrencyController(minLimit = 1, maxLimit = 4)
+        for _ in range(20):
+            # simulate fully used limit
+            ctrl._inFlight = ctrl.getLimit() - 1
+            ctrl.recordResult(0.1, 200)
+        ctrl._inFlight = 0
+        self.assertEqual(ctrl.getLimit(), 4)
+
+
+    def testNoIncreaseWhenLimitIsNotUsed(self):
+        ctrl = AdaptiveConcurrencyController(minLimit = 1, maxLimit = 10, initialLimit = 3)
+        for _ in range(30):
+            ctrl.recordResult(0.1, 200)
+        self.assertEqual(ctrl.getLimit(), 3)
+
+
+    def testMultiplicativeDecreaseOncePerWindow(self):
+        ctrl = AdaptiveConcurrencyController(minLimit = 1, maxLimit = 32, initialLimit = 16)
+        ctrl.recordResult(0.1, 503)
+        self.assertEqual(ctrl.getLimit(), 8)
+        # requests that were in flight when the first error happened should not cause additional cuts
+        ctrl.recordResult(0.1, 429)
+        ctrl.recordResult(5, None)
+        self.assertEqual(ctrl.getLimit(), 8)
+        # errors that don't indicate overload don't change the limit
+        ctrl = AdaptiveConcurrencyController(minLimit = 1, maxLimit = 32, initialLimit = 16)
+        ctrl.recordResult(0.1, 400)
+        self.assertEqual(ctrl.getLimit(), 16)
+
+
+    def testLatencyThreshold(self):
+        ctrl = AdaptiveConcurrencyController(minLimit = 1, maxLimit = 32, initialLimit = 4, latencyThreshold = 1)
+        for _ in range(4):
+            ctrl.recordResult(2.0, 200)
+        self.assertEqual(ctrl.getLimit(), 2)
+
+
+    def testLowBudget(self):
+        ctrl = AdaptiveConcurrencyController(minLimit = 1, maxLimit = 20, initialLimit = 20, lowBudgetFraction = 0.1, reservedRequests = 100)
+        ctrl.recordResult(0.1, 200, {"x-ratelimit-limit": "10000", "x-ratelimit-remaining": "5000"})
+        self.assertEqual(ctrl.getLimit(), 20)
+        ctrl.recordResult(0.1, 200, {"x-ratelimit-limit": "10000", "x-ratelimit-remaining": "500"})
+        self.assertEqual(ctrl.getLimit(), 10)
+        ctrl.recordResult(0.1, 200, {"x-ratelimit-limit": "10000", "x-ratelimit-remaining": "100"})
+        self.assertEqual(ctrl.getLimit(), 1)
+
+
+    def testEventRegistryRampsUp(self):
+        ctrl = AdaptiveConcurrencyController(minLimit = 1, maxLimit = 8)
+        with StubServer(lambda path, params: (200, {}, {}), latency = 0.02) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, concurrencyController = ctrl)
+            with ThreadPoolExecutor(16) as pool:
+                list(pool.map(lambda i: er.jsonRequest("/api/v1/article", {}), range(200)))
+        self.assertEqual(ctrl.getLimit(), 8)
+        self.assertTrue(server.maxInFlight <= 8)
+        self.assertTrue(server.maxInFlight > 1)
+        self.assertIs(er.getConcurrencyController(), ctrl)
+
+
+    def testAsyncLimit(self):
+        ctrl = ConcurrencyController(3)
+
+        async def run(server):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, concurrencyController = ctrl) as er:
+                await asyncio.gather(*[er.jsonRequest("/api/v1/article", {}) for _ in range(12)])
+
+        with StubServer(lambda path, params: (200, {}, {}), latency = 0.05) as server:
+            asyncio.run(run(server))
+        self.assertEqual(server.maxInFlight, 3)
+        self.assertEqual(ctrl.getInFlight(), 0)
+
+
+    def testCancelledWaiterPassesSlotOn(self):
+        ctrl = ConcurrencyController(1)
+
+        async def run():
+            ctrl.acquire()
+            first = asyncio.ensure_future(ctrl.acquireAsync())
+            second = asyncio.ensure_future(ctrl.acquireAsync())
+            await asyncio.sleep(0.05)
+            # the first waiter is chosen for the free slot, but it is cancelled before it is woken
+            ctrl.release()
+            first.cancel()
+            await asyncio.wait_for(second, timeout = 1)
+            ctrl.release()
+
+        asyncio.run(run())
+        self.assertEqual(ctrl.getInFlight(), 0)
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestConcurrency)
+    unittest.TextTestRunner(verbosity=3).run(suite)
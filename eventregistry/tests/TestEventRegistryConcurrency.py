@@ -0,0 +1,81 @@
+import unittest, threading, gc, weakref
+from concurrent.futures import ThreadPoolExecutor
+from eventregistry import *
+from eventregistry.EventRegistry import _requestStates
+from eventregistry.tests.StubServer import StubServer
+
+
+def echoResponder(path, params):
+    # return the id of the caller in the headers so that we can check that each thread sees its own headers
+    return (200, {"req-caller": params.get("caller"), "x-ratelimit-remaining": params.get("caller")}, {"caller": params.get("caller")})
+
+
+class TestEventRegistryConcurrency(unittest.TestCase):
+    def testRequestsOverlap(self):
+        with StubServer(echoResponder, latency = 0.2) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, maxConcurrentRequests = 8)
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(lambda i: er.jsonRequest("/api/v1/article", {"caller": i}), range(16)))
+        self.assertEqual([r["caller"] for r in results], list(range(16)))
+        # the requests overlap, but no more than maxConcurrentRequests are in flight
+        self.assertTrue(1 < server.maxInFlight <= 8)
+
+
+    def testDefaultIsOneRequestAtATime(self):
+        with StubServer(echoResponder, latency = 0.05) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0)
+            with ThreadPoolExecutor(4) as pool:
+                list(pool.map(lambda i: er.jsonRequest("/api/v1/article", {"caller": i}), range(8)))
+        self.assertEqual(server.maxInFlight, 1)
+
+
+    def testHeadersArePerThread(self):
+        errors = []
+        with StubServer(echoResponder, latency = 0.01) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, maxConcurrentRequests = 8)
+
+            def worker(caller):
+                for _ in range(10):
+                    er.jsonRequest("/api/v1/article", {"caller": caller})
+                    if er.getLastHeader("req-caller") != str(caller) or er.getRemainingAvailableRequests() != caller:
+                        errors.append(caller)
+
+            threads = [threading.Thread(target = worker, args = (i,)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(errors, [])
+
+
+    def testLastExceptionIsPerThread(self):
+        with StubServer(lambda path, params: (400, {}, "invalid parameter")) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0)
+            self.assertRaises(Exception, er.jsonRequest, "/api/v1/article", {})
+            self.assertIsNotNone(er.getLastException())
+            otherThreadException = []
+            t = threading.Thread(target = lambda: otherThreadException.append(er.getLastException()))
+            t.start()
+            t.join()
+            self.assertEqual(otherThreadException, [None])
+
+
+    def testRequestStateIsReleased(self):
+        gc.collect()
+        stateCount = len(_requestStates.get() or {})
+        with StubServer(echoResponder) as server:
+            ers = [EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0) for _ in range(3)]
+            for i, er in enumerate(ers):
+                er.jsonRequest("/api/v1/article", {"caller": i})
+            self.assertEqual([er.getLastHeader("req-caller") for er in ers], ["0", "1", "2"])
+            refs = [weakref.ref(er) for er in ers]
+            del ers, er
+            gc.collect()
+        # the states of the instances are not kept after the instances are removed
+        self.assertEqual([ref() for ref in refs], [None] * 3)
+        self.assertTrue(len(_requestStates.get()) <= stateCount)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestEventRegistryConcurrency)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,92 @@
+import unittest, os, gzip, json, tempfile, shutil
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, PagedResponder
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.articles = [{"uri": str(i), "lang": "eng", "source": {"uri": "bbc.co.uk"}, "sentiment": i / 100.0} for i in range(250)]
+
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+
+    def readNdjson(self, fileNames, open = gzip.open):
+        items = []
+        for fileName in fileNames:
+            with open(fileName, "rt", encoding = "utf-8") as f:
+                items.extend(json.loads(line) for line in f)
+        return items
+
+
+    def testNdjsonRotation(self):
+        pattern = os.path.join(self.folder, "articles-{part:03d}.ndjson.gz")
+        with NdjsonExporter(pattern, maxItemsPerFile = 100) as exporter:
+            self.assertEqual(exporter.writeAll(iter(self.articles), batchSize = 30), 250)
+        self.assertEqual([os.path.basename(name) for name in exporter.getFileNames()], ["articles-000.ndjson.gz", "articles-001.ndjson.gz", "articles-002.ndjson.gz"])
+        self.assertEqual(self.readNdjson(exporter.getFileNames()[:1]), self.articles[:100])
+        self.assertEqual(self.readNdjson(exporter.getFileNames()), self.articles)
+
+        # rotation by size (uncompressed) happens after the batch that exceeded the limit
+        with NdjsonExporter(pattern, compression = None, maxBytesPerFile = 1000) as exporter:
+            exporter.writeAll(self.articles, batchSize = 10)
+        self.assertTrue(len(exporter.getFileNames()) > 5)
+        self.assertEqual(self.readNdjson(exporter.getFileNames(), open = open), self.articles)
+
+        # a single file can't be rotated
+        exporter = NdjsonExporter(os.path.join(self.folder, "articles.ndjson"), compression = None, maxItemsPerFile = 100)
+        self.assertRaises(ValueError, exporter.write, self.articles)
+
+
+    def testNdjsonColumnsAndIterators(self):
+        fileName = os.path.join(self.folder, "articles.ndjson.gz")
+        with StubServer(PagedResponder(250)) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0)
+            with NdjsonExporter(fileName, columns = ["uri", ("source", "source.uri", "str")]) as exporter:
+                self.assertEqual(exporter.writeAll(QueryArticlesIter(keywords = "Tesla").execQuery(er)), 250)
+        items = self.readNdjson([fileName])
+        self.assertEqual([item["uri"] for item in items], [str(i) for i in range(250)])
+        self.assertEqual(set(items[0].keys()), set(["uri", "source"]))
+
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def testZstd(self):
+        fileName = os.path.join(self.folder, "articles.ndjson.zst")
+        with NdjsonExporter(fileName, compression = "zstd") as exporter:
+            exporter.write(self.articles)
+        with open(fileName, "rb") as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f).read()
+        self.assertEqual([json.loads(line) for line in data.decode("utf-8").splitlines()], self.articles)
+
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def testParquet(self):
+        pattern = os.path.join(self.folder, "articles-{part}.parquet")
+        with ParquetExporter(pattern, columns = [("uri", "uri", "str"), ("sourceUri", "source.uri", "str"), ("sentiment", "sentiment", "float")],
+                             rowGroupSize = 64, maxItemsPerFile = 200) as exporter:
+            exporter.writeAll(self.articles, batchSize = 100)
+        self.assertEqual(len(exporter.getFileNames()), 2)
+        first = pyarrow.parquet.ParquetFile(exporter.getFileNames()[0])
+        self.assertEqual(first.metadata.num_rows, 200)
+        self.assertEqual(first.metadata.num_row_groups, 4)
+        table = pyarrow.parquet.read_table(exporter.getFileNames()[1])
+        self.assertEqual(table.column("uri").to_pylist(), [str(i) for i in range(200, 250)])
+        self.assertEqual(table.column("sourceUri").to_pylist()[0], "bbc.co.uk")
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestExport)
+    unittest.TextTestRunner(verbosity=3).run(suite)
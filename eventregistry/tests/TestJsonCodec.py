@@ -0,0 +1,92 @@
+import unittest, json, asyncio
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class TestJsonCodec(unittest.TestCase):
+    def getCodecs(self):
+        codecs = [JsonCodec()]
+        if orjson is not None:
+            codecs.append(OrjsonCodec())
+        if ujson is not None:
+            codecs.append(UjsonCodec())
+        return codecs
+
+
+    def testRoundTrip(self):
+        obj = {"title": "Škoda / Citroën", "uris": ["http://en.wikipedia.org/wiki/Tesla"], "count": 3, "sim": 0.5, "dup": False, "empty": None}
+        for codec in self.getCodecs():
+            data = codec.encode(obj)
+            self.assertTrue(isinstance(data, bytes), codec.name)
+            self.assertEqual(json.loads(data), obj, codec.name)
+            self.assertEqual(codec.decode(data), obj, codec.name)
+            self.assertEqual(codec.decode(data.decode("utf-8")), obj, codec.name)
+            self.assertEqual(json.loads(codec.encodeText(obj)), obj, codec.name)
+
+
+    def testDefaultCodec(self):
+        codec = getDefaultJsonCodec()
+        self.assertEqual(codec.name, "orjson-decode" if orjson is not None else "json")
+        self.assertEqual(EventRegistry(apiKey = "testKey", minDelayBetweenRequests = 0).getJsonCodec().name, codec.name)
+        # the data is encoded with the json module regardless of the installed packages
+        obj = {1: "a", "sim": 0.1 + 0.2}
+        self.assertEqual(codec.encode(obj), JsonCodec().encode(obj))
+
+
+    def testRequests(self):
+        with StubServer(lambda path, params: (200, {}, {"params": params, "title": "Citroën"})) as server:
+            for codec in self.getCodecs():
+                er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, jsonCodec = codec)
+                self.assertTrue(er.getJsonCodec() is codec)
+                res = er.execQuery(QueryArticles(keywords = "Škoda"))
+                self.assertEqual(res["params"]["keyword"], "Škoda", codec.name)
+                self.assertEqual(res["title"], "Citroën", codec.name)
+
+                raw = er.jsonRequestRaw("/api/v1/article", {"keyword": "Tesla"})
+                self.assertTrue(isinstance(raw, bytes))
+                self.assertEqual(json.loads(raw)["params"]["keyword"], "Tesla")
+
+
+    def testTopicPageIsEncodedWithCodec(self):
+        with StubServer(lambda path, params: (200, {}, {"params": params})) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, jsonCodec = JsonCodec())
+            topic = TopicPage(er)
+            topic.addKeyword("Tesla", 50)
+            res = topic.getArticles()
+        self.assertEqual(json.loads(res["params"]["topicPage"]), topic.topicPage)
+
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def testAsyncRequests(self):
+        async def run(server, codec):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, jsonCodec = codec) as er:
+                res = await er.execQuery(QueryArticles(keywords = "Škoda"))
+                raw = await er.jsonRequestRaw("/api/v1/article", {"keyword": "Tesla"})
+                return res, raw
+
+        with StubServer(lambda path, params: (200, {}, {"params": params})) as server:
+            for codec in self.getCodecs():
+                res, raw = asyncio.run(run(server, codec))
+                self.assertEqual(res["params"]["keyword"], "Škoda", codec.name)
+                self.assertEqual(json.loads(raw)["params"]["keyword"], "Tesla", codec.name)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestJsonCodec)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,116 @@
+import unittest, json, asyncio, tempfile, shutil, os
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class TestLazyResponse(unittest.TestCase):
+    def createResponse(self):
+        return {
+            "articles": {"results": [{"uri": "1", "title": "braces } ] { [ and \"quotes\" in a string", "body": "a\\", "lang": "slv"},
+                                     {"uri": "2", "title": "Škoda č", "concepts": [], "source": {}}], "page": 1, "pages": 3},
+            "conceptAggr": {"results": [{"uri": "http://en.wikipedia.org/wiki/Tesla", "score": 12.5}]},
+            "timeAggr": {"results": [{"date": "2023-06-01", "count": 3}]},
+            "total": 12, "sim": -0.25, "label": "text, with } bracket", "flag": True, "empty": None, "list": []
+        }
+
+
+    def testSections(self):
+        obj = self.createResponse()
+        for data in [json.dumps(obj), json.dumps(obj, indent = 4, ensure_ascii = False), json.dumps(obj, separators = (",", ":"))]:
+            res = LazyResponse(data.encode("utf-8"), JsonCodec())
+            self.assertEqual(list(res), list(obj))
+            self.assertTrue("timeAggr" in res)
+            self.assertFalse("eventInfo" in res)
+            self.assertFalse(any(res.isDecoded(key) for key in obj))
+            self.assertEqual(res["conceptAggr"], obj["conceptAggr"])
+            self.assertTrue(res.isDecoded("conceptAggr"))
+            self.assertFalse(res.isDecoded("articles"))
+            self.assertEqual(json.loads(res.getRaw("articles")), obj["articles"])
+            self.assertEqual(res.get("eventInfo", 5), 5)
+            self.assertEqual(res.toDict(), obj)
+            # all the sections are decoded, so the body is released
+            self.assertEqual(json.loads(res.getData()), obj)
+        self.assertEqual(len(LazyResponse(b" { } ", JsonCodec())), 0)
+
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def testFastCodecDecodesEverything(self):
+        obj = self.createResponse()
+        res = LazyResponse(json.dumps(obj).encode("utf-8"), OrjsonCodec())
+        self.assertTrue(all(res.isDecoded(key) for key in obj))
+        self.assertEqual(list(res), list(obj))
+        self.assertEqual(res.toDict(), obj)
+        self.assertEqual(json.loads(res.getRaw("articles")), obj["articles"])
+        self.assertRaises(KeyError, lambda: res["eventInfo"])
+        self.assertRaises(ValueError, LazyResponse, b"[1, 2]", OrjsonCodec())
+
+
+    def testDecodedOnlyOnce(self):
+        decodedSizes = []
+        class CountingCodec(JsonCodec):
+            def decode(self, data):
+                decodedSizes.append(len(data))
+                return JsonCodec.decode(self, data)
+
+        obj = self.createResponse()
+        res = LazyResponse(json.dumps(obj).encode("utf-8"), CountingCodec())
+        self.assertEqual(res["timeAggr"]["results"][0]["count"], 3)
+        self.assertTrue(res["timeAggr"] is res["timeAggr"])
+        self.assertEqual(decodedSizes, [res.getSectionSize("timeAggr")])
+
+
+    def testInvalidJson(self):
+        for data in [b"[1, 2]", b"", b'{"a": 1', b'{"a": [1, 2}', b'{"a": "text}', b'{"a" 1}', b'{a: 1}', b'{"a": 1 "b": 2}']:
+            self.assertRaises(ValueError, LazyResponse, data, JsonCodec())
+
+
+    def testExecQueryLazy(self):
+        obj = self.createResponse()
+        folder = tempfile.mkdtemp()
+        try:
+            with StubServer(lambda path, params: (200, {}, obj if params.get("keyword") != "error" else {"error": "invalid query"})) as server:
+                cache = ResponseCache(os.path.join(folder, "cache.db"))
+                er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, responseCache = cache)
+                res = er.execQueryLazy(QueryArticles(keywords = "Tesla"))
+                self.assertTrue(isinstance(res, LazyResponse))
+                self.assertEqual(res["articles"], obj["articles"])
+                # the raw response is cached and can be read by both execQuery() and execQueryLazy()
+                self.assertEqual(er.execQuery(QueryArticles(keywords = "Tesla")), obj)
+                self.assertEqual(er.execQueryLazy(QueryArticles(keywords = "Tesla")).toDict(), obj)
+                self.assertEqual(len(server.requests), 1)
+
+                self.assertEqual(er.execQueryLazy(QueryArticles(keywords = "error"))["error"], "invalid query")
+                er.execQueryLazy(QueryArticles(keywords = "error"))
+                self.assertEqual(len(server.requests), 3)
+                cache.close()
+        finally:
+            shutil.rmtree(folder, ignore_errors = True)
+
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def testAsyncExecQueryLazy(self):
+        obj = self.createResponse()
+        async def run(server):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, jsonCodec = JsonCodec()) as er:
+                return await er.execQueryLazy(QueryArticles(keywords = "Tesla"))
+
+        with StubServer(lambda path, params: (200, {}, obj)) as server:
+            res = asyncio.run(run(server))
+        self.assertEqual(res["timeAggr"], obj["timeAggr"])
+        self.assertFalse(res.isDecoded("articles"))
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestLazyResponse)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,378 @@
+import unittest, time, os, json, tempfile, datetime, threading
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, PagedResponder, createEventRegistry
+
+
+class TestPaging(unittest.TestCase):
+    def testSequentialPaging(self):
+        responder = PagedResponder(250)
+        with StubServer(responder) as server:
+            uris = [art["uri"] for art in QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server))]
+        self.assertEqual(uris, [str(i) for i in range(250)])
+        self.assertEqual(responder.pages, [1, 2, 3])
+
+
+    def testPrefetchReturnsItemsInOrder(self):
+        responder = PagedResponder(1050)
+        with StubServer(responder) as server:
+            uris = [art["uri"] for art in QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server, maxConcurrentRequests = 3), prefetchDepth = 3)]
+        self.assertEqual(uris, [str(i) for i in range(1050)])
+        self.assertEqual(sorted(responder.pages), list(range(1, 12)))
+
+
+    def testPrefetchRespectsTotalPagesAndMaxItems(self):
+        responder = PagedResponder(150)
+        with StubServer(responder) as server:
+            uris = [art["uri"] for art in QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), prefetchDepth = 5)]
+        self.assertEqual(len(uris), 150)
+        self.assertEqual(sorted(responder.pages), [1, 2])
+
+        responder = PagedResponder(10000)
+        with StubServer(responder) as server:
+            uris = [art["uri"] for art in QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), maxItems = 250, prefetchDepth = 5)]
+        self.assertEqual(uris, [str(i) for i in range(250)])
+        # the last page is only as large as needed: 50 articles from offset 200 is page 5 with 50 articles per page
+        self.assertEqual(sorted(responder.pages), [1, 2, 5])
+
+
+    def testPrefetchOverlapsProcessing(self):
+        def getRequestCounts(it, server, wait):
+            # the number of requests received by the server while the first item of each page is being processed
+            counts = []
+            for i, art in enumerate(it):
+                if i % 100 == 0:
+                    # there is no following page to wait for on the last page
+                    deadline = time.time() + (wait if i + 100 < 500 else 0)
+                    while len(server.requests) <= i // 100 + 1 and time.time() < deadline:
+                        time.sleep(0.01)
+                    counts.append(len(server.requests))
+            return counts
+
+        with StubServer(PagedResponder(500), latency = 0.05) as server:
+            self.assertEqual(getRequestCounts(QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server)), server, 0.2), [1, 2, 3, 4, 5])
+            del server.requests[:]
+            # the next page is requested before the caller finishes processing the current one
+            self.assertEqual(getRequestCounts(QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), prefetchDepth = 1), server, 5), [2, 3, 4, 5, 5])
+
+
+    def testOtherIterators(self):
+        responder = PagedResponder(120, resultType = "events")
+        with StubServer(responder) as server:
+            events = list(QueryEventsIter(keywords = "Tesla").execQuery(createEventRegistry(server), prefetchDepth = 2))
+        self.assertEqual(len(events), 120)
+        self.assertEqual(sorted(responder.pages), [1, 2, 3])
+
+        responder = PagedResponder(230, resultType = "mentions")
+        with StubServer(responder) as server:
+            mentions = list(QueryMentionsIter(keywords = "Tesla").execQuery(createEventRegistry(server), prefetchDepth = 2))
+        self.assertEqual(len(mentions), 230)
+
+        responder = PagedResponder(230, wrapKey = "eng-123")
+        with StubServer(responder) as server:
+            arts = list(QueryEventArticlesIter("eng-123").execQuery(createEventRegistry(server), prefetchDepth = 2))
+        self.assertEqual([art["uri"] for art in arts], [str(i) for i in range(230)])
+
+
+    def testParallelPagesInOrder(self):
+        responder = PagedResponder(2000)
+        with StubServer(responder, latency = 0.1) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 8)
+            start = time.time()
+            uris = [art["uri"] for art in QueryArticlesIter(keywords = "Tesla").execQuery(er, parallelPages = 8)]
+            elapsed = time.time() - start
+            self.assertTrue(server.maxInFlight > 1)
+        self.assertEqual(uris, [str(i) for i in range(2000)])
+        # 20 pages would take at least 2 seconds if downloaded one by one
+        self.assertTrue(elapsed < 1.5, "parallel download took %.2fs" % elapsed)
+
+
+    def testParallelPagesInCompletionOrder(self):
+        # make the even pages slower so that they complete later
+        def responder(path, params):
+            if params["articlesPage"] % 2 == 0:
+                time.sleep(0.2)
+            return paged(path, params)
+        paged = PagedResponder(1000)
+        with StubServer(responder) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4)
+            uris = [art["uri"] for art in QueryArticlesIter(keywords = "Tesla").execQuery(er, parallelPages = 4, ordered = False)]
+        self.assertEqual(sorted(uris, key = int), [str(i) for i in range(1000)])
+        self.assertNotEqual(uris, [str(i) for i in range(1000)])
+        # the first page is always returned first since it determines the number of pages
+        self.assertEqual(uris[:100], [str(i) for i in range(100)])
+
+
+    def testLastPageSize(self):
+        for maxItems in [1, 30, 99, 100, 101, 130, 250, 399]:
+            responder = PagedResponder(10000)
+            with StubServer(responder) as server:
+                it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), maxItems = maxItems)
+                uris = [art["uri"] for art in it]
+                self.assertEqual(uris, [str(i) for i in range(maxItems)])
+                counts = [params["articlesCount"] for path, params in server.requests]
+            # the number of downloaded articles is close to maxItems
+            self.assertTrue(sum(counts) - maxItems < 50, "maxItems %d: page sizes %s" % (maxItems, counts))
+            self.assertEqual([stats["count"] for stats in it.getPageStats()], counts)
+
+
+    def testFailedPageIsRepeated(self):
+        paged = PagedResponder(300)
+        failures = {2: 1}
+        def responder(path, params):
+            page = params["articlesPage"]
+            if failures.get(page, 0) > 0:
+                failures[page] -= 1
+                return (200, {}, {"error": "temporary error"})
+            return paged(path, params)
+
+        with StubServer(responder) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), prefetchDepth = 2)
+            it._pager._retryPolicy = RetryPolicy(maxRetries = 2, baseDelay = 0.01, maxDelay = 0.01)
+            uris = [art["uri"] for art in it]
+        self.assertEqual(uris, [str(i) for i in range(300)])
+        stats = dict((stats["page"], stats) for stats in it.getPageStats())
+        self.assertEqual(stats[2]["attempts"], 2)
+        self.assertEqual(stats[3]["attempts"], 1)
+        self.assertTrue(all(stats[page]["time"] >= 0 for page in stats))
+
+
+    def testFailedPageRaises(self):
+        paged = PagedResponder(300)
+        def responder(path, params):
+            if params["articlesPage"] == 2:
+                return (200, {}, {"error": "invalid page"})
+            return paged(path, params)
+
+        with StubServer(responder) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), maxPageRetries = 1)
+            it._pager._retryPolicy = RetryPolicy(maxRetries = 1, baseDelay = 0.01, maxDelay = 0.01)
+            uris = []
+            with self.assertRaises(PageDownloadError) as cm:
+                for art in it:
+                    uris.append(art["uri"])
+        self.assertEqual(cm.exception.page, 2)
+        self.assertEqual(len(uris), 100)
+
+
+    def testCheckpointResume(self):
+        fileName = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+        with StubServer(PagedResponder(500)) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), checkpointFile = fileName)
+            uris = [art["uri"] for _, art in zip(range(250), it)]
+        self.assertEqual(uris, [str(i) for i in range(250)])
+        # the checkpoint is saved after all the items of a page were processed
+        with open(fileName) as f:
+            self.assertEqual(json.load(f)["currItem"], 200)
+
+        responder = PagedResponder(500)
+        with StubServer(responder) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), checkpointFile = fileName)
+            uris = [art["uri"] for art in it]
+        self.assertEqual(uris, [str(i) for i in range(200, 500)])
+        self.assertEqual(responder.pages, [3, 4, 5])
+
+        # the iteration was completed - resuming it doesn't return or download anything
+        responder = PagedResponder(500)
+        with StubServer(responder) as server:
+            uris = list(QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), checkpointFile = fileName))
+        self.assertEqual(uris, [])
+        self.assertEqual(responder.pages, [])
+
+
+    def testCheckpointResumeAfterShift(self):
+        fileName = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+        with StubServer(PagedResponder(500)) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), checkpointFile = fileName)
+            uris = [art["uri"] for _, art in zip(range(201), it)]
+
+        # 30 new articles were added at the start of the results, so the following pages have shifted
+        paged = PagedResponder(530)
+        def responder(path, params):
+            status, headers, body = paged(path, params)
+            for art in body["articles"]["results"]:
+                i = int(art["uri"])
+                art["uri"] = "new-%d" % i if i < 30 else str(i - 30)
+            return (status, headers, body)
+        with StubServer(responder) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), checkpointFile = fileName)
+            uris = uris[:200] + [art["uri"] for art in it]
+        self.assertEqual(uris, [str(i) for i in range(500)])
+
+
+    def testCheckpointWithinPage(self):
+        fileName = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+        with StubServer(PagedResponder(500)) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), prefetchDepth = 2)
+            uris = [art["uri"] for _, art in zip(range(250), it)]
+            it.saveCheckpoint(fileName)
+            it._pager.close()
+
+        responder = PagedResponder(500)
+        with StubServer(responder) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), prefetchDepth = 2, checkpointFile = fileName)
+            uris += [art["uri"] for art in it]
+        # no duplicates and the pages that were already returned are not downloaded again
+        self.assertEqual(uris, [str(i) for i in range(500)])
+        self.assertEqual(sorted(responder.pages), [4, 5])
+
+
+    def testCheckpointOfDifferentQuery(self):
+        fileName = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+        with StubServer(PagedResponder(300)) as server:
+            er = createEventRegistry(server)
+            list(QueryArticlesIter(keywords = "Tesla").execQuery(er, checkpointFile = fileName))
+            self.assertRaises(ValueError, QueryArticlesIter(keywords = "Apple").execQuery, er, checkpointFile = fileName)
+            self.assertRaises(ValueError, QueryArticlesIter(keywords = "Tesla").execQuery, er, sortBy = "date", checkpointFile = fileName)
+
+
+    def testBulkQuery(self):
+        def responder(path, params):
+            requests.append(params)
+            if params["resultType"] == ["uriWgtList"]:
+                start = (params["uriWgtListPage"] - 1) * params["uriWgtListCount"]
+                uris = ["%d:%d" % (i, 100 - i % 100) for i in range(start, min(start + params["uriWgtListCount"], 1050))]
+                return (200, {}, {"uriWgtList": {"results": uris, "totalResults": 1050}})
+            uris = params.get("articleUri") or params["eventUriList"].split(",")
+            resultType = "articles" if "articleUri" in params else "events"
+            return (200, {}, {resultType: {"results": [{"uri": uri} for uri in uris], "totalResults": len(uris), "pages": 1}})
+
+        requests = []
+        with StubServer(responder) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4)
+            it = QueryArticlesIter(keywords = "Tesla").execBulkQuery(er, skipUris = set(str(i) for i in range(100, 200)))
+            uris = [art["uri"] for art in it]
+        self.assertEqual(uris, [str(i) for i in range(1050) if not 100 <= i < 200])
+        self.assertEqual(it.getSkippedCount(), 100)
+        self.assertEqual(len(requests), 1 + 10)
+        self.assertTrue(all(len(params["articleUri"]) <= 100 for params in requests[1:]))
+
+        requests = []
+        with StubServer(responder) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4)
+            events = list(QueryEventsIter(keywords = "Tesla").execBulkQuery(er, maxItems = 120))
+        self.assertEqual([event["uri"] for event in events], [str(i) for i in range(120)])
+        # details of the events are downloaded in batches of 50
+        self.assertEqual(len(requests), 1 + 3)
+
+
+    def testCursorWithNewArticles(self):
+        # 150 articles per day in the 4 days before today. Every request adds 30 newly published articles
+        today = datetime.datetime.utcnow().date()
+        articles = [{"uri": "%s-%d" % (day, i), "dateTime": "%sT%02d:%02d:00Z" % (day, i // 60 % 24, i % 60)}
+            for day in [(today - datetime.timedelta(days = d)).isoformat() for d in range(1, 5)] for i in range(150)]
+        expected = sorted(articles, key = lambda art: (art["dateTime"], art["uri"]), reverse = True)
+
+        def responder(path, params):
+            for i in range(30):
+                articles.append({"uri": "new-%d" % len(articles), "dateTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 10))})
+            dateStart, dateEnd = getQueryDateRange(params)
+            matching = sorted([art for art in articles if dateEnd is None or art["dateTime"][:10] <= dateEnd], key = lambda art: (art["dateTime"], art["uri"]), reverse = True)
+            page, count = params["articlesPage"], params["articlesCount"]
+            result = {"articles": {"results": matching[(page - 1) * count: page * count], "totalResults": len(matching), "pages": (len(matching) + count - 1) // count}}
+            return (200, {}, {params["eventUri"]: result} if "eventUri" in params else result)
+
+        with StubServer(responder) as server:
+            er = createEventRegistry(server)
+            # the new articles shift the pages, so the same articles are returned several times
+            arts = list(QueryArticlesIter(keywords = "Tesla").execQuery(er, sortBy = "date", maxItems = 600))
+            self.assertTrue(len(set(art["uri"] for art in arts)) < 600)
+
+            del articles[600:]
+            arts = list(QueryArticlesIter(keywords = "Tesla").execQuery(er, sortBy = "date", cursor = True))
+            self.assertEqual([art["uri"] for art in arts], [art["uri"] for art in expected])
+            self.assertRaises(AssertionError, QueryArticlesIter(keywords = "Tesla").execQuery, er, sortBy = "rel", cursor = True)
+
+            arts = list(QueryEventArticlesIter("eng-1").execQuery(er, sortBy = "date", cursor = True))
+            self.assertEqual([art["uri"] for art in arts], [art["uri"] for art in expected])
+
+            # the state of the cursor is stored in the checkpoint
+            with tempfile.TemporaryDirectory() as tmpDir:
+                fileName = os.path.join(tmpDir, "checkpoint.json")
+                it = QueryArticlesIter(keywords = "Tesla").execQuery(er, sortBy = "date", cursor = True, checkpointFile = fileName)
+                uris = [next(it)["uri"] for i in range(250)]
+                # the checkpoint was saved after the first two pages were returned
+                with open(fileName) as f:
+                    state = json.load(f)
+                self.assertTrue(state["cursor"])
+                self.assertEqual((state["currItem"], state["boundaryTime"]), (200, arts[199]["dateTime"]))
+                it = QueryArticlesIter(keywords = "Tesla").execQuery(er, sortBy = "date", cursor = True, checkpointFile = fileName)
+                uris = uris[:200] + [art["uri"] for art in it]
+                self.assertEqual(uris, [art["uri"] for art in expected])
+                self.assertRaises(ValueError, QueryArticlesIter(keywords = "Tesla").execQuery, er, sortBy = "date", checkpointFile = fileName)
+
+
+    def testCursorWithRemovedArticles(self):
+        # 100 articles on the previous day and 150 on the day before. An article of the previous day is removed after the first request
+        today = datetime.datetime.utcnow().date()
+        days = [(today - datetime.timedelta(days = d)).isoformat() for d in [1, 2]]
+        articles = [{"uri": "%s-%d" % (day, i), "dateTime": "%sT%02d:%02d:00Z" % (day, 23 - i // 60, 59 - i % 60)}
+            for day, count in zip(days, [100, 150]) for i in range(count)]
+        expected = [art["uri"] for art in articles]
+
+        def responder(path, params):
+            dateStart, dateEnd = getQueryDateRange(params)
+            requests.append((params["articlesPage"], dateEnd))
+            matching = [art for art in articles if dateEnd is None or art["dateTime"][:10] <= dateEnd]
+            if len(requests) == 1:
+                del articles[5]
+            page, count = params["articlesPage"], params["articlesCount"]
+            return (200, {}, {"articles": {"results": matching[(page - 1) * count: page * count], "totalResults": len(matching), "pages": (len(matching) + count - 1) // count}})
+
+        requests = []
+        with StubServer(responder) as server:
+            arts = list(QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), sortBy = "date", cursor = True))
+        # no article is skipped when the positions within the date change
+        self.assertEqual([art["uri"] for art in arts], expected)
+        # after the date is narrowed, the paging starts at the first page
+        self.assertEqual(requests[:2], [(1, today.isoformat()), (1, days[0])])
+
+
+    def testStoppedIterationIsClosed(self):
+        def getPrefetchThreads():
+            return [t for t in threading.enumerate() if t.name.startswith("eventregistry-prefetch")]
+
+        responder = PagedResponder(1000)
+        with StubServer(responder) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4)
+            with QueryArticlesIter(keywords = "Tesla").execQuery(er, parallelPages = 2) as it:
+                for i, art in enumerate(it):
+                    if i == 150:
+                        break
+            for batch in QueryArticlesIter(keywords = "Tesla").execQuery(er, parallelPages = 2).iterBatches():
+                break
+            bulkIter = QueryArticlesIter(keywords = "Tesla").execBulkQuery(er)
+            for batch in bulkIter.iterBatches():
+                break
+            # the background threads stop once the pages that were being downloaded complete
+            deadline = time.time() + 5
+            while len(getPrefetchThreads()) > 0 and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(getPrefetchThreads(), [])
+
+
+    def testIterBatches(self):
+        responder = PagedResponder(250)
+        with StubServer(responder) as server:
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), prefetchDepth = 1)
+            first = next(it)
+            batches = list(it.iterBatches())
+            self.assertEqual([len(batch) for batch in batches], [99, 100, 50])
+            self.assertEqual([first["uri"]] + [art["uri"] for batch in batches for art in batch], [str(i) for i in range(250)])
+
+            it = QueryArticlesIter(keywords = "Tesla").execQuery(createEventRegistry(server), maxItems = 130)
+            batches = list(it.iterBatches(columnar = "dict"))
+            self.assertEqual([len(batch["uri"]) for batch in batches], [100, 30])
+            self.assertEqual(set(batches[0].keys()), set(name for name, _, _ in ARTICLE_COLUMNS))
+
+
+        with StubServer(PagedResponder(150, resultType = "mentions")) as server:
+            it = QueryMentionsIter(keywords = "Tesla").execQuery(createEventRegistry(server))
+            # there are no default columns for the mentions
+            self.assertRaises(ValueError, it.iterBatches, columnar = "dict")
+            batches = list(it.iterBatches(columnar = "dict", columns = ["uri"]))
+            self.assertEqual(batches[1], {"uri": [str(i) for i in range(100, 150)]})
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestPaging)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,87 @@
+import unittest, os, time, tempfile, threading, multiprocessing
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer
+
+
+def _acquireInProcess(fileName, count, queue):
+    limiter = FileTokenBucketRateLimiter(fileName, requestsPerSecond = 20, burst = 1)
+    for _ in range(count):
+        limiter.acquire()
+        queue.put(time.time())
+
+
+class TestRateLimiter(unittest.TestCase):
+    def testBurstIsNotDelayed(self):
+        limiter = TokenBucketRateLimiter(requestsPerSecond = 1, burst = 5)
+        waits = [limiter.reserve() for _ in range(5)]
+        self.assertEqual(waits, [0.0] * 5)
+        # the sixth request has to wait for one token to be refilled
+        self.assertAlmostEqual(limiter.reserve(), 1.0, delta = 0.05)
+        stats = limiter.getStats()
+        self.assertEqual(stats["requestCount"], 6)
+        self.assertEqual(stats["delayedRequestCount"], 1)
+
+
+    def testThroughputAcrossThreads(self):
+        limiter = TokenBucketRateLimiter(requestsPerSecond = 50, burst = 1)
+        times = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(10):
+                limiter.acquire()
+                with lock:
+                    times.append(time.monotonic())
+
+        threads = [threading.Thread(target = worker) for _ in range(5)]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - start
+        # 50 requests at 50 per second, the first one is free
+        self.assertTrue(0.9 < elapsed < 1.4, "50 requests took %.2f seconds" % elapsed)
+
+
+    def testFileRateLimiterSharedByProcesses(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fileName = os.path.join(tmpDir, "bucket")
+            queue = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target = _acquireInProcess, args = (fileName, 5, queue)) for _ in range(2)]
+            start = time.time()
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+            times = sorted(queue.get() for _ in range(10))
+        # 10 requests at 20 per second in total should take at least 0.45 seconds
+        self.assertTrue(times[-1] - start >= 0.4, "requests finished after %.2f seconds" % (times[-1] - start))
+
+
+    def testEventRegistryUsesRateLimiter(self):
+        limiter = TokenBucketRateLimiter(requestsPerSecond = 10, burst = 2)
+        with StubServer() as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, rateLimiter = limiter)
+            for _ in range(4):
+                er.jsonRequest("/api/v1/article", {})
+            self.assertTrue(er.getLastRateLimiterWaitTime() > 0)
+        self.assertEqual(limiter.getStats()["requestCount"], 4)
+        self.assertIs(er.getRateLimiter(), limiter)
+
+
+    def testMinDelayBetweenRequests(self):
+        with StubServer() as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0.2)
+            for _ in range(3):
+                er.jsonRequest("/api/v1/article", {})
+            # the requests after the first one had to wait for the limiter
+            self.assertEqual(er.getRateLimiter().getStats()["delayedRequestCount"], 2)
+            self.assertTrue(er.getLastRateLimiterWaitTime() > 0)
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0)
+            self.assertIsNone(er.getRateLimiter())
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestRateLimiter)
+    unittest.TextTestRunner(verbosity=3).run(suite)
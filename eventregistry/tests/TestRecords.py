@@ -0,0 +1,69 @@
+import unittest, json
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, PagedResponder
+from eventregistry.tests.BenchmarkRecords import createArticlesJson, runBenchmark
+
+
+class TestRecords(unittest.TestCase):
+    def testArticleRecord(self):
+        articles = json.loads(createArticlesJson(10))
+        records = toRecords(json.loads(createArticlesJson(10)))
+        for art, record in zip(articles, records):
+            self.assertEqual(record.toDict(), art)
+            self.assertEqual(record.uri, art["uri"])
+            self.assertEqual(record.sourceUri, art["source"]["uri"])
+            self.assertEqual(record.conceptUris, tuple(concept["uri"] for concept in art["concepts"]))
+            self.assertEqual(record.get("source"), art["source"])
+            self.assertEqual(record.get("lang"), art["lang"])
+            self.assertIsNone(record.body)
+        # the repeated strings are shared between the records
+        self.assertIs(records[0].dataType, records[1].dataType)
+        self.assertIs(ArticleRecord.fromDict(json.loads('{"source": {"uri": "bbc.co.uk"}}')).sourceUri,
+                      ArticleRecord.fromDict(json.loads('{"source": {"uri": "bbc.co.uk"}}')).sourceUri)
+        self.assertEqual(ArticleRecord.fromDict({"uri": "1", "source": {"uri": "bbc.co.uk"}}).toDict(), {"uri": "1", "source": {"uri": "bbc.co.uk"}})
+
+
+    def testEventRecord(self):
+        event = {"uri": "eng-1", "eventDate": "2023-06-01", "totalArticleCount": 10, "title": {"eng": "Title"}, "categories": [{"uri": "dmoz/Business"}]}
+        record = EventRecord.fromDict(event)
+        self.assertEqual((record.uri, record.totalArticleCount, record.categoryUris, record.conceptUris), ("eng-1", 10, ("dmoz/Business",), ()))
+        self.assertEqual(record.getExtra(), {"title": {"eng": "Title"}})
+        self.assertEqual(record.get("categories"), event["categories"])
+        self.assertEqual(record.toDict(), event)
+        event["concepts"] = []
+        self.assertEqual(EventRecord.fromDict(event).toDict(), event)
+        # the lists of items without uris are kept unchanged
+        event["concepts"] = [{"uri": "http://en.wikipedia.org/wiki/Tesla"}, {"label": "unknown"}]
+        record = EventRecord.fromDict(event)
+        self.assertEqual(record.conceptUris, ("http://en.wikipedia.org/wiki/Tesla",))
+        self.assertEqual(record.toDict(), event)
+
+
+    def testUrisAreNotStoredTwice(self):
+        article = json.loads(createArticlesJson(1))[0]
+        record = ArticleRecord.fromDict(article)
+        for concept in article["concepts"]:
+            self.assertFalse(concept["uri"] in record._extra)
+        self.assertEqual(record.getExtra()["concepts"], [{"type": "wiki", "score": 3}] * 4)
+        self.assertEqual(record.get("concepts"), article["concepts"])
+        self.assertEqual(record.toDict(), article)
+
+
+    def testIterRecords(self):
+        with StubServer(PagedResponder(150)) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0)
+            records = list(QueryArticlesIter(keywords = "Tesla").execQuery(er).iterRecords())
+            self.assertTrue(all(isinstance(record, ArticleRecord) for record in records))
+            self.assertEqual([record.uri for record in records], [str(i) for i in range(150)])
+            self.assertRaises(ValueError, QueryMentionsIter(keywords = "Tesla").execQuery(er).iterRecords)
+
+
+    def testMemory(self):
+        dictSize, recordSize = runBenchmark(2000)
+        self.assertTrue(recordSize < dictSize * 0.6, "dict: %d bytes, record: %d bytes" % (dictSize, recordSize))
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestRecords)
+    unittest.TextTestRunner(verbosity=3).run(suite)
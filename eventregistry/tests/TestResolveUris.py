@@ -0,0 +1,70 @@
+import unittest, asyncio
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, createEventRegistry
+from eventregistry.tests.TestUriCache import suggestResponder
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class TestResolveUris(unittest.TestCase):
+    def testResolveConceptUris(self):
+        labels = ["Company%d" % (i % 30) for i in range(100)] + ["Unknown", "Error"]
+        with StubServer(suggestResponder, latency = 0.05) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 8, repeatFailedRequestCount = 0)
+            uris = er.resolveConceptUris(labels, lang = "deu")
+            # each unique label is requested once, several at the same time
+            self.assertEqual(len(server.requests), 32)
+            self.assertTrue(1 < server.maxInFlight <= 8)
+            self.assertTrue(all(params["lang"] == "deu" for path, params in server.requests))
+        self.assertTrue(isinstance(uris, ResolvedUris))
+        self.assertEqual(list(uris), list(dict.fromkeys(labels)))
+        self.assertEqual(uris["Company5"], "http://de.wikipedia.org/wiki/Company5")
+        self.assertEqual(uris.getUnresolved(), ["Unknown", "Error"])
+        self.assertEqual(len(uris.getResolved()), 30)
+        self.assertEqual(uris.getErrors(), {})
+
+
+    def testOtherResolvers(self):
+        with StubServer(suggestResponder) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 2, repeatFailedRequestCount = 0)
+            self.assertEqual(er.resolveLocationUris(["Paris", "Berlin"]), {"Paris": "http://en.wikipedia.org/wiki/Paris", "Berlin": "http://en.wikipedia.org/wiki/Berlin"})
+            self.assertEqual(er.resolveSourceUris(["bbc"], maxParallel = 1), {"bbc": "http://en.wikipedia.org/wiki/bbc"})
+            self.assertEqual(er.resolveAuthorUris(["Unknown"]).getUnresolved(), ["Unknown"])
+            self.assertEqual(er.resolveConceptUris([]), {})
+
+
+    def testFailedRequestsAreReported(self):
+        def responder(path, params):
+            if params.get("prefix") == "Broken":
+                return (400, {}, "invalid request")
+            return suggestResponder(path, params)
+
+        with StubServer(responder) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4, repeatFailedRequestCount = 0)
+            uris = er.resolveConceptUris(["Obama", "Broken", "Tesla"])
+        self.assertEqual(uris.getUnresolved(), ["Broken"])
+        self.assertEqual(list(uris.getErrors()), ["Broken"])
+        self.assertEqual(uris["Tesla"], "http://en.wikipedia.org/wiki/Tesla")
+
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def testAsync(self):
+        async def run(server):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, repeatFailedRequestCount = 0) as er:
+                return await er.resolveConceptUris(["Company%d" % (i % 20) for i in range(60)] + ["Unknown"], maxParallel = 5)
+
+        with StubServer(suggestResponder, latency = 0.05) as server:
+            uris = asyncio.run(run(server))
+            self.assertEqual(len(server.requests), 21)
+            self.assertTrue(1 < server.maxInFlight <= 5)
+        self.assertEqual(len(uris.getResolved()), 20)
+        self.assertEqual(uris.getUnresolved(), ["Unknown"])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestResolveUris)
+    unittest.TextTestRunner(verbosity=3).run(suite)
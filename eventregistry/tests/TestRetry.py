@@ -0,0 +1,145 @@
+import unittest, time, datetime, email.utils, asyncio
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer
+
+
+class FailingResponder(object):
+    """return the given list of status codes, then 200"""
+    def __init__(self, statusCodes, headers = None):
+        self.statusCodes = list(statusCodes)
+        self.headers = headers or {}
+
+    def __call__(self, path, params):
+        if len(self.statusCodes) > 0:
+            return (self.statusCodes.pop(0), self.headers, "error")
+        return (200, {}, {"ok": True})
+
+
+
+class TestRetry(unittest.TestCase):
+    def testBackoffBounds(self):
+        policy = RetryPolicy(baseDelay = 1, maxDelay = 10, multiplier = 2, jitter = False)
+        self.assertEqual([policy.getDelay(i) for i in range(1, 7)], [1, 2, 4, 8, 10, 10])
+        policy = RetryPolicy(baseDelay = 1, maxDelay = 10, multiplier = 2)
+        for i in range(1, 50):
+            delay = policy.getDelay(5)
+            self.assertTrue(0 <= delay <= 10)
+        self.assertEqual(policy.getStats()["retryCount"], 49)
+
+
+    def testRetryAfter(self):
+        self.assertEqual(RetryPolicy.parseRetryAfter("7"), 7)
+        self.assertIsNone(RetryPolicy.parseRetryAfter(None))
+        self.assertIsNone(RetryPolicy.parseRetryAfter("soon"))
+        httpDate = email.utils.format_datetime(datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds = 30), usegmt = True)
+        self.assertAlmostEqual(RetryPolicy.parseRetryAfter(httpDate), 30, delta = 2)
+        policy = RetryPolicy(baseDelay = 0.1, maxDelay = 0.1)
+        self.assertEqual(policy.getDelay(1, retryAfter = 3), 3)
+        self.assertEqual(policy.getStats()["retryAfterCount"], 1)
+
+
+    def testMaxRetries(self):
+        policy = RetryPolicy(maxRetries = 2)
+        self.assertTrue(policy.shouldRetry(1))
+        self.assertTrue(policy.shouldRetry(2))
+        self.assertFalse(policy.shouldRetry(3))
+        self.assertTrue(RetryPolicy(maxRetries = -1).shouldRetry(1000))
+
+
+    def testRequestIsRepeated(self):
+        with StubServer(FailingResponder([503, 500])) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, retryPolicy = RetryPolicy(baseDelay = 0.01, maxDelay = 0.05))
+            self.assertEqual(er.jsonRequest("/api/v1/article", {}), {"ok": True})
+            self.assertEqual(len(server.requests), 3)
+            self.assertEqual(er.getRetryPolicy().getStats()["retryCount"], 2)
+
+
+    def testRetryAfterIsRespected(self):
+        with StubServer(FailingResponder([429], {"Retry-After": "1"})) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, retryPolicy = RetryPolicy(baseDelay = 0.01, maxDelay = 0.01))
+            er.jsonRequest("/api/v1/article", {})
+            stats = er.getRetryPolicy().getStats()
+            self.assertEqual((stats["retryAfterCount"], stats["totalDelay"]), (1, 1.0))
+
+
+    def testRepeatFailedRequestCount(self):
+        with StubServer(FailingResponder([500] * 10)) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, repeatFailedRequestCount = 2)
+            er._retryPolicy = RetryPolicy(maxRetries = 2, baseDelay = 0.01, maxDelay = 0.01)
+            self.assertRaises(Exception, er.jsonRequest, "/api/v1/article", {})
+            self.assertEqual(len(server.requests), 3)
+
+
+    def testCircuitBreakerStates(self):
+        breaker = CircuitBreaker(failureThreshold = 2, recoveryTimeout = 0.2)
+        breaker.beforeRequest("a")
+        breaker.recordFailure("a")
+        breaker.beforeRequest("a")
+        breaker.recordFailure("a")
+        self.assertEqual(breaker.getState("a"), CircuitBreaker.OPEN)
+        self.assertRaises(CircuitBreakerOpenError, breaker.beforeRequest, "a")
+        # other hosts are not affected
+        breaker.beforeRequest("b")
+        time.sleep(0.25)
+        # one probe is allowed in the half-open state
+        breaker.beforeRequest("a")
+        self.assertEqual(breaker.getState("a"), CircuitBreaker.HALF_OPEN)
+        self.assertRaises(CircuitBreakerOpenError, breaker.beforeRequest, "a")
+        breaker.recordSuccess("a")
+        breaker.releaseProbe("a")
+        self.assertEqual(breaker.getState("a"), CircuitBreaker.CLOSED)
+        stats = breaker.getStats()["a"]
+        self.assertEqual(stats["openCount"], 1)
+        self.assertEqual(stats["rejectedCount"], 2)
+        self.assertFalse(breaker.beforeRequest("a"))
+
+
+    def testCancelledProbeIsReleased(self):
+        breaker = CircuitBreaker(failureThreshold = 1, recoveryTimeout = 0.1)
+        async def run(server, host):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0,
+                                          maxConcurrentRequests = 1, circuitBreaker = breaker) as er:
+                # occupy the only slot, so that the probe waits for it and is cancelled while waiting
+                er.getConcurrencyController().acquire()
+                task = asyncio.ensure_future(er.jsonRequest("/api/v1/article", {}))
+                await asyncio.sleep(0.1)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions = True)
+                er.getConcurrencyController().release()
+
+        with StubServer(FailingResponder([])) as server:
+            host = server.url.split("://")[1]
+            breaker.recordFailure(host)
+            time.sleep(0.15)
+            asyncio.run(run(server, host))
+            self.assertEqual(breaker.getState(host), CircuitBreaker.HALF_OPEN)
+            # the cancelled probe doesn't block the following ones
+            self.assertTrue(breaker.beforeRequest(host))
+
+
+    def testCircuitBreakerFailsFast(self):
+        breaker = CircuitBreaker(failureThreshold = 3, recoveryTimeout = 60)
+        with StubServer(FailingResponder([503] * 100)) as server:
+            er = EventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0,
+                               retryPolicy = RetryPolicy(baseDelay = 0.01, maxDelay = 0.01), circuitBreaker = breaker)
+            self.assertRaises(CircuitBreakerOpenError, er.jsonRequest, "/api/v1/article", {})
+            self.assertEqual(len(server.requests), 3)
+            # further requests are rejected without contacting the server
+            self.assertRaises(CircuitBreakerOpenError, er.jsonRequest, "/api/v1/article", {})
+            self.assertEqual(len(server.requests), 3)
+
+
+    def testAsyncRetry(self):
+        async def run(server):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0,
+                                          retryPolicy = RetryPolicy(baseDelay = 0.01, maxDelay = 0.05)) as er:
+                return await er.jsonRequest("/api/v1/article", {})
+
+        with StubServer(FailingResponder([502, 503])) as server:
+            self.assertEqual(asyncio.run(run(server)), {"ok": True})
+            self.assertEqual(len(server.requests), 3)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestRetry)
+    unittest.TextTestRunner(verbosity=3).run(suite)
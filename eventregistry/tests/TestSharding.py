@@ -0,0 +1,115 @@
+import unittest, json, datetime, gc, time, threading
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, createEventRegistry
+
+
+class DatedResponder(object):
+    """
+    responder for StubServer that returns the articles published on the dates in the date range of the query.
+    Each day in the dictionary itemsPerDay has the given number of articles with uris "<date>-<index>"
+    """
+    def __init__(self, itemsPerDay: dict):
+        self.itemsPerDay = itemsPerDay
+        self.ranges = []
+
+
+    def __call__(self, path, params):
+        dateStart, dateEnd = getQueryDateRange(params)
+        self.ranges.append((dateStart, dateEnd))
+        items = [{"uri": "%s-%d" % (day, i)} for day in sorted(self.itemsPerDay) if dateStart <= day <= dateEnd for i in range(self.itemsPerDay[day])]
+        page, count = params.get("articlesPage", 1), params.get("articlesCount", 100)
+        results = items[(page - 1) * count: page * count]
+        return (200, {}, {"articles": {"results": results, "page": page, "totalResults": len(items), "pages": (len(items) + count - 1) // count}})
+
+
+
+class TestSharding(unittest.TestCase):
+    def getAllUris(self, itemsPerDay):
+        return sorted("%s-%d" % (day, i) for day in itemsPerDay for i in range(itemsPerDay[day]))
+
+
+    def testAdaptiveWindows(self):
+        start = datetime.date(2023, 1, 1)
+        # a busy day in the middle of a quiet month
+        itemsPerDay = dict(((start + datetime.timedelta(days = i)).isoformat(), 500 if i == 14 else 20) for i in range(31))
+        with StubServer(DatedResponder(itemsPerDay)) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4)
+            it = DateShardedIter(QueryArticlesIter(keywords = "Tesla", dateStart = "2023-01-01", dateEnd = "2023-01-31"), er, maxShardItems = 300)
+            shards = it.getShards()
+            uris = [art["uri"] for art in it]
+        self.assertEqual(sorted(uris), self.getAllUris(itemsPerDay))
+        self.assertEqual(len(uris), len(set(uris)))
+        # the windows cover the whole range without overlapping
+        self.assertEqual(shards[0][0], "2023-01-01")
+        self.assertEqual(shards[-1][1], "2023-01-31")
+        for (_, end, _), (nextStart, _, _) in zip(shards, shards[1:]):
+            self.assertEqual(datetime.date.fromisoformat(end) + datetime.timedelta(days = 1), datetime.date.fromisoformat(nextStart))
+        # only the busy day can exceed maxShardItems
+        self.assertTrue(("2023-01-15", "2023-01-15", 500) in shards)
+        self.assertTrue(all(count <= 300 for start, end, count in shards if start != end))
+
+
+    def testComplexQueryAndMaxItems(self):
+        itemsPerDay = dict(("2023-02-%02d" % day, 150) for day in range(1, 11))
+        query = ComplexArticleQuery(BaseQuery(keyword = "Tesla", dateStart = "2023-02-01", dateEnd = "2023-02-10"))
+        with StubServer(DatedResponder(itemsPerDay)) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4)
+            it = DateShardedIter(QueryArticlesIter.initWithComplexQuery(query), er, maxShardItems = 400)
+            uris = [art["uri"] for art in it]
+            self.assertEqual(sorted(uris), self.getAllUris(itemsPerDay))
+            self.assertTrue(len(it.getShards()) >= 4)
+
+            uris = list(DateShardedIter(QueryArticlesIter.initWithComplexQuery(query), er, maxShardItems = 400, maxItems = 250))
+            self.assertEqual(len(uris), 250)
+
+            batches = list(DateShardedIter(QueryArticlesIter.initWithComplexQuery(query), er, maxShardItems = 400).iterBatches(columnar = "dict"))
+            self.assertEqual(sorted(uri for batch in batches for uri in batch["uri"]), self.getAllUris(itemsPerDay))
+
+
+    def testStopsWhenAbandoned(self):
+        itemsPerDay = dict(("2023-03-%02d" % day, 300) for day in range(1, 21))
+        query = QueryArticlesIter(keywords = "Tesla", dateStart = "2023-03-01", dateEnd = "2023-03-20")
+        with StubServer(DatedResponder(itemsPerDay)) as server:
+            er = createEventRegistry(server, maxConcurrentRequests = 4)
+            with DateShardedIter(query, er, maxShardItems = 300) as it:
+                next(it)
+            for art in DateShardedIter(query, er, maxShardItems = 300):
+                break
+            gc.collect()
+            # the threads notice the stop event within the timeout of a put() call
+            deadline = time.time() + 5
+            while any(t.name.startswith("eventregistry-shard") for t in threading.enumerate()) and time.time() < deadline:
+                time.sleep(0.1)
+            self.assertFalse(any(t.name.startswith("eventregistry-shard") for t in threading.enumerate()))
+
+
+    def testFailedCountIsRepeated(self):
+        responder = DatedResponder(dict(("2023-04-%02d" % day, 100) for day in range(1, 11)))
+        failures = [1]
+        def failingResponder(path, params):
+            if params.get("dateStart") == "2023-04-06" and failures[0] > 0:
+                failures[0] -= 1
+                return (200, {}, {"error": "temporary error"})
+            return responder(path, params)
+
+        with StubServer(failingResponder) as server:
+            it = DateShardedIter(QueryArticlesIter(keywords = "Tesla", dateStart = "2023-04-01", dateEnd = "2023-04-10"), createEventRegistry(server), maxShardItems = 500)
+            it._retryPolicy = RetryPolicy(maxRetries = 2, baseDelay = 0.01, maxDelay = 0.01)
+            self.assertEqual(sum(count for _, _, count in it.getShards()), 1000)
+
+            failures[0] = 10
+            it = DateShardedIter(QueryArticlesIter(keywords = "Tesla", dateStart = "2023-04-01", dateEnd = "2023-04-10"), createEventRegistry(server), maxShardItems = 500)
+            it._retryPolicy = RetryPolicy(maxRetries = 1, baseDelay = 0.01, maxDelay = 0.01)
+            self.assertRaises(Exception, it.getShards)
+
+
+    def testMissingDateStart(self):
+        with StubServer(DatedResponder({})) as server:
+            it = DateShardedIter(QueryArticlesIter(keywords = "Tesla"), createEventRegistry(server))
+            self.assertRaises(ValueError, list, it)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSharding)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,61 @@
+import unittest, copy, pickle
+from eventregistry import *
+
+
+class TestStruct(unittest.TestCase):
+    def setUp(self):
+        self.res = {"events": {"totalResults": 2, "results": [
+            {"uri": "eng-1", "concepts": [{"uri": "http://en.wikipedia.org/wiki/Tesla", "label": {"eng": "Tesla"}}], "location": None},
+            {"uri": "eng-2", "concepts": [], "title": {"eng": "Title"}}
+        ]}}
+
+
+    def testAttributeAccess(self):
+        obj = createStructFromDict(self.res)
+        self.assertEqual(obj.events.totalResults, 2)
+        self.assertEqual(len(obj.events.results), 2)
+        self.assertEqual([event.uri for event in obj.events.results], ["eng-1", "eng-2"])
+        self.assertEqual(obj.events.results[0].concepts[0].label.eng, "Tesla")
+        self.assertEqual(obj.events.results[-1].title["eng"], "Title")
+        self.assertEqual([event.uri for event in obj.events.results[1:]], ["eng-2"])
+        self.assertIsNone(obj.events.results[0].location)
+        self.assertTrue(hasattr(obj.events.results[0], "location"))
+        self.assertFalse(hasattr(obj.events.results[1], "location"))
+        self.assertTrue(obj.events.results[1].has("title"))
+        self.assertRaises(AttributeError, getattr, obj, "articles")
+        self.assertEqual(obj.events.results[1].concepts, [])
+
+
+    def testViewDoesNotCopy(self):
+        obj = createStructFromDict(self.res)
+        self.assertIs(obj.toDict(), self.res)
+        self.assertIs(obj.events.results[0].toDict(), self.res["events"]["results"][0])
+        # changes are made in the underlying dict
+        obj.events.results[0].uri = "eng-3"
+        self.assertEqual(self.res["events"]["results"][0]["uri"], "eng-3")
+        del obj.events.results[0].location
+        self.assertFalse("location" in self.res["events"]["results"][0])
+
+        self.assertEqual(copy.deepcopy(obj).events.results[1].title.eng, "Title")
+        self.assertEqual(pickle.loads(pickle.dumps(obj)).toDict(), self.res)
+
+        # the nested lists are regular lists that are created once
+        results = obj.events.results
+        self.assertTrue(isinstance(results, list))
+        self.assertIs(obj.events.results, results)
+        obj.events.results.append(createStructFromDict({"uri": "eng-4"}))
+        self.assertEqual([event.uri for event in obj.events.results], ["eng-3", "eng-2", "eng-4"])
+        self.assertEqual(len(self.res["events"]["results"]), 2)
+        obj.events.results = []
+        self.assertEqual(obj.events.results, [])
+        self.assertTrue("has" in dir(obj) and "toDict" in dir(obj))
+
+        items = createStructFromDict([{"a": 1}, 2])
+        self.assertEqual(items[0].a, 1)
+        self.assertEqual(items[1], 2)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestStruct)
+    unittest.TextTestRunner(verbosity=3).run(suite)
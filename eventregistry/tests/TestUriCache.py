@@ -0,0 +1,123 @@
+import unittest, asyncio, tempfile, shutil, os, time
+from eventregistry import *
+from eventregistry.tests.StubServer import StubServer, createEventRegistry
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def suggestResponder(path, params):
+    prefix = params.get("prefix", "")
+    if prefix == "Unknown":
+        return (200, {}, [])
+    if prefix == "Error":
+        return (200, {}, {"error": "temporary error"})
+    return (200, {}, [{"uri": "http://%s.wikipedia.org/wiki/%s" % (params.get("lang", "en")[:2], prefix), "wikiUri": "http://en.wikipedia.org/wiki/" + prefix}])
+
+
+
+class TestUriCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+
+    def testMemoryCache(self):
+        with StubServer(suggestResponder) as server:
+            cache = UriCache(maxSize = 2)
+            er = createEventRegistry(server, uriCache = cache)
+            self.assertEqual(er.getConceptUri("Obama"), "http://en.wikipedia.org/wiki/Obama")
+            self.assertEqual(er.getConceptUri("Obama"), "http://en.wikipedia.org/wiki/Obama")
+            self.assertEqual(len(server.requests), 1)
+            # the other arguments are part of the key
+            self.assertEqual(er.getConceptUri("Obama", lang = "deu"), "http://de.wikipedia.org/wiki/Obama")
+            self.assertEqual(er.getLocationUri("Obama"), "http://en.wikipedia.org/wiki/Obama")
+            self.assertEqual(len(server.requests), 3)
+            # only the two most recently used uris are kept
+            er.getConceptUri("Obama")
+            self.assertEqual(len(server.requests), 4)
+            self.assertEqual(cache.getStats()["evictionCount"], 2)
+            self.assertEqual(cache.getStats()["memoryHitCount"], 1)
+
+            # the labels without a match are cached, the errors are not
+            self.assertEqual(er.getCategoryUri("Unknown"), None)
+            self.assertEqual(er.getCategoryUri("Unknown"), None)
+            self.assertEqual(len(server.requests), 5)
+            self.assertEqual(er.getAuthorUri("Error"), None)
+            self.assertEqual(er.getAuthorUri("Error"), None)
+            self.assertEqual(len(server.requests), 7)
+
+
+    def testFileCache(self):
+        fileName = os.path.join(self.folder, "uris.db")
+        with StubServer(suggestResponder) as server:
+            cache = UriCache(fileName = fileName)
+            er = createEventRegistry(server, uriCache = cache)
+            er.getSourceUri("bbc")
+            er.getEventTypeUri("Unknown")
+            cache.close()
+            self.assertEqual(len(server.requests), 2)
+
+            # the uris are available after a restart
+            cache = UriCache(fileName = fileName)
+            er = createEventRegistry(server, uriCache = cache)
+            self.assertEqual(er.getNewsSourceUri("bbc"), "http://en.wikipedia.org/wiki/bbc")
+            self.assertEqual(er.getEventTypeUri("Unknown"), None)
+            self.assertEqual(len(server.requests), 2)
+            self.assertEqual(cache.getStats()["fileHitCount"], 2)
+            self.assertEqual(cache.getStats()["fileCount"], 2)
+            cache.close()
+
+            # the expired uris are requested again
+            cache = UriCache(fileName = os.path.join(self.folder, "expiring.db"), ttl = 0.2)
+            er = createEventRegistry(server, uriCache = cache)
+            er.getSourceGroupUri("general")
+            time.sleep(0.3)
+            er.getSourceGroupUri("general")
+            self.assertEqual(len(server.requests), 4)
+            cache.close()
+
+
+    def testWarmUp(self):
+        labels = ["Label%d" % (i % 20) for i in range(50)] + ["Unknown"]
+        with StubServer(suggestResponder, latency = 0.05) as server:
+            er = createEventRegistry(server, uriCache = UriCache(), maxConcurrentRequests = 5)
+            uris = er.warmUpUriCache(labels, lang = "slv")
+            self.assertEqual(len(server.requests), 21)
+            self.assertTrue(server.maxInFlight > 1)
+            self.assertEqual(uris["Label3"], "http://sl.wikipedia.org/wiki/Label3")
+            self.assertEqual(uris["Unknown"], None)
+            # the resolved labels are served from the cache
+            self.assertEqual(er.getConceptUri("Label7", lang = "slv"), "http://sl.wikipedia.org/wiki/Label7")
+            self.assertEqual(er.warmUpUriCache(["Label1", "Label2"], method = "getConceptUri", lang = "slv"), {"Label1": "http://sl.wikipedia.org/wiki/Label1", "Label2": "http://sl.wikipedia.org/wiki/Label2"})
+            self.assertEqual(len(server.requests), 21)
+            self.assertRaises(AssertionError, er.warmUpUriCache, labels, method = "getConceptInfo")
+
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def testAsync(self):
+        async def run(server, cache):
+            async with AsyncEventRegistry(apiKey = "testKey", host = server.url, minDelayBetweenRequests = 0, uriCache = cache) as er:
+                uris = await er.warmUpUriCache(["Obama", "Tesla", "Obama"], maxParallel = 2)
+                return uris, await er.getConceptUri("Tesla"), await er.getLocationUri("Paris")
+
+        with StubServer(suggestResponder) as server:
+            cache = UriCache(fileName = os.path.join(self.folder, "uris.db"))
+            uris, tesla, paris = asyncio.run(run(server, cache))
+            self.assertEqual(len(server.requests), 3)
+        self.assertEqual(uris, {"Obama": "http://en.wikipedia.org/wiki/Obama", "Tesla": "http://en.wikipedia.org/wiki/Tesla"})
+        self.assertEqual(tesla, "http://en.wikipedia.org/wiki/Tesla")
+        self.assertEqual(paris, "http://en.wikipedia.org/wiki/Paris")
+        self.assertEqual(cache.getStats()["fileCount"], 3)
+        cache.close()
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestUriCache)
+    unittest.TextTestRunner(verbosity=3).run(suite)
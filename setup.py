@@ -34,4 +34,10 @@ setup(name='eventregistry',
       install_requires = [
           'requests', 'six', 'pytz'
       ],
+      extras_require = {
+          'async': ['aiohttp'],
+          'columnar': ['numpy', 'pyarrow'],
+          'export': ['zstandard', 'pyarrow'],
+          'orjson': ['orjson']
+      },
       zip_safe=False)